@@ -1,14 +1,89 @@
 
 from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.schema import CreateIndex
 import logging
 
 logger = logging.getLogger(__name__)
 
+def ensure_declared_indexes(engine, metadata=None):
+    """
+    Creates every index declared on the models that is missing from the database.
+    Idempotent; on Postgres indexes are built CONCURRENTLY (no write lock on the table)
+    and any INVALID leftovers from an interrupted concurrent build are rebuilt.
+    Returns the names of the indexes it created.
+    """
+    if metadata is None:
+        from backend.app.models import Base
+        metadata = Base.metadata
+
+    insp = inspect(engine)
+    tables = set(insp.get_table_names())
+    is_pg = engine.dialect.name == "postgresql"
+
+    invalid = set()
+    if is_pg:
+        with engine.connect() as conn:
+            invalid = {r[0] for r in conn.execute(text(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid"
+            ))}
+
+    added = []
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {ix['name'] for ix in insp.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda ix: ix.name):
+                if index.name in existing and index.name not in invalid:
+                    continue
+                if index.name in invalid:
+                    logger.warning(f"Healing '{table.name}': Rebuilding INVALID index '{index.name}'.")
+                    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name};"))
+
+                ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+                if is_pg:
+                    ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1).replace("CREATE UNIQUE INDEX", "CREATE UNIQUE INDEX CONCURRENTLY", 1)
+                logger.warning(f"Healing '{table.name}': Creating index '{index.name}'.")
+                try:
+                    conn.execute(text(ddl))
+                    added.append(index.name)
+                except Exception as e:
+                    logger.error(f"Could not create index '{index.name}': {e}")
+
+    if added:
+        logger.info(f"Created {len(added)} missing index(es): {', '.join(added)}")
+    return added
+
+def ensure_declared_columns(engine, table_name, metadata=None):
+    """
+    Adds any column declared on the model for table_name that the live table lacks
+    (nullable, with no server default). Returns the names of the columns it added.
+    """
+    if metadata is None:
+        from backend.app.models import Base
+        metadata = Base.metadata
+
+    table = metadata.tables[table_name]
+    existing = {c['name'] for c in inspect(engine).get_columns(table_name)}
+    added = []
+    with engine.connect() as conn:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            col_type = column.type.compile(dialect=engine.dialect)
+            logger.warning(f"Healing '{table_name}': Adding missing '{column.name}' column.")
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column.name} {col_type};"))
+            added.append(column.name)
+        conn.commit()
+    return added
+
 def heal_database(engine):
     """
     Vibrant self-healing routine for BQS database.
     Ensures that the schema matches expectations exactly, 
     adding missing columns for justifications (reasons) if they're gone.
+    Returns the names of any indexes that had to be created.
     """
     logger.info("Running Database Self-Healing...")
     insp = inspect(engine)
@@ -50,6 +125,24 @@ def heal_database(engine):
                     conn.execute(text("ALTER TABLE opp_score_values ALTER COLUMN score TYPE FLOAT;"))
                     conn.commit()
 
+        # Collapse duplicate (version, section) rows so the unique upsert key can be built.
+        # The survivor is the most recently written row (highest ctid/rowid), i.e. the last save.
+        indexes = {ix['name'] for ix in insp.get_indexes("opp_score_values")}
+        if "uq_score_values_version_section" not in indexes:
+            with engine.connect() as conn:
+                if engine.dialect.name == "postgresql":
+                    dedupe = ("DELETE FROM opp_score_values a USING opp_score_values b "
+                              "WHERE a.score_version_id = b.score_version_id "
+                              "AND a.section_code = b.section_code AND a.ctid < b.ctid")
+                else:
+                    dedupe = ("DELETE FROM opp_score_values WHERE rowid NOT IN ("
+                              "SELECT MAX(rowid) FROM opp_score_values GROUP BY score_version_id, section_code)")
+                removed = conn.execute(text(dedupe)).rowcount
+                conn.execute(text("DROP INDEX IF EXISTS ix_score_values_version_section;"))
+                conn.commit()
+            if removed:
+                logger.warning(f"Healing 'opp_score_values': Removed {removed} duplicate section value(s).")
+
     # 3. Heal the version table
     if "opp_score_version" in tables:
         cols = [c['name'] for c in insp.get_columns("opp_score_version")]
@@ -105,4 +198,26 @@ def heal_database(engine):
             if result.rowcount > 0:
                 logger.info(f"Synced workflow_status for {result.rowcount} opportunities")
 
+        # Latest-version projection: add the columns, then backfill missing/stale rows
+        ensure_declared_columns(engine, "opportunity")
+        from backend.app.services.score_projection import refresh_latest_versions
+        with engine.connect() as conn:
+            refreshed = refresh_latest_versions(conn)
+            conn.commit()
+        if refreshed:
+            logger.info(f"Backfilled latest score version for {refreshed} opportunities")
+
+    # 5. Sync run ledger columns (stage timings, counts, retries, concurrency)
+    if "sync_run" in tables:
+        ensure_declared_columns(engine, "sync_run")
+
+    # 6. Declared model indexes (hot filter columns, latest-version lookups)
+    added_indexes = ensure_declared_indexes(engine)
+
+    # Trigram search indexes (pg_trgm); no-op outside Postgres
+    if "opportunity" in tables:
+        from backend.app.services.opportunity_search import ensure_search_indexes
+        added_indexes += ensure_search_indexes(engine)
+
     logger.info("Database Health Check: Passed.")
+    return added_indexes
@@ -2,6 +2,7 @@
 from fastapi import FastAPI, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import os
 import sys
@@ -11,18 +12,33 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 from backend.app.core.database import init_db
 from backend.app.services.sync_manager import sync_opportunities
-from backend.app.routers import auth, inbox, scoring, batch_sync, upload, opportunities
+from backend.app.services.sync_state import start_background, run_tracked, is_running
+from backend.app.services.sync_scheduler import start_scheduler, stop_scheduler
+from backend.app.services.section_catalog import section_catalog
+from backend.app.routers import auth, inbox, scoring, batch_sync, upload, opportunities, health, sync_runs
+
+SYNC_ON_STARTUP = os.getenv("SYNC_ON_STARTUP", "true").lower() == "true"
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 BQS Starting...")
-    init_db()
-    # Auto-Sync on Startup (Lightweight)
+    # 1. Schema, healing and seed data (local DB only, off the event loop)
     try:
-        sync_opportunities()
+        await asyncio.to_thread(init_db)
+        await asyncio.to_thread(section_catalog.load)
+        health.mark_ready()
     except Exception as e:
-        print(f"Startup Sync Error: {e}")
+        print(f"Startup DB Init Error: {e}")
+        health.mark_failed(e)
+
+    # 2. Oracle sync runs on a worker thread; requests are served meanwhile
+    if SYNC_ON_STARTUP:
+        start_background("startup", sync_opportunities)
+
+    # 3. Periodic incremental + nightly full reconcile (same single-run guard)
+    start_scheduler()
     yield
+    stop_scheduler()
 
 app = FastAPI(title="BQS MVP", lifespan=lifespan)
 
@@ -40,11 +56,16 @@ app.include_router(scoring.router)
 app.include_router(upload.router)
 app.include_router(opportunities.router)
 app.include_router(batch_sync.router)
+app.include_router(health.router)
+app.include_router(sync_runs.router)
 
 @app.post("/api/sync-force")
-def force_sync(background_tasks: BackgroundTasks):
-    background_tasks.add_task(sync_opportunities)
-    return {"status": "started"}
+def force_sync(background_tasks: BackgroundTasks, full: bool = False):
+    """Incremental by default; pass ?full=true to force a full reconcile."""
+    if is_running():
+        return {"status": "already_running"}
+    background_tasks.add_task(run_tracked, "manual", sync_opportunities, full)
+    return {"status": "started", "mode": "FULL" if full else "AUTO"}
 
 if __name__ == "__main__":
     uvicorn.run("backend.app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,7 +1,7 @@
 import os
 import uuid
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, JSON, ForeignKey, Text
+from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, JSON, ForeignKey, Text, Index, BigInteger
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
 
 Base = declarative_base()
@@ -59,7 +59,7 @@ class Opportunity(Base):
     primary_practice_id = Column(String, ForeignKey("practice.practice_id"), nullable=True)
     
     crm_last_updated_at = Column(DateTime, nullable=False)
-    local_last_synced_at = Column(DateTime, default=datetime.utcnow)
+    local_last_synced_at = Column(DateTime, default=datetime.utcnow) # last time a sync wrote this row's content
     workflow_status = Column(String, nullable=True) # NEW, ASSIGNED_TO_SA, UNDER_ASSESSMENT, APPROVED, REJECTED, etc.
     is_active = Column(Boolean, default=True)
 
@@ -76,19 +76,65 @@ class Opportunity(Base):
     
     combined_submission_ready = Column(Boolean, default=False)
 
+    # --- Latest score version (projection maintained by services/score_projection) ---
+    latest_version_id = Column(String, nullable=True)
+    latest_version_no = Column(Integer, nullable=True)
+    latest_version_status = Column(String, nullable=True)
+    latest_overall_score = Column(Integer, nullable=True)
+    latest_sa_submitted = Column(Boolean, nullable=True)
+    latest_sp_submitted = Column(Boolean, nullable=True)
+
     # Relationships
     assignments = relationship("OpportunityAssignment", back_populates="opportunity")
     score_versions = relationship("OppScoreVersion", back_populates="opportunity")
 
+    # Hot dashboard filters. Partial on is_active because every listing filters on it;
+    # heal_database() creates any that are missing on existing databases.
+    __table_args__ = (
+        # Keyset pagination: (crm_last_updated_at, opp_id) seek over live rows
+        Index("ix_opportunity_active_updated", "crm_last_updated_at", "opp_id", postgresql_where=(is_active == True)),
+        Index("ix_opportunity_active_status", "workflow_status", postgresql_where=(is_active == True)),
+        Index("ix_opportunity_active_geo", "geo", postgresql_where=(is_active == True)),
+        Index("ix_opportunity_active_stage", "stage", postgresql_where=(is_active == True)),
+        # Role-scoped dashboards: assignee first, then the tab predicate column
+        Index("ix_opportunity_active_ph", "assigned_practice_head_id", "workflow_status", postgresql_where=(is_active == True)),
+        Index("ix_opportunity_active_sh", "assigned_sales_head_id", "workflow_status", postgresql_where=(is_active == True)),
+        Index("ix_opportunity_active_sa", "assigned_sa_id", "workflow_status", postgresql_where=(is_active == True)),
+        Index("ix_opportunity_active_sp", "assigned_sp_id", "workflow_status", postgresql_where=(is_active == True)),
+    )
+
 class SyncRun(Base):
     __tablename__ = "sync_run"
     sync_run_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    status = Column(String) 
+    status = Column(String) # RUNNING, SUCCESS, PARTIAL, PAUSED, FAILED
     started_at = Column(DateTime, default=datetime.utcnow)
     ended_at = Column(DateTime, nullable=True)
     rows_upserted = Column(Integer, default=0)
     error_message = Column(Text, nullable=True)
 
+    # Run ledger: what started the run and how each stage performed
+    trigger = Column(String, nullable=True) # startup, manual, batch-sync, cli, ...
+    source = Column(String, nullable=True) # sync entry point
+    mode = Column(String, nullable=True) # FULL, INCREMENTAL
+    wall_seconds = Column(Float, default=0.0)
+    fetch_seconds = Column(Float, default=0.0)
+    map_seconds = Column(Float, default=0.0)
+    write_seconds = Column(Float, default=0.0)
+    pages = Column(Integer, default=0)
+    bytes_downloaded = Column(BigInteger, default=0)
+    records_fetched = Column(Integer, default=0)
+    inserted = Column(Integer, default=0)
+    updated = Column(Integer, default=0)
+    unchanged = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    deactivated = Column(Integer, default=0) # soft-deleted by reconciliation
+    retries = Column(Integer, default=0)
+    peak_concurrency = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index("ix_sync_run_started", "started_at"),
+    )
+
 # --- 3. ASSIGNMENT ---
 
 class OpportunityAssignment(Base):
@@ -126,6 +172,11 @@ class OppScoreVersion(Base):
     opportunity = relationship("Opportunity", back_populates="score_versions")
     section_values = relationship("OppScoreSectionValue", back_populates="score_version")
 
+    __table_args__ = (
+        # Latest-version lookups: WHERE opp_id = ? ORDER BY version_no DESC
+        Index("ix_score_version_opp_version", opp_id, version_no.desc()),
+    )
+
 class OppScoreSection(Base):
     __tablename__ = "opp_score_section"
     section_code = Column(String, primary_key=True) 
@@ -146,6 +197,11 @@ class OppScoreSectionValue(Base):
     score_version = relationship("OppScoreVersion", back_populates="section_values")
     section = relationship("OppScoreSection")
 
+    __table_args__ = (
+        # One value per section per version; save_draft upserts on it
+        Index("uq_score_values_version_section", "score_version_id", "section_code", unique=True),
+    )
+
 # --- 5. SYSTEM META ---
 
 class SyncMeta(Base):
@@ -2,25 +2,26 @@
 Batch Sync Router - Integrated into FastAPI Backend
 ====================================================
 
-This router provides endpoints for batch sync with offset tracking.
+This router drives the resumable, checkpointed full sync of the main
+opportunity table (see services/resumable_sync.py). Each committed batch
+checkpoints its last OptyId and watermark, so a restart resumes where it stopped.
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
 from pydantic import BaseModel
 from typing import Optional
-import sys
-import os
-
-# Add project root to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
-# Import the batch sync module
-from batch_sync_with_offset import (
-    batch_sync_opportunities,
-    get_sync_status,
-    reset_sync,
-    get_synced_count
+from sqlalchemy.orm import Session
+
+from backend.app.core.database import get_db
+from backend.app.services.resumable_sync import (
+    DEFAULT_BATCH_SIZE,
+    run_resumable_sync,
+    get_checkpoint,
+    reset_checkpoint,
+    count_synced
 )
+from backend.app.services.sync_state import run_tracked, is_running, snapshot, SKIPPED
+from backend.app.services.sync_events import bus
 
 router = APIRouter(prefix="/api/batch-sync", tags=["Batch Sync"])
 
@@ -30,13 +31,14 @@ router = APIRouter(prefix="/api/batch-sync", tags=["Batch Sync"])
 # ============================================================================
 
 class BatchSyncRequest(BaseModel):
-    batch_size: int = 5
+    batch_size: int = DEFAULT_BATCH_SIZE
     sync_name: str = "oracle_opportunities"
+    max_batches: Optional[int] = None
 
 
 class SyncStatusResponse(BaseModel):
     sync_name: str
-    current_offset: int
+    last_opty_id: Optional[str]
     total_synced: int
     last_sync_at: Optional[str]
     is_complete: bool
@@ -48,154 +50,142 @@ class SyncStatusResponse(BaseModel):
 # ============================================================================
 
 @router.post("/start")
-async def start_batch_sync(
+def start_batch_sync(
     request: BatchSyncRequest,
     background_tasks: BackgroundTasks
 ):
     """
-    Start batch sync with offset tracking
-    
+    Start (or resume) the checkpointed full sync in the background
+
     Args:
-        batch_size: Number of records per batch (default: 5)
+        batch_size: Records per Oracle page and bulk write (default: 500, max: 500)
         sync_name: Name of sync job (default: "oracle_opportunities")
-    
+        max_batches: Optional cap on batches for this invocation
+
     Returns:
         Status message
     """
-    try:
-        # Run sync in background
-        background_tasks.add_task(
-            batch_sync_opportunities,
-            batch_size=request.batch_size,
-            sync_name=request.sync_name
-        )
-        
-        return {
-            "status": "started",
-            "message": f"Batch sync started with batch_size={request.batch_size}",
-            "batch_size": request.batch_size,
-            "sync_name": request.sync_name
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    if is_running():
+        return {"status": "already_running", "sync_name": request.sync_name}
+
+    background_tasks.add_task(
+        run_tracked, "batch-sync", run_resumable_sync,
+        batch_size=request.batch_size,
+        sync_name=request.sync_name,
+        max_batches=request.max_batches
+    )
+
+    return {
+        "status": "started",
+        "message": f"Batch sync started with batch_size={request.batch_size}",
+        "batch_size": request.batch_size,
+        "sync_name": request.sync_name
+    }
 
 
 @router.post("/start-sync")
-async def start_batch_sync_sync(
-    batch_size: int = 5,
-    background_tasks: BackgroundTasks = None
+def start_batch_sync_sync(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batches: Optional[int] = None
 ):
     """
-    Start batch sync (synchronous) - waits for completion
-    
-    Args:
-        batch_size: Number of records per batch (default: 5)
-    
+    Start batch sync (synchronous) - waits for completion or max_batches
+
     Returns:
         Sync results
     """
-    try:
-        total_synced = batch_sync_opportunities(batch_size=batch_size)
-        
-        return {
-            "status": "complete",
-            "message": "Batch sync completed successfully",
-            "total_synced": total_synced,
-            "batch_size": batch_size
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    checkpoint = run_tracked("batch-sync", run_resumable_sync, batch_size=batch_size, max_batches=max_batches)
+    if checkpoint is SKIPPED:
+        raise HTTPException(status_code=409, detail="Another sync is running; try again after it finishes.")
+    if checkpoint is None:
+        raise HTTPException(status_code=500, detail=snapshot()["last_error"])
+
+    return {
+        "status": "complete" if checkpoint["is_complete"] else "paused",
+        "message": "Batch sync completed successfully" if checkpoint["is_complete"] else "Batch sync paused at checkpoint",
+        "total_synced": checkpoint["total_synced"],
+        "last_opty_id": checkpoint.get("last_opty_id"),
+        "batch_size": batch_size
+    }
 
 
 @router.get("/status")
-async def get_batch_sync_status(sync_name: str = "oracle_opportunities"):
+def get_batch_sync_status(sync_name: str = "oracle_opportunities", db: Session = Depends(get_db)):
     """
-    Get current batch sync status
-    
-    Args:
-        sync_name: Name of sync job (default: "oracle_opportunities")
-    
+    Get current batch sync checkpoint
+
     Returns:
         Sync status details
     """
-    try:
-        status = get_sync_status(sync_name)
-        count = get_synced_count()
-        
-        if not status:
-            return {
-                "status": "not_found",
-                "message": f"No sync state found for '{sync_name}'",
-                "total_in_db": count
-            }
-        
+    checkpoint = get_checkpoint(sync_name)
+    count = count_synced(db)
+
+    if not checkpoint:
         return {
-            "status": "success",
-            "sync_name": status["sync_name"],
-            "current_offset": status["current_offset"],
-            "total_synced": status["total_synced"],
-            "last_sync_at": str(status["last_sync_at"]) if status["last_sync_at"] else None,
-            "is_complete": status["is_complete"],
+            "status": "not_found",
+            "message": f"No sync state found for '{sync_name}'",
             "total_in_db": count
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "status": "success",
+        "sync_name": sync_name,
+        "run_status": checkpoint.get("status"),
+        "last_opty_id": checkpoint.get("last_opty_id"),
+        "total_synced": checkpoint.get("total_synced", 0),
+        "watermark": checkpoint.get("watermark"),
+        "last_sync_at": checkpoint.get("last_sync_at"),
+        "is_complete": bool(checkpoint.get("is_complete")),
+        "total_in_db": count,
+        "live": bus.current()  # latest progress event; stream it from /api/sync/events
+    }
 
 
 @router.post("/reset")
-async def reset_batch_sync(sync_name: str = "oracle_opportunities"):
+def reset_batch_sync(sync_name: str = "oracle_opportunities"):
     """
     Reset batch sync to start from beginning
-    
-    Args:
-        sync_name: Name of sync job (default: "oracle_opportunities")
-    
+
     Returns:
         Status message
     """
-    try:
-        reset_sync(sync_name)
-        
-        return {
-            "status": "success",
-            "message": f"Sync state reset for '{sync_name}'",
-            "sync_name": sync_name
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    if is_running():
+        raise HTTPException(status_code=409, detail="A sync is running; reset it after it finishes.")
+    reset_checkpoint(sync_name)
+
+    return {
+        "status": "success",
+        "message": f"Sync state reset for '{sync_name}'",
+        "sync_name": sync_name
+    }
 
 
 @router.get("/count")
-async def get_batch_sync_count():
+def get_batch_sync_count(db: Session = Depends(get_db)):
     """
-    Get count of synced opportunities in minimal_opportunities table
-    
+    Get count of active synced opportunities
+
     Returns:
         Count of synced records
     """
-    try:
-        count = get_synced_count()
-        
-        return {
-            "status": "success",
-            "count": count,
-            "table": "minimal_opportunities"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "status": "success",
+        "count": count_synced(db),
+        "table": "opportunity"
+    }
 
 
 @router.get("/health")
 async def batch_sync_health():
     """
     Health check for batch sync module
-    
+
     Returns:
         Health status
     """
     return {
         "status": "healthy",
-        "module": "batch_sync_with_offset",
+        "module": "resumable_sync",
         "endpoints": [
             "POST /api/batch-sync/start",
             "POST /api/batch-sync/start-sync",
@@ -0,0 +1,53 @@
+"""
+Liveness and readiness probes.
+
+/health        - the process is up and serving (never touches the DB or Oracle)
+/health/ready  - schema is initialized and the DB answers; 503 otherwise
+Both report the current Oracle sync state. A sync in progress does not make
+the app unready, because it serves local data while the sync catches up.
+"""
+from datetime import datetime
+from fastapi import APIRouter, Response
+from sqlalchemy import text
+from backend.app.core.database import engine
+from backend.app.services import sync_state
+from backend.app.services.adaptive_limiter import limiter_metrics
+from backend.app.services.sync_scheduler import scheduler_status
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+_startup = {"ready": False, "error": None, "ready_at": None}
+
+
+def mark_ready():
+    _startup.update(ready=True, error=None, ready_at=datetime.utcnow().isoformat())
+
+
+def mark_failed(error):
+    _startup.update(ready=False, error=str(error))
+
+
+@router.get("")
+def liveness():
+    return {"status": "ok", "sync": sync_state.snapshot(), "scheduler": scheduler_status(),
+            "oracle_concurrency": limiter_metrics()}
+
+
+@router.get("/ready")
+def readiness(response: Response):
+    db_ok, db_error = True, None
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        db_ok, db_error = False, str(e)
+
+    ready = _startup["ready"] and db_ok
+    if not ready:
+        response.status_code = 503
+    return {
+        "status": "ready" if ready else "not_ready",
+        "startup": dict(_startup),
+        "database": {"ok": db_ok, "error": db_error},
+        "sync": sync_state.snapshot(),
+    }
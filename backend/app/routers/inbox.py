@@ -47,11 +47,20 @@ def get_my_assignments(user_id: str, db: Session = Depends(get_db)):
     versions = db.query(OppScoreVersion).filter(
         OppScoreVersion.created_by_user_id == user_id
     ).order_by(desc(OppScoreVersion.version_no)).all()
+
+    assignments = db.query(OpportunityAssignment).filter(
+        OpportunityAssignment.assigned_to_user_id == user_id,
+        OpportunityAssignment.status == "ACTIVE"
+    ).all()
+
+    # Resolve every referenced opportunity in one query instead of lazy-loading per row
+    opp_ids = {v.opp_id for v in versions} | {a.opp_id for a in assignments}
+    opps_by_id = {o.opp_id: o for o in db.query(Opportunity).filter(Opportunity.opp_id.in_(opp_ids))} if opp_ids else {}
     
     processed_opp_ids = set()
     
     for v in versions:
-        o = v.opportunity
+        o = opps_by_id.get(v.opp_id)
         if not o: continue
         processed_opp_ids.add(o.opp_id)
         
@@ -68,13 +77,8 @@ def get_my_assignments(user_id: str, db: Session = Depends(get_db)):
         })
         
     # 2. Add currently assigned deals from OpportunityAssignment table
-    assignments = db.query(OpportunityAssignment).filter(
-        OpportunityAssignment.assigned_to_user_id == user_id,
-        OpportunityAssignment.status == "ACTIVE"
-    ).all()
-    
     for a in assignments:
-        o = a.opportunity
+        o = opps_by_id.get(a.opp_id)
         if not o: continue
         if o.opp_id not in processed_opp_ids:
             processed_opp_ids.add(o.opp_id)
@@ -198,9 +202,7 @@ def assign_opportunity(data: AssignInput, db: Session = Depends(get_db)):
     # Only create a new version if the latest one is already finalized (APPROVED/REJECTED).
     # Otherwise, let the new assignee join the existing active version.
     
-    last_ver = db.query(OppScoreVersion).filter(
-        OppScoreVersion.opp_id == data.opp_id
-    ).order_by(desc(OppScoreVersion.version_no)).first()
+    last_ver = db.get(OppScoreVersion, opp.latest_version_id) if opp and opp.latest_version_id else None
     
     old_values = []
     if last_ver:
@@ -1,11 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, or_, and_, func
+from sqlalchemy import func
 from typing import List, Optional, Any
 from datetime import datetime, date
 from pydantic import BaseModel
 from backend.app.core.database import get_db
-from backend.app.models import Opportunity, OpportunityAssignment, OppScoreVersion, Practice, AppUser, OppScoreSectionValue
+from backend.app.models import Opportunity, OpportunityAssignment, OppScoreVersion, Practice, AppUser
+from backend.app.services.opportunity_hydration import OpportunityHydrator, serialize_opportunity
+from backend.app.services.dashboard_tabs import role_scope, tab_filter, tab_counts
+from backend.app.services.pagination import LIST_ORDER, encode_cursor, after_cursor
+from backend.app.services.opportunity_search import search_filter, search_rank, search_opportunities
+from backend.app.services.sync_ledger import last_synced_at
 
 router = APIRouter(prefix="/api/opportunities", tags=["opportunities"])
 
@@ -32,6 +37,11 @@ def get_unique_statuses(db: Session = Depends(get_db)):
     statuses = db.query(Opportunity.workflow_status).filter(Opportunity.workflow_status.isnot(None), Opportunity.is_active == True).distinct().all()
     return [s[0] for s in statuses if s[0]]
 
+@router.get("/search")
+def search_opportunities_endpoint(q: str = Query(..., min_length=1), limit: int = Query(10, le=50), db: Session = Depends(get_db)):
+    """Ranked typeahead search over live opportunities (name, customer, number)."""
+    return search_opportunities(db, q.strip(), limit=limit)
+
 class OpportunityResponse(BaseModel):
     id: str
     remote_id: Optional[str]
@@ -66,6 +76,7 @@ class PaginatedOpportunityResponse(BaseModel):
     avg_win_prob: float = 0
     counts: Optional[dict] = None
     last_synced_at: Optional[datetime] = None
+    next_cursor: Optional[str] = None
 
 @router.get("/", response_model=PaginatedOpportunityResponse)
 def get_all_opportunities(
@@ -77,25 +88,23 @@ def get_all_opportunities(
     user_id: Optional[str] = None,
     role: Optional[str] = None,
     region: Optional[str] = None,
-    filters: Optional[str] = None # JSON string: [{"id": "col", "value": "val"}]
+    filters: Optional[str] = None, # JSON string: [{"id": "col", "value": "val"}]
+    cursor: Optional[str] = None # Opt-in keyset mode: pass "" for the first page, then next_cursor
 ):
     skip = (page - 1) * limit
+    keyset = cursor is not None
     
     # 1. Base Query
-    query = db.query(Opportunity).filter(Opportunity.is_active == True)
+    query = db.query(Opportunity)
     
     # Outer joins for filtering by names
     query = query.outerjoin(AppUser, Opportunity.sales_owner_user_id == AppUser.user_id)
     query = query.outerjoin(Practice, Opportunity.primary_practice_id == Practice.practice_id)
 
-    # 2. Search
+    # 2. Search (trigram-indexed on Postgres, ranked below)
+    search = search.strip() if search else None
     if search:
-        st = f"%{search}%"
-        query = query.filter(or_(
-            Opportunity.opp_name.ilike(st),
-            Opportunity.customer_name.ilike(st),
-            Opportunity.opp_number.ilike(st)
-        ))
+        query = query.filter(search_filter(search))
 
     # 2.1 Region Filter (High Level)
     if region and region != 'All Regions':
@@ -160,176 +169,62 @@ def get_all_opportunities(
             pass
 
     # 3. Role/Target filtering - Strictly enforced
-    if role == 'PH':
-        query = query.filter(Opportunity.assigned_practice_head_id == user_id) if user_id else query.filter(False)
-    elif role == 'SH':
-        query = query.filter(Opportunity.assigned_sales_head_id == user_id) if user_id else query.filter(False)
-    elif role == 'GH':
-        pass # Admin sees all
-    elif role in ['SA', 'SP']:
-        id_col = Opportunity.assigned_sa_id if role == 'SA' else Opportunity.assigned_sp_id
-        query = query.filter(id_col == user_id) if user_id else query.filter(False)
-
-    # 4. Tab filtering constants
-    rev_stats = ['READY_FOR_REVIEW', 'UNDER_REVIEW', 'SA_SUBMITTED', 'SP_SUBMITTED', 'PENDING_GH_APPROVAL', 'PENDING_FINAL_APPROVAL', 'SUBMITTED', 'SUBMITTED_FOR_REVIEW']
-    comp_stats = ['APPROVED', 'REJECTED', 'ACCEPTED', 'COMPLETED', 'WON', 'LOST']
-
-    # 5. Tab specific logic
+    query = query.filter(*role_scope(role, user_id))
+
+    # 4-5. Tab filtering (shared definitions with the counts below)
     tabs = tab.split(",") if tab else ["all"]
-    tab_filters = []
-    
-    for t in tabs:
-        if t == 'all':
-            tab_filters.append(True)
-        elif t in ['review', 'pending-review', 'submitted']:
-            tab_filters.append(Opportunity.workflow_status.in_(rev_stats))
-        elif t == 'completed':
-            if role == 'PH':
-                tab_filters.append(or_(Opportunity.workflow_status.in_(comp_stats), Opportunity.ph_approval_status.in_(['APPROVED', 'REJECTED', 'NOTIFIED'])))
-            elif role == 'SH':
-                tab_filters.append(or_(Opportunity.workflow_status.in_(comp_stats), Opportunity.sh_approval_status.in_(['APPROVED', 'REJECTED', 'NOTIFIED'])))
-            elif role == 'GH':
-                tab_filters.append(or_(Opportunity.workflow_status.in_(comp_stats), Opportunity.gh_approval_status.in_(['APPROVED', 'REJECTED'])))
-            elif role == 'SA':
-                tab_filters.append(or_(Opportunity.workflow_status.in_(comp_stats), Opportunity.workflow_status.in_(['SA_SUBMITTED', 'READY_FOR_REVIEW', 'UNDER_REVIEW', 'PENDING_GH_APPROVAL', 'SUBMITTED'])))
-            elif role == 'SP':
-                tab_filters.append(or_(Opportunity.workflow_status.in_(comp_stats), Opportunity.workflow_status.in_(['SP_SUBMITTED', 'READY_FOR_REVIEW', 'UNDER_REVIEW', 'PENDING_GH_APPROVAL', 'SUBMITTED'])))
-            else:
-                tab_filters.append(Opportunity.workflow_status.in_(comp_stats))
-        elif t == 'missing-ph' and role == 'GH':
-            tab_filters.append(and_(Opportunity.workflow_status.notin_(comp_stats + rev_stats), Opportunity.assigned_practice_head_id.is_(None), Opportunity.assigned_sales_head_id.isnot(None)))
-        elif t == 'missing-sh' and role == 'GH':
-            tab_filters.append(and_(Opportunity.workflow_status.notin_(comp_stats + rev_stats), Opportunity.assigned_sales_head_id.is_(None), Opportunity.assigned_practice_head_id.isnot(None)))
-        elif t in ['action-required', 'unassigned', 'needs-action']:
-            # Action Required means: Outstanding task for THIS role
-            tf = (or_(Opportunity.workflow_status.notin_(comp_stats + rev_stats), Opportunity.workflow_status.is_(None)))
-            if role == 'PH': tf = and_(tf, Opportunity.assigned_sa_id.is_(None))
-            elif role == 'SH': tf = and_(tf, Opportunity.assigned_sp_id.is_(None))
-            elif role == 'GH':
-                if t == 'unassigned': tf = and_(tf, Opportunity.assigned_practice_head_id.is_(None), Opportunity.assigned_sales_head_id.is_(None))
-                else: tf = and_(tf, or_(Opportunity.assigned_practice_head_id.is_(None), Opportunity.assigned_sales_head_id.is_(None)))
-            elif role in ['SA', 'SP']:
-                tf = and_(tf, or_(Opportunity.workflow_status.notin_(['UNDER_ASSESSMENT', 'IN_ASSESSMENT'] + rev_stats + comp_stats), Opportunity.workflow_status.is_(None)))
-            tab_filters.append(tf)
-        elif t == 'in-progress':
-            tf = (or_(Opportunity.workflow_status.notin_(comp_stats + rev_stats), Opportunity.workflow_status.is_(None)))
-            if role == 'PH': tf = and_(tf, Opportunity.assigned_sa_id.isnot(None))
-            elif role == 'SH': tf = and_(tf, Opportunity.assigned_sp_id.isnot(None))
-            elif role in ['SA', 'SP']: tf = and_(tf, Opportunity.workflow_status.in_(['UNDER_ASSESSMENT', 'IN_ASSESSMENT']))
-            else: tf = and_(tf, or_(Opportunity.assigned_practice_head_id.isnot(None), Opportunity.assigned_sales_head_id.isnot(None)))
-            tab_filters.append(tf)
-
-    if tab_filters:
-        query = query.filter(or_(*tab_filters))
-
-    # 6. Pagination and Metrics
-    total_count = query.count()
-    pipeline_value = db.query(func.sum(Opportunity.deal_value)).filter(Opportunity.opp_id.in_(query.with_entities(Opportunity.opp_id))).scalar() or 0
-    
-    # Role-based Tab Counts (Dynamic)
-    base_role = db.query(Opportunity).filter(Opportunity.is_active == True)
-    if role == 'PH':
-        base_role = base_role.filter(Opportunity.assigned_practice_head_id == user_id) if user_id else base_role.filter(False)
-    elif role == 'SH':
-        base_role = base_role.filter(Opportunity.assigned_sales_head_id == user_id) if user_id else base_role.filter(False)
-    elif role in ['SA', 'SP']:
-        id_col = Opportunity.assigned_sa_id if role == 'SA' else Opportunity.assigned_sp_id
-        base_role = base_role.filter(id_col == user_id) if user_id else base_role.filter(False)
-
-    if role == 'PH':
-        f_comp = base_role.filter(or_(Opportunity.workflow_status.in_(comp_stats), Opportunity.ph_approval_status.in_(['APPROVED', 'REJECTED', 'NOTIFIED']))).count()
-        f_rev = base_role.filter(Opportunity.workflow_status.in_(rev_stats)).count()
-        
-        # Action Required for PH: Missing Assignment OR Pending Approval
-        f_act_assign = base_role.filter(and_(Opportunity.workflow_status.notin_(comp_stats + rev_stats), Opportunity.assigned_sa_id.is_(None))).count()
-        f_act_approve = base_role.filter(and_(Opportunity.workflow_status.in_(rev_stats), Opportunity.ph_approval_status == 'PENDING')).count()
-        f_act = f_act_assign + f_act_approve
-        
-        f_prog = base_role.filter(and_(Opportunity.workflow_status.notin_(comp_stats + rev_stats), Opportunity.assigned_sa_id.isnot(None))).count()
-        counts = {
-            "all": base_role.count(),
-            "action-required": f_act,
-            "in-progress": f_prog,
-            "review": f_rev,
-            "completed": f_comp
-        }
-    elif role == 'SH':
-        f_comp = base_role.filter(or_(Opportunity.workflow_status.in_(comp_stats), Opportunity.sh_approval_status.in_(['APPROVED', 'REJECTED', 'NOTIFIED']))).count()
-        f_rev = base_role.filter(Opportunity.workflow_status.in_(rev_stats)).count()
-        
-        # Action Required for SH: Missing Assignment OR Pending Approval
-        f_act_assign = base_role.filter(and_(Opportunity.workflow_status.notin_(comp_stats + rev_stats), Opportunity.assigned_sp_id.is_(None))).count()
-        f_act_approve = base_role.filter(and_(Opportunity.workflow_status.in_(rev_stats), Opportunity.sh_approval_status == 'PENDING')).count()
-        f_act = f_act_assign + f_act_approve
-        
-        f_prog = base_role.filter(and_(Opportunity.workflow_status.notin_(comp_stats + rev_stats), Opportunity.assigned_sp_id.isnot(None))).count()
-        counts = {
-            "all": base_role.count(),
-            "action-required": f_act,
-            "in-progress": f_prog,
-            "review": f_rev,
-            "completed": f_comp
-        }
-    elif role in ['SA', 'SP']:
-        # Dual Visibility for Executors
-        if role == 'SA':
-            f_comp = base_role.filter(or_(Opportunity.workflow_status.in_(comp_stats), Opportunity.workflow_status.in_(['SA_SUBMITTED', 'READY_FOR_REVIEW', 'UNDER_REVIEW', 'PENDING_GH_APPROVAL', 'SUBMITTED']))).count()
-        else:
-            f_comp = base_role.filter(or_(Opportunity.workflow_status.in_(comp_stats), Opportunity.workflow_status.in_(['SP_SUBMITTED', 'READY_FOR_REVIEW', 'UNDER_REVIEW', 'PENDING_GH_APPROVAL', 'SUBMITTED']))).count()
-            
-        f_sub = base_role.filter(Opportunity.workflow_status.in_(rev_stats)).count()
-        f_prog = base_role.filter(Opportunity.workflow_status.in_(['UNDER_ASSESSMENT', 'IN_ASSESSMENT'])).count()
-        f_act = base_role.filter(and_(Opportunity.workflow_status.notin_(comp_stats + rev_stats + ['UNDER_ASSESSMENT', 'IN_ASSESSMENT']), Opportunity.workflow_status.isnot(None))).count()
-        counts = {
-            "all": base_role.count(),
-            "action-required": f_act,
-            "needs-action": f_act,
-            "in-progress": f_prog,
-            "submitted": f_sub,
-            "completed": f_comp
-        }
-    else:
-        # GH (Global Head) counts
-        f_rev = Opportunity.workflow_status.in_(rev_stats)
-        f_comp = or_(Opportunity.workflow_status.in_(comp_stats), Opportunity.gh_approval_status.in_(['APPROVED', 'REJECTED']))
-        f_open = and_(Opportunity.workflow_status.notin_(comp_stats + rev_stats), Opportunity.workflow_status.isnot(None))
-        
-        f_no_ph = Opportunity.assigned_practice_head_id.is_(None)
-        f_no_sh = Opportunity.assigned_sales_head_id.is_(None)
-        
-        counts = {
-            "all": base_role.count(),
-            "unassigned": base_role.filter(and_(f_open, f_no_ph, f_no_sh)).count(),
-            "missing-ph": base_role.filter(and_(f_open, f_no_ph, ~f_no_sh)).count(),
-            "missing-sh": base_role.filter(and_(f_open, ~f_no_ph, f_no_sh)).count(),
-            "review": base_role.filter(f_rev).count(),
-            "pending-review": base_role.filter(f_rev).count(),
-            "completed": base_role.filter(f_comp).count()
-        }
-        counts['in-progress'] = base_role.filter(and_(f_open, or_(~f_no_ph, ~f_no_sh))).count()
-        counts['action-required'] = counts['unassigned'] + counts['missing-ph'] + counts['missing-sh']
+    tab_pred = tab_filter(tabs, role)
+    if tab_pred is not None:
+        query = query.filter(tab_pred)
+
+    # 6. Role-based Tab Counts (single aggregate pass)
+    counts = tab_counts(db, role, user_id)
 
     # 7. Execute Query & Format results ( restoring Detailed data)
-    opps = query.order_by(desc(Opportunity.crm_last_updated_at)).offset(skip).limit(limit).all()
+    # Filter-wide totals ride along with the page rows as window aggregates,
+    # so the filter is evaluated once instead of three times.
+    win_prob = func.coalesce(Opportunity.latest_overall_score, 0)
+    metrics_query = query
+
+    # Most relevant first when searching; keyset mode keeps the stable listing order
+    page_order = (search_rank(db, search).desc(),) + LIST_ORDER if search else LIST_ORDER
+
+    next_cursor = None
+    if keyset:
+        # Keyset mode: seek past the cursor on the composite index; totals span the whole filter
+        page_query = query
+        if cursor:
+            try:
+                page_query = page_query.filter(after_cursor(cursor))
+            except ValueError as e:
+                raise HTTPException(400, str(e))
+        opps = page_query.order_by(*LIST_ORDER).limit(limit + 1).all()
+        if len(opps) > limit:
+            opps = opps[:limit]
+            next_cursor = encode_cursor(opps[-1])
+        rows = []
+    else:
+        rows = metrics_query.add_columns(
+            func.count().over().label("total_count"),
+            func.sum(Opportunity.deal_value).over().label("total_value"),
+            func.avg(win_prob).over().label("avg_win_prob")
+        ).order_by(*page_order).offset(skip).limit(limit).all()
+        opps = [r[0] for r in rows]
+
+    if rows:
+        total_count, pipeline_value, avg_win_prob = rows[0][1], rows[0][2], rows[0][3]
+    else:
+        # Keyset mode, or a page past the end: one plain aggregate over the same filter
+        total_count, pipeline_value, avg_win_prob = metrics_query.with_entities(
+            func.count(), func.sum(Opportunity.deal_value), func.avg(win_prob)
+        ).one()
+
+    hydrator = OpportunityHydrator(db, opps)
     results = []
     
     for o in opps:
-        # Resolve Practice
-        practice_name = "General"
-        if o.primary_practice_id:
-            practice = db.query(Practice).filter(Practice.practice_id == o.primary_practice_id).first()
-            if practice: practice_name = practice.practice_name
-        
-        # Resolve Owner/Names
-        def gname(uid):
-            if not uid: return None
-            u = db.query(AppUser).filter(AppUser.user_id == uid).first()
-            return u.display_name if u else uid
-
-        sales_owner_name = gname(o.sales_owner_user_id) or "N/A"
-        
         # Resolve Latest Score & More Logical Status
-        latest_score = db.query(OppScoreVersion).filter(OppScoreVersion.opp_id == o.opp_id).order_by(desc(OppScoreVersion.version_no)).first()
+        latest_score = hydrator.latest_version(o.opp_id)
         
         status = o.workflow_status
         if not status or status == 'OPEN':
@@ -340,43 +235,19 @@ def get_all_opportunities(
             else:
                 status = "NEW"
         
-        results.append({
-            "id": o.opp_id,
-            "row_id": o.opp_id,
-            "remote_id": o.opp_number or "N/A",
-            "name": o.opp_name,
-            "customer": o.customer_name,
-            "practice": practice_name,
-            "deal_value": o.deal_value or 0.0,
-            "currency": o.currency or "USD",
-            "workflow_status": status,
-            "sales_stage": o.stage or "Qualifying",
-            "geo": o.geo or "Global",
-            "close_date": o.close_date.strftime("%Y-%m-%d") if o.close_date else None,
-            "sales_owner": sales_owner_name,
-            "assigned_practice_head": gname(o.assigned_practice_head_id),
-            "assigned_sales_head": gname(o.assigned_sales_head_id),
-            "assigned_sa": gname(o.assigned_sa_id),
-            "assigned_sp": gname(o.assigned_sp_id),
-            "win_probability": latest_score.overall_score if latest_score else 0,
-            "version_no": latest_score.version_no if latest_score else None,
-            "gh_approval_status": o.gh_approval_status or 'PENDING',
-            "ph_approval_status": o.ph_approval_status or 'PENDING',
-            "sh_approval_status": o.sh_approval_status or 'PENDING',
-            "assigned_practice_head_id": o.assigned_practice_head_id,
-            "assigned_sales_head_id": o.assigned_sales_head_id,
-            "combined_submission_ready": o.combined_submission_ready or False
-        })
+        results.append(serialize_opportunity(o, hydrator, status))
         
-    # Query latest sync
-    last_sync = db.query(func.max(Opportunity.local_last_synced_at)).scalar()
+    # Latest finished sync (run ledger; no-op syncs do not touch the rows)
+    last_sync = last_synced_at(db)
 
     return {
         "items": results,
-        "total_count": total_count,
-        "total_value": pipeline_value,
+        "total_count": total_count or 0,
+        "total_value": float(pipeline_value or 0),
+        "avg_win_prob": round(float(avg_win_prob or 0), 2),
         "counts": counts,
-        "last_synced_at": last_sync
+        "last_synced_at": last_sync,
+        "next_cursor": next_cursor
     }
 
 @router.get("/{opp_id}", response_model=OpportunityResponse)
@@ -384,30 +255,13 @@ def get_opportunity_by_id(opp_id: str, db: Session = Depends(get_db)):
     o = db.query(Opportunity).filter(Opportunity.opp_id == opp_id).first()
     if not o: raise HTTPException(404, "Opportunity not found")
 
-    # Resolve Practice
-    practice_name = "General"
-    if o.primary_practice_id:
-        practice = db.query(Practice).filter(Practice.practice_id == o.primary_practice_id).first()
-        if practice: practice_name = practice.practice_name
-    
-    # Resolve Owner/Names
-    def gname(uid):
-        if not uid: return None
-        u = db.query(AppUser).filter(AppUser.user_id == uid).first()
-        return u.display_name if u else uid
+    hydrator = OpportunityHydrator(db, [o], with_ratings=True)
 
-    sales_owner_name = gname(o.sales_owner_user_id) or "N/A"
-    
     # Resolve Latest Score & More Logical Status
-    latest_score = db.query(OppScoreVersion).filter(OppScoreVersion.opp_id == o.opp_id).order_by(desc(OppScoreVersion.version_no)).first()
+    latest_score = hydrator.latest_version(o.opp_id)
     
     # Check if any actual scores have been entered
-    has_ratings = False
-    if latest_score:
-        has_ratings = db.query(OppScoreSectionValue).filter(
-            OppScoreSectionValue.score_version_id == latest_score.score_version_id,
-            OppScoreSectionValue.score > 0
-        ).first() is not None
+    has_ratings = hydrator.has_ratings(latest_score)
 
     status = o.workflow_status
     if not status or status in ['OPEN', 'ASSIGNED_TO_SA', 'ASSIGNED_TO_SP', 'UNDER_ASSESSMENT']:
@@ -428,33 +282,7 @@ def get_opportunity_by_id(opp_id: str, db: Session = Depends(get_db)):
             else:
                 status = "NEW"
     
-    return {
-        "id": o.opp_id,
-        "row_id": o.opp_id,
-        "remote_id": o.opp_number or "N/A",
-        "name": o.opp_name,
-        "customer": o.customer_name,
-        "practice": practice_name,
-        "deal_value": o.deal_value or 0.0,
-        "currency": o.currency or "USD",
-        "workflow_status": status,
-        "sales_stage": o.stage or "Qualifying",
-        "geo": o.geo or "Global",
-        "close_date": o.close_date.strftime("%Y-%m-%d") if o.close_date else None,
-        "sales_owner": sales_owner_name,
-        "assigned_practice_head": gname(o.assigned_practice_head_id),
-        "assigned_sales_head": gname(o.assigned_sales_head_id),
-        "assigned_sa": gname(o.assigned_sa_id),
-        "assigned_sp": gname(o.assigned_sp_id),
-        "win_probability": latest_score.overall_score if latest_score else 0,
-        "version_no": latest_score.version_no if latest_score else None,
-        "gh_approval_status": o.gh_approval_status or 'PENDING',
-        "ph_approval_status": o.ph_approval_status or 'PENDING',
-        "sh_approval_status": o.sh_approval_status or 'PENDING',
-        "assigned_practice_head_id": o.assigned_practice_head_id,
-        "assigned_sales_head_id": o.assigned_sales_head_id,
-        "combined_submission_ready": o.combined_submission_ready or False
-    }
+    return serialize_opportunity(o, hydrator, status)
 
 # --- Action Endpoints ---
 
@@ -486,7 +314,7 @@ def assign_role(opp_id: str, req: AssignRequest, db: Session = Depends(get_db)):
 
     # Reset submission flags for the active version if an executor is being assigned
     if req.role in ['SA', 'SP']:
-        latest = db.query(OppScoreVersion).filter(OppScoreVersion.opp_id == opp_id).order_by(desc(OppScoreVersion.version_no)).first()
+        latest = db.get(OppScoreVersion, opp.latest_version_id) if opp.latest_version_id else None
         if latest:
             if req.role == 'SA': latest.sa_submitted = False
             if req.role == 'SP': latest.sp_submitted = False
@@ -526,7 +354,7 @@ def process_approval(opp_id: str, req: ApprovalRequest, db: Session = Depends(ge
     elif req.role == 'SH': opp.sh_approval_status = decision
     
     # Persistent Audit Log: Update latest version with decision
-    latest_ver = db.query(OppScoreVersion).filter(OppScoreVersion.opp_id == opp_id).order_by(desc(OppScoreVersion.version_no)).first()
+    latest_ver = db.get(OppScoreVersion, opp.latest_version_id) if opp.latest_version_id else None
     if latest_ver:
         decision_label = f"[{req.role} {decision}]"
         current_comment = latest_ver.summary_comment or ""
@@ -1,13 +1,21 @@
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session, aliased, selectinload
+from sqlalchemy import desc, exists, select
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
-from sqlalchemy import func
-from backend.app.core.database import get_db
-from backend.app.models import OppScoreVersion, OppScoreSectionValue, OppScoreSection, Opportunity, AppUser
+import hashlib
+import json
+import uuid
+from backend.app.core.database import dialect_insert, get_db
+from backend.app.models import OppScoreVersion, OppScoreSectionValue, Opportunity, AppUser
+from backend.app.services.scoring_analytics import (
+    fast_track_mask, load_score_matrix, overall_scores, recompute_overall_scores,
+    score_distribution, section_stats,
+)
+from backend.app.services.section_catalog import section_catalog
 
 router = APIRouter(prefix="/api/scoring", tags=["scoring"])
 
@@ -25,8 +33,98 @@ class ScoreInput(BaseModel):
     summary_comment: Optional[str] = None
     attachment_name: Optional[str] = None
 
+def _etag_response(request: Request, response: Response, payload, etag=None):
+    """Returns payload with an ETag (content hash unless given), or a bare 304 if the client has it."""
+    if etag is None:
+        body = json.dumps(jsonable_encoder(payload), sort_keys=True)
+        etag = hashlib.sha1(body.encode()).hexdigest()[:16]
+    etag = f'"{etag}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return payload
+
+@router.get("/sections")
+def get_sections(request: Request, response: Response):
+    """
+    The scoring-section catalog (codes, names, weights, display order).
+    Served from memory with an ETag of the catalog version, so clients
+    revalidate with If-None-Match and get a 304 until the catalog changes.
+    """
+    version = section_catalog.version()
+    return _etag_response(request, response, {"version": version, "sections": section_catalog.sections()}, version)
+
+@router.get("/analytics")
+def get_scoring_analytics(
+    scope: str = Query("latest", pattern="^(latest|all)$"),
+    status: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Portfolio score analytics: overall-score distribution (with fast-track band
+    membership) and per-section mean/variance. scope=latest covers each active
+    opportunity's latest version; scope=all every version. Filter with ?status=.
+    """
+    matrix = load_score_matrix(db, latest_only=(scope == "latest"), statuses=status)
+    scores = overall_scores(matrix)
+    return {
+        "scope": scope,
+        "catalog_version": section_catalog.version(db),
+        "versions": len(matrix),
+        "overall": score_distribution(scores),
+        "sections": section_stats(matrix),
+    }
+
+@router.post("/analytics/recompute")
+def recompute_scores(db: Session = Depends(get_db)):
+    """Re-derives every stored overall_score with the current section weights, in one batch."""
+    changed = recompute_overall_scores(db)
+    db.commit()
+    return {"status": "success", "changed": changed, "catalog_version": section_catalog.version(db)}
+
+def _latest_row(db: Session, opp_id: str, version: Optional[int]):
+    """
+    One statement: the opportunity's SA/SP submission flags, the requested (or latest)
+    version and the version before it. Section values follow in one selectin query.
+    """
+    target = aliased(OppScoreVersion)
+    prev = aliased(OppScoreVersion)
+    if version:
+        target_id = select(OppScoreVersion.score_version_id).where(
+            OppScoreVersion.opp_id == Opportunity.opp_id,
+            OppScoreVersion.version_no == version
+        ).order_by(desc(OppScoreVersion.created_at)).limit(1).correlate(Opportunity).scalar_subquery()
+    else:
+        target_id = Opportunity.latest_version_id
+    prev_id = select(OppScoreVersion.score_version_id).where(
+        OppScoreVersion.opp_id == target.opp_id,
+        OppScoreVersion.version_no < target.version_no
+    ).order_by(desc(OppScoreVersion.version_no)).limit(1).correlate(target).scalar_subquery()
+
+    def submitted_by(user_col):
+        # Has this assignee submitted any version, regardless of which one we are looking at?
+        return exists().where(
+            OppScoreVersion.opp_id == Opportunity.opp_id,
+            OppScoreVersion.created_by_user_id == user_col,
+            OppScoreVersion.status.in_(["SUBMITTED", "APPROVED", "REJECTED"])
+        ).correlate(Opportunity)
+
+    return db.query(
+        target, prev,
+        submitted_by(Opportunity.assigned_sa_id).label("sa_submitted"),
+        submitted_by(Opportunity.assigned_sp_id).label("sp_submitted"),
+    ).select_from(Opportunity) \
+        .join(target, target.score_version_id == target_id) \
+        .outerjoin(prev, prev.score_version_id == prev_id) \
+        .filter(Opportunity.opp_id == opp_id) \
+        .options(selectinload(target.section_values)) \
+        .first()
+
 @router.get("/{opp_id}/latest")
 def get_latest_score(
+    request: Request,
+    response: Response,
     opp_id: str, 
     user_id: Optional[str] = Query(None), 
     version: Optional[int] = Query(None),
@@ -35,17 +133,11 @@ def get_latest_score(
     """
     Returns the latest assessment version for this user/opportunity.
     If 'version' is provided, returns that specific version.
+    Assembled from two queries; the ETag lets the wizard revalidate with a 304.
     """
-    query = db.query(OppScoreVersion).filter(OppScoreVersion.opp_id == opp_id)
-    latest = None
-    
-    if version:
-        latest = query.filter(OppScoreVersion.version_no == version).order_by(desc(OppScoreVersion.created_at)).first()
-    else:
-        # Prioritize the overall latest version, regardless of who started it
-        latest = query.order_by(desc(OppScoreVersion.version_no), desc(OppScoreVersion.created_at)).first()
-
-    if not latest: return {"status": "NOT_STARTED", "sections": []}
+    row = _latest_row(db, opp_id, version)
+    if not row: return {"status": "NOT_STARTED", "sections": []}
+    latest, prev, global_sa_submitted, global_sp_submitted = row
     
     # LOGIC FIX: If an assessment is marked "SUBMITTED" but has no section values, 
     # it's likely a stale or dummy record. Treat it as NOT_STARTED to allow the user to fill it.
@@ -55,15 +147,13 @@ def get_latest_score(
     # Simple serialization
     sections = []
     value_map = {v.section_code: v for v in latest.section_values}
-    # Get definitions to ensure structure
-    defs = db.query(OppScoreSection).order_by(OppScoreSection.display_order).all()
-    
-    for d in defs:
-        val = value_map.get(d.section_code)
+    # Definitions (cached catalog) to ensure structure
+    for d in section_catalog.sections(db):
+        val = value_map.get(d["section_code"])
         sections.append({
-            "section_code": d.section_code,
-            "section_name": d.section_name,
-            "weight": d.weight,
+            "section_code": d["section_code"],
+            "section_name": d["section_name"],
+            "weight": d["weight"],
             "score": val.score if val else 0,
             "notes": val.notes if val else "",
             "selected_reasons": val.selected_reasons if val else []
@@ -76,13 +166,8 @@ def get_latest_score(
     if not has_ratings:
         current_status = "NOT_STARTED"
         
-    # Get Previous Version for Summary Block
+    # Previous Version for Summary Block
     prev_assessment = None
-    prev = db.query(OppScoreVersion).filter(
-        OppScoreVersion.opp_id == opp_id, 
-        OppScoreVersion.version_no < latest.version_no
-    ).order_by(desc(OppScoreVersion.version_no)).first()
-    
     if prev:
         prev_assessment = {
             "version_no": prev.version_no,
@@ -94,34 +179,7 @@ def get_latest_score(
             "created_by": prev.created_by_user_id
         }
 
-    # GLOBAL STATUS CHECK:
-    # We need to know if SA/SP have submitted, regardless of which version we are looking at.
-    opp_obj = db.query(Opportunity).filter(Opportunity.opp_id == opp_id).first()
-    
-    global_sa_submitted = False
-    global_sp_submitted = False
-    
-    if opp_obj:
-        sa_id = opp_obj.assigned_sa_id
-        sp_id = opp_obj.assigned_sp_id
-        
-        if sa_id:
-            sa_ver = db.query(OppScoreVersion).filter(
-                OppScoreVersion.opp_id == opp_id,
-                OppScoreVersion.created_by_user_id == sa_id,
-                OppScoreVersion.status.in_(["SUBMITTED", "APPROVED", "REJECTED"])
-            ).first()
-            if sa_ver: global_sa_submitted = True
-            
-        if sp_id:
-            sp_ver = db.query(OppScoreVersion).filter(
-                OppScoreVersion.opp_id == opp_id,
-                OppScoreVersion.created_by_user_id == sp_id,
-                OppScoreVersion.status.in_(["SUBMITTED", "APPROVED", "REJECTED"])
-            ).first()
-            if sp_ver: global_sp_submitted = True
-
-    return {
+    return _etag_response(request, response, {
         "status": current_status,
         "version_no": latest.version_no,
         "overall_score": latest.overall_score if has_ratings else 0,
@@ -129,39 +187,29 @@ def get_latest_score(
         "recommendation": latest.recommendation,
         "summary_comment": latest.summary_comment,
         "attachment_name": latest.attachment_name,
-        "sa_submitted": global_sa_submitted,
-        "sp_submitted": global_sp_submitted,
+        "sa_submitted": bool(global_sa_submitted),
+        "sp_submitted": bool(global_sp_submitted),
         "sections": sections,
         "prev_assessment": prev_assessment
-    }
+    })
 
-@router.post("/{opp_id}/draft")
-def save_draft(opp_id: str, data: ScoreInput, db: Session = Depends(get_db)):
-    # Fetch opp to check workflow status later
-    opp = db.query(Opportunity).filter(Opportunity.opp_id == opp_id).first()
-    if not opp:
+def _write_draft(db: Session, opp_id: str, data: ScoreInput):
+    """
+    Writes the draft into the shared version for the current round without committing.
+    Statements: one SELECT for the opportunity and its latest version, the version
+    INSERT/UPDATE, and one upsert of all section values.
+    Returns (opp, draft, saved_count).
+    """
+    # 1. Opportunity plus its latest version (projection), in one query
+    row = db.query(Opportunity, OppScoreVersion).outerjoin(
+        OppScoreVersion, OppScoreVersion.score_version_id == Opportunity.latest_version_id
+    ).filter(Opportunity.opp_id == opp_id).first()
+    if not row:
         raise HTTPException(404, "Opportunity not found")
-    # 1. Find the latest version FOR THIS USER
-    last = db.query(OppScoreVersion).filter(
-        OppScoreVersion.opp_id == opp_id,
-        OppScoreVersion.created_by_user_id == data.user_id
-    ).order_by(desc(OppScoreVersion.version_no)).first()
-    
-    # 2. Reuse latest version if it's not fully finalized
-    # Fully finalized = APPROVED, REJECTED
-    # If I have a draft that is UNDER_ASSESSMENT vs SUBMITTED...
-    
-    # Find the global latest version number for this opportunity (across all users)
-    global_max_ver = db.query(func.max(OppScoreVersion.version_no)).filter(OppScoreVersion.opp_id == opp_id).scalar() or 0
-    target_ver_no = global_max_ver if global_max_ver > 0 else 1
-    
-    # Collaborative check: Is the current version finalized?
-    # If ANY record for this version is APPROVED/REJECTED, it means the round is closed.
-    current_ver_record = db.query(OppScoreVersion).filter(
-        OppScoreVersion.opp_id == opp_id,
-        OppScoreVersion.version_no == target_ver_no
-    ).order_by(desc(OppScoreVersion.created_at)).first()
+    opp, current_ver_record = row
 
+    # 2. Reuse the round's version unless it is finalized (APPROVED/REJECTED closes the round)
+    target_ver_no = current_ver_record.version_no if current_ver_record else 1
     if current_ver_record and current_ver_record.status in ['APPROVED', 'REJECTED']:
         target_ver_no += 1
         current_ver_record = None
@@ -189,54 +237,41 @@ def save_draft(opp_id: str, data: ScoreInput, db: Session = Depends(get_db)):
             created_by_user_id=data.user_id
         )
         db.add(draft)
-        db.flush() # Get score_version_id
-        
-    db.flush()
-    
+
     draft.confidence_level = data.confidence_level
     draft.recommendation = data.recommendation
     draft.summary_comment = data.summary_comment
     draft.attachment_name = data.attachment_name
-    
-    valid_sections = {s.section_code: s.section_code for s in db.query(OppScoreSection).all()}
-    # Support Mapping for frontend descriptive keys to backend codes
-    section_map = {
-        "strategic_fit": "STRAT",
-        "win_probability": "WIN",
-        "financial_value": "FIN",
-        "competitive_position": "COMP",
-        "delivery_feasibility": "FEAS",
-        "customer_relationship": "CUST",
-        "risk_exposure": "RISK",
-        "compliance": "PROD",
-        "legal_readiness": "LEGAL"
-    }
-    
-    saved_count = 0
+    db.flush() # Get score_version_id
+
+    # 3. Upsert every submitted section in one statement (last entry wins per section)
+    values = {}
     for s in data.sections:
-        code = section_map.get(s.section_code, s.section_code) # Map or use default
-        if code not in valid_sections:
+        code = section_catalog.resolve(s.section_code, db) # Map frontend keys to codes
+        if code is None:
             continue
+        values[code] = {
+            "score_value_id": str(uuid.uuid4()),
+            "score_version_id": draft.score_version_id,
+            "section_code": code,
+            "score": s.score,
+            "notes": s.notes,
+            "selected_reasons": s.selected_reasons,
+        }
+    if values:
+        insert = dialect_insert(db)
+        stmt = insert(OppScoreSectionValue.__table__).values(list(values.values()))
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["score_version_id", "section_code"],
+            set_={c: stmt.excluded[c] for c in ("score", "notes", "selected_reasons")},
+        ))
+        # The upsert bypasses the ORM; drop any stale loaded collection
+        db.expire(draft, ["section_values"])
+    return opp, draft, len(values)
 
-        val = db.query(OppScoreSectionValue).filter(
-            OppScoreSectionValue.score_version_id == draft.score_version_id, 
-            OppScoreSectionValue.section_code == code
-        ).first()
-        
-        if val:
-            val.score = s.score
-            val.notes = s.notes
-            val.selected_reasons = s.selected_reasons 
-        else:
-            db.add(OppScoreSectionValue(
-                score_version_id=draft.score_version_id, 
-                section_code=code, 
-                score=s.score, 
-                notes=s.notes,
-                selected_reasons=s.selected_reasons 
-            ))
-        saved_count += 1
-            
+@router.post("/{opp_id}/draft")
+def save_draft(opp_id: str, data: ScoreInput, db: Session = Depends(get_db)):
+    _, draft, saved_count = _write_draft(db, opp_id, data)
     db.commit()
     return {"status": "success", "saved_count": saved_count, "version_no": draft.version_no}
 
@@ -244,25 +279,17 @@ def save_draft(opp_id: str, data: ScoreInput, db: Session = Depends(get_db)):
 def submit_score(opp_id: str, data: ScoreInput, db: Session = Depends(get_db)):
     # 0. Pre-fetch Data
     user = db.query(AppUser).filter(AppUser.user_id == data.user_id).first()
-    opp = db.query(Opportunity).filter(Opportunity.opp_id == opp_id).first()
-    if not user or not opp: raise HTTPException(404, "Data mismatch")
+    if not user: raise HTTPException(404, "Data mismatch")
 
-    # 1. Save current changes
-    save_draft(opp_id, data, db) 
-    
-    # 2. Get active shared draft
-    draft = db.query(OppScoreVersion).filter(
-        OppScoreVersion.opp_id == opp_id
-    ).order_by(desc(OppScoreVersion.version_no)).first()
-    
-    if not draft:
-        raise HTTPException(400, "No active draft to submit")
+    # 1. Save current changes into the active shared draft
+    opp, draft, _ = _write_draft(db, opp_id, data)
     
     if draft.status in ["APPROVED", "REJECTED"]:
         raise HTTPException(400, "Cannot re-submit a finalized assessment (Approved/Rejected).")
 
     # Workflow status check to prevent submission after final decision
     if opp.workflow_status in ['APPROVED', 'REJECTED']:
+         db.commit() # The draft is still saved
          raise HTTPException(400, "Opportunity is already finalized.")
     
     # 3. Determine Role and Update Flags
@@ -273,20 +300,9 @@ def submit_score(opp_id: str, data: ScoreInput, db: Session = Depends(get_db)):
     if is_sa: draft.sa_submitted = True
     if is_sp: draft.sp_submitted = True
     
-    # Calculate Weighted Score
-    total_w, weighted_s = 0, 0
-    from sqlalchemy.orm import joinedload
-    vals = db.query(OppScoreSectionValue).options(joinedload(OppScoreSectionValue.section)).filter(
-        OppScoreSectionValue.score_version_id == draft.score_version_id
-    ).all()
-    
-    for v in vals:
-        if v.section:
-            weighted_s += (v.score * v.section.weight)
-            total_w += v.section.weight
-    
-    max_s = total_w * 5
-    draft.overall_score = int((weighted_s / max_s) * 100) if max_s > 0 else 0
+    # Calculate Weighted Score (weights from the cached catalog)
+    matrix = load_score_matrix(db, version_ids=[draft.score_version_id])
+    draft.overall_score = int(overall_scores(matrix)[0]) if len(matrix) else 0
     
     # Check Combined Completion
     sa_id = opp.assigned_sa_id
@@ -297,8 +313,7 @@ def submit_score(opp_id: str, data: ScoreInput, db: Session = Depends(get_db)):
     sp_done = (sp_id is None) or draft.sp_submitted
 
     # Fast Track Logic (3.5 - 4.0)
-    score_5 = (draft.overall_score / 100.0) * 5.0
-    is_fast_track = (3.5 <= score_5 <= 4.0)
+    is_fast_track = bool(fast_track_mask(draft.overall_score))
 
     if sa_done and sp_done:
         # FULL SUBMISSION - Only if there is at least one actual submission
@@ -347,11 +362,10 @@ def get_combined_score(opp_id: str, version_no: Optional[int] = Query(None), db:
     sp_id = opp.assigned_sp_id
     
     # Fetch only the single shared version record
-    q = db.query(OppScoreVersion).filter(OppScoreVersion.opp_id == opp_id)
     if version_no:
-        ver = q.filter(OppScoreVersion.version_no == version_no).first()
+        ver = db.query(OppScoreVersion).filter(OppScoreVersion.opp_id == opp_id, OppScoreVersion.version_no == version_no).first()
     else:
-        ver = q.order_by(desc(OppScoreVersion.version_no)).first()
+        ver = db.get(OppScoreVersion, opp.latest_version_id) if opp.latest_version_id else None
 
     # Helper to serialize
     def serialize_ver(v):
@@ -446,7 +460,8 @@ def get_scoring_history(opp_id: str, db: Session = Depends(get_db)):
 @router.post("/{opp_id}/new-version")
 def create_new_version(opp_id: str, db: Session = Depends(get_db)):
     # 1. Get the latest version (regardless of status)
-    last = db.query(OppScoreVersion).filter(OppScoreVersion.opp_id == opp_id).order_by(desc(OppScoreVersion.version_no)).first()
+    opp = db.query(Opportunity).filter(Opportunity.opp_id == opp_id).first()
+    last = db.get(OppScoreVersion, opp.latest_version_id) if opp and opp.latest_version_id else None
     
     if not last:
         raise HTTPException(400, "No existing assessment version found to clone.")
@@ -480,9 +495,7 @@ def create_new_version(opp_id: str, db: Session = Depends(get_db)):
         ))
     
     # 4. Update Opportunity Workflow Status
-    opp = db.query(Opportunity).filter(Opportunity.opp_id == opp_id).first()
-    if opp:
-        opp.workflow_status = "UNDER_ASSESSMENT"
+    opp.workflow_status = "UNDER_ASSESSMENT"
 
     try:
         db.commit()
@@ -0,0 +1,93 @@
+"""
+Sync run ledger API.
+
+/api/sync/runs       - recent runs, newest first, with p50/p95/max summaries
+/api/sync/runs/{id}  - one run
+/api/sync/events     - server-sent events with live progress of the running sync
+Summaries cover finished runs in the returned window, so comparing windows
+(e.g. ?source=async_pipeline&limit=20) shows throughput regressions.
+"""
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from backend.app.core.database import get_db
+from backend.app.models import SyncRun
+from backend.app.services import sync_state
+from backend.app.services.sync_events import bus
+from backend.app.services.sync_ledger import summarize, serialize_run
+
+router = APIRouter(prefix="/api/sync", tags=["Sync"])
+
+HEARTBEAT_SECONDS = 15
+
+
+def _sse(event, event_type=None):
+    lines = f"event: {event_type or event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+    return f"id: {event['id']}\n{lines}" if "id" in event else lines
+
+
+@router.get("/runs")
+def list_sync_runs(
+    limit: int = Query(50, ge=1, le=500),
+    source: Optional[str] = None,
+    mode: Optional[str] = None,
+    status: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    query = db.query(SyncRun)
+    if source:
+        query = query.filter(SyncRun.source == source)
+    if mode:
+        query = query.filter(SyncRun.mode == mode.upper())
+    if status:
+        query = query.filter(SyncRun.status == status.upper())
+    runs = query.order_by(SyncRun.started_at.desc()).limit(limit).all()
+    return {"summary": summarize(runs), "runs": [serialize_run(r) for r in runs]}
+
+
+@router.get("/runs/{sync_run_id}")
+def get_sync_run(sync_run_id: str, db: Session = Depends(get_db)):
+    run = db.get(SyncRun, sync_run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Sync run not found")
+    return serialize_run(run)
+
+
+@router.get("/events")
+async def stream_sync_events(request: Request):
+    """
+    Live sync progress as server-sent events (run_started, progress, error, run_finished).
+    Served from the in-process event bus, so subscribers never query the database.
+    A fresh connection first gets a 'snapshot' of the current state; a reconnect
+    with Last-Event-ID gets the buffered events it missed instead.
+    """
+    last_id = request.headers.get("last-event-id", "")
+    subscription = bus.subscribe()
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            if last_id.isdigit():
+                sent = int(last_id)
+                for event in bus.since(sent):
+                    sent = event["id"]
+                    yield _sse(event)
+            else:
+                current = bus.current()
+                sent = current["id"] if current else 0
+                yield _sse({"sync": sync_state.snapshot(), "run": current,
+                            "subscribers": bus.subscriber_count}, "snapshot")
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                elif event["id"] > sent:
+                    sent = event["id"]
+                    yield _sse(event)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
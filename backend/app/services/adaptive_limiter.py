@@ -0,0 +1,198 @@
+"""
+AIMD concurrency limiter for parallel Oracle page fetches.
+
+The window (max requests in flight) grows by one after every window's worth
+of clean responses. It is cut multiplicatively when Oracle pushes back:
+  - 429 / 5xx responses and transport errors,
+  - p95 latency drifting above the best p95 seen so far (the pod is queueing).
+A Retry-After header pauses all new requests until it elapses.
+
+The learned window carries over between sync runs in the same process, so
+each run starts near the last safe rate instead of re-probing from scratch.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+from backend.app.services import oracle_client
+
+logger = logging.getLogger(__name__)
+
+INITIAL_LIMIT = int(os.getenv("ORACLE_CONCURRENCY_INITIAL", "4"))
+MIN_LIMIT = int(os.getenv("ORACLE_CONCURRENCY_MIN", "1"))
+MAX_LIMIT = int(os.getenv("ORACLE_CONCURRENCY_MAX", "16"))
+BACKOFF_FACTOR = 0.5
+LATENCY_TOLERANCE = 1.5  # p95 above baseline * tolerance counts as congestion
+LATENCY_WINDOW = 50
+MIN_SAMPLES = 10
+MAX_ATTEMPTS = 4
+
+# Last limiter created, for metrics endpoints and to seed the next run
+_last = None
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial=None, min_limit=MIN_LIMIT, max_limit=MAX_LIMIT):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = max(min_limit, min(max_limit, initial or INITIAL_LIMIT))
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._waiters = deque()
+        self._paused_until = 0.0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._baseline_p95 = None
+        self._successes_since_change = 0
+        self._last_decrease = 0.0
+        self.counters = {"requests": 0, "success": 0, "throttled": 0, "server_errors": 0, "errors": 0,
+                         "retries": 0, "increases": 0, "decreases": 0}
+
+    # --- slots ---
+
+    async def acquire(self):
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        free = self.limit - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    # --- feedback ---
+
+    def _decrease(self, reason):
+        # Requests already in flight report the same congestion; cut once per round trip
+        if time.monotonic() - self._last_decrease < (self._baseline_p95 or 1.0):
+            return
+        self._last_decrease = time.monotonic()
+        new_limit = max(self.min_limit, int(self.limit * BACKOFF_FACTOR))
+        if new_limit < self.limit:
+            logger.info(f"Oracle concurrency {self.limit} -> {new_limit} ({reason})")
+            self.counters["decreases"] += 1
+        self.limit = new_limit
+        self._successes_since_change = 0
+        self._latencies.clear()
+
+    def record(self, latency, status=None, retry_after=None):
+        """Feeds one completed request back into the controller. status=None means a transport error."""
+        self.counters["requests"] += 1
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+        if status is None:
+            self.counters["errors"] += 1
+            self._decrease("transport error")
+        elif status == 429:
+            self.counters["throttled"] += 1
+            self._decrease("429 throttled")
+        elif status >= 500:
+            self.counters["server_errors"] += 1
+            self._decrease(f"HTTP {status}")
+        else:
+            self.counters["success"] += 1
+            self._latencies.append(latency)
+            p95 = _percentile(self._latencies, 95)
+            if len(self._latencies) >= MIN_SAMPLES:
+                if self._baseline_p95 is None or p95 < self._baseline_p95:
+                    self._baseline_p95 = p95
+                elif p95 > self._baseline_p95 * LATENCY_TOLERANCE:
+                    self._decrease(f"p95 {p95:.2f}s > baseline {self._baseline_p95:.2f}s")
+                    return
+            self._successes_since_change += 1
+            if self._successes_since_change >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self.counters["increases"] += 1
+                self._successes_since_change = 0
+                self._wake()
+
+    def metrics(self):
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "p50_latency": _percentile(self._latencies, 50),
+            "p95_latency": _percentile(self._latencies, 95),
+            "baseline_p95": self._baseline_p95,
+            **self.counters,
+        }
+
+
+def new_limiter():
+    """Limiter for one sync run, starting from the window the previous run ended with."""
+    global _last
+    _last = AdaptiveLimiter(initial=_last.limit if _last else None)
+    return _last
+
+
+def limiter_metrics():
+    return _last.metrics() if _last else None
+
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+async def limited_get(limiter, url, params=None, **kwargs):
+    """
+    GET through the shared async client under the limiter. Throttled and
+    failed attempts are retried here (not inside oracle_client), so every
+    attempt feeds the controller.
+    """
+    response = None
+    backoff = 0
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt:
+            limiter.counters["retries"] += 1
+            await asyncio.sleep(backoff)  # Retry-After pauses are enforced by acquire()
+        await limiter.acquire()
+        started = time.monotonic()
+        try:
+            response = await oracle_client.aget(url, params=params, max_retries=0, **kwargs)
+        except Exception:
+            limiter.record(time.monotonic() - started, None)
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            backoff = min(2 ** attempt, 30)
+            continue
+        finally:
+            limiter.release()
+        retry_after = _retry_after(response)
+        limiter.record(time.monotonic() - started, response.status_code, retry_after)
+        if response.status_code not in oracle_client.RETRY_STATUSES:
+            return response
+        backoff = 0 if retry_after else min(2 ** attempt, 30)
+    return response
@@ -2,7 +2,6 @@
 import asyncio
 import os
 import sys
-import httpx
 import logging
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
@@ -19,11 +18,19 @@ ORACLE_BASE_URL = os.getenv("ORACLE_BASE_URL", "https://eijs-test.fa.em2.oraclec
 ORACLE_USER = os.getenv("ORACLE_USER")
 ORACLE_PASSWORD = os.getenv("ORACLE_PASSWORD", os.getenv("ORACLE_PASS"))
 LIMIT = 50
-MAX_CONCURRENCY = 3 # Reduced to prevent overwhelmed DB
 
 # Imports
 from backend.app.core.database import SessionLocal, init_db
-from backend.app.models import Opportunity, Practice, SyncMeta
+from backend.app.models import SyncMeta
+from backend.app.services.bulk_writer import upsert_opportunities
+from backend.app.services import oracle_client
+from backend.app.services.oracle_fields import projection_params
+from backend.app.services.oracle_mapping import map_batch, map_one
+from backend.app.services.practice_cache import practice_cache
+from backend.app.services.adaptive_limiter import new_limiter, limited_get
+from backend.app.services.sync_pipeline import run_pipeline
+from backend.app.services.sync_ledger import track_run
+from backend.app.services.sync_state import SKIPPED, run_tracked
 
 
 # Set up file logging
@@ -41,101 +48,41 @@ logger = logging.getLogger(__name__)
 def log(msg):
     logger.info(msg)
 
-# Semaphore for concurrency control
-sem = asyncio.Semaphore(MAX_CONCURRENCY)
-
-# EXPICIT FIELDS TO FETCH (Fixes Rank 3: Field Visibility)
-# Verified Fields from User Feedback/Docs
-# Note: User mentioned 'StatusCd' vs 'StatusCode' - standard is usually StatusCd or OptyStatusCd.
-# We will use 'StatusCd' if possible but fallback logic isn't possible in 'fields' param.
-# We will remove risky fields from the request list and rely on standard ones first.
-FETCH_FIELDS = [
-    "OptyId", "OptyNumber", "Name", "TargetPartyName", 
-    "Revenue", "CurrencyCode", "SalesStage", "EffectiveDate", 
-    "LastUpdateDate", "OptyLastUpdateDate", 
-    "Practice_c", "GEO_c" # Assuming these are custom, will check describe later
-]
-FIELDS_PARAM = ",".join(FETCH_FIELDS)
-
 QUERY_FILTER = "StatusCode='OPEN'" # user indicated 'StatusCd' failed, 'StatusCode' is standard
 
-def map_oracle_to_db(item, session: Session):
+def map_oracle_to_db(item, session: Session = None):
     """
     Map Oracle JSON item to DB dictionary.
-    Handles strict mapping and potential missing keys.
+    Kept for callers mapping single items; syncs map whole pages with map_batch.
     """
-    try:
-        opty_id = str(item.get("OptyId"))
-        if not opty_id: return None
-        
-        # Parse dates with robust fallback
-        last_update_str = item.get("LastUpdateDate") or item.get("OptyLastUpdateDate")
-        crm_last_updated_at = datetime.now(timezone.utc)
-        if last_update_str:
-            try:
-                if last_update_str.endswith('Z'):
-                    crm_last_updated_at = datetime.fromisoformat(last_update_str.replace('Z', '+00:00'))
-                else:
-                    crm_last_updated_at = datetime.fromisoformat(last_update_str)
-            except: pass
-            
-        close_date = None
-        eff_date = item.get("EffectiveDate")
-        if eff_date:
-            try:
-                close_date = datetime.strptime(eff_date[:10], "%Y-%m-%d")
-            except: pass
-
-        # Practice logic
-        practice_val = item.get("Practice_c")
-       
-        return {
-            "opp_id": opty_id,
-            "opp_number": str(item.get("OptyNumber") or opty_id),
-            "opp_name": item.get("Name") or "Unknown Opportunity",
-            "customer_name": item.get("TargetPartyName") or "Unknown Account",
-            "geo": item.get("GEO_c") or item.get("Geo_c") or item.get("Region_c"),
-            "currency": item.get("CurrencyCode", "USD"),
-            "deal_value": float(item.get("Revenue") or 0),
-            "stage": item.get("SalesStage"),
-            "close_date": close_date,
-            "crm_last_updated_at": crm_last_updated_at,
-            "local_last_synced_at": datetime.now(timezone.utc),
-            "practice_name_temp": practice_val, 
-            "is_active": True
-        }
-    except Exception as e:
-        logger.error(f"Mapping Error for item {item.get('OptyId')}: {e}")
-        return None
+    return map_one(item)
 
-async def fetch_page(client, offset):
+async def fetch_page(offset, limiter):
     """
     Fetch a single page of opportunities using explicit FIELDS and filter.
-    NO totalResults=true here (Rank 1 fix).
+    NO totalResults=true here (Rank 1 fix). Concurrency is set by the adaptive limiter.
     """
-    async with sem:
-        params = {
-            "q": QUERY_FILTER,
-            "offset": offset,
-            "limit": LIMIT,
-            "fields": FIELDS_PARAM 
-        }
-        
-        url = f"{ORACLE_BASE_URL}/crmRestApi/resources/11.12.1.0/opportunities"
-        
-        try:
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
-            return data.get("items", [])
-        except Exception as e:
-            log(f"Error fetching offset {offset}: {e}")
-            # Try debugging response
-            if hasattr(e, 'response'):
-                log(f"Response: {e.response.text}")
-            return []
+    params = projection_params(
+        q=QUERY_FILTER,
+        offset=offset,
+        limit=LIMIT
+    )
+    
+    url = f"{ORACLE_BASE_URL}/crmRestApi/resources/11.12.1.0/opportunities"
+    
+    try:
+        resp = await limited_get(limiter, url, params=params)
+        resp.raise_for_status()
+        data = oracle_client.json_body(resp)
+        return data.get("items", [])
+    except Exception as e:
+        log(f"Error fetching offset {offset}: {e}")
+        # Try debugging response
+        if hasattr(e, 'response'):
+            log(f"Response: {e.response.text}")
+        raise  # retries are exhausted; a lost page must fail the run, not end the stream
 
-async def get_total_count(client):
+async def get_total_count():
     """
     Get total count using ONLY q and totalResults=true.
     NO limit, NO fields (Rank 1 fix).
@@ -149,7 +96,7 @@ async def get_total_count(client):
     
     log(f"Getting total count with query: {QUERY_FILTER}")
     try:
-        resp = await client.get(url, params=params)
+        resp = await oracle_client.aget(url, params=params)
         resp.raise_for_status()
         data = resp.json()
         return data.get("totalResults", 0)
@@ -159,9 +106,10 @@ async def get_total_count(client):
              log(f"Response: {e.response.text}")
         return 0
 
-def bulk_upsert(items):
+def bulk_upsert(items, run=None):
     """
-    Synchronous bulk upsert function.
+    Synchronous bulk upsert function (one INSERT ... ON CONFLICT per batch).
+    Counts are added to the ledger run, if given.
     """
     if not items: return 0
     
@@ -169,48 +117,16 @@ def bulk_upsert(items):
     saved_count = 0
     
     try:
-        # 1. Pre-process Practices
-        practice_names = set(i["practice_name_temp"] for i in items if i["practice_name_temp"])
-        
-        if practice_names:
-            existing_practices = db.query(Practice).filter(Practice.practice_name.in_(practice_names)).all()
-            practice_map = {p.practice_name: p.practice_id for p in existing_practices}
-            
-            for pname in practice_names:
-                if pname not in practice_map:
-                    import uuid
-                    new_p = Practice(
-                        practice_id=str(uuid.uuid4()),
-                        practice_code=pname.upper().replace(" ", "_")[:20],
-                        practice_name=pname
-                    )
-                    db.add(new_p)
-                    db.flush() 
-                    practice_map[pname] = new_p.practice_id
-        else:
-            practice_map = {}
-        
-        # 2. Process Opportunities
-        for item in items:
-            p_val = item.pop("practice_name_temp")
-            if p_val:
-                item["primary_practice_id"] = practice_map.get(p_val)
-            
-            existing = db.query(Opportunity).filter(Opportunity.opp_id == item["opp_id"]).first()
-            if existing:
-                for k, v in item.items():
-                    setattr(existing, k, v)
-            else:
-                db.add(Opportunity(**item))
-            
-            saved_count += 1
-            
+        stats = upsert_opportunities(db, items)
         db.commit()
-        log(f"Bulk saved {saved_count} records.")
+        saved_count = stats["inserted"] + stats["updated"]
+        if run: run.add_write(stats)
+        log(f"Bulk saved {saved_count} records ({stats['unchanged']} unchanged).")
         
     except Exception as e:
         log(f"Bulk Upsert Error: {e}")
         db.rollback()
+        if run: run.add_failed(len(items), e)
     finally:
         db.close()
         
@@ -225,42 +141,37 @@ async def run_async_sync():
     
     total_processed = 0
     
-    async with httpx.AsyncClient(auth=(ORACLE_USER, ORACLE_PASSWORD), timeout=60.0) as client:
-        # 2. Get Total Results (Strict query)
-        total = await get_total_count(client)
-        log(f"Total Records to Sync: {total}")
-        
-        if total == 0:
-            log("Nothing to sync or failed to get count.")
-            return
-
-        # 3. Process in Visual Batches
-        offsets = range(0, total, LIMIT)
-        TASK_CHUNK_SIZE = 5 # Small concurrency
-        
-        offset_list = list(offsets)
-        for i in range(0, len(offset_list), TASK_CHUNK_SIZE):
-            chunk_offsets = offset_list[i : i + TASK_CHUNK_SIZE]
-            log(f"Processing chunk {i//TASK_CHUNK_SIZE + 1} / {len(offset_list)//TASK_CHUNK_SIZE + 1} (Offsets {chunk_offsets[0]}-{chunk_offsets[-1]})")
-            
-            tasks = [fetch_page(client, o) for o in chunk_offsets]
-            pages = await asyncio.gather(*tasks)
-            
-            chunk_items = [item for page in pages for item in page]
-            
-            if chunk_items:
-                mapped = []
-                for item in chunk_items:
-                    m = map_oracle_to_db(item, None)
-                    if m: mapped.append(m)
-                
-                if mapped:
-                    bulk_upsert(mapped)
-                    total_processed += len(mapped)
+    # 2. Get Total Results (Strict query)
+    total = await get_total_count()
+    log(f"Total Records to Sync: {total}")
+    
+    if total == 0:
+        log("Nothing to sync or failed to get count.")
+        return
+
+    # 3. Stream pages through fetch -> map -> bulk upsert; the limiter paces Oracle
+    limiter = new_limiter()
+    practice_cache.warm()
+    with track_run("async_sync", mode="FULL") as run:
+        run.expected = total
+        stats = await run_pipeline(
+            fetch_page=lambda offset, page_size: fetch_page(offset, limiter),
+            map_page=map_batch,
+            write_batch=lambda items: bulk_upsert(items, run),
+            page_size=LIMIT,
+            fetch_concurrency=limiter.max_limit,
+            on_page=run.add_page,
+        )
+        run.add_pipeline(stats, limiter.metrics())
+        if run.counts["failed"]:
+            run.status = "PARTIAL"
+    total_processed = stats["map"]["items"]
+    log(f"Oracle concurrency metrics: {limiter.metrics()}")
 
     duration = (datetime.now(timezone.utc) - start_time).total_seconds()
     log(f"Sync Finished in {duration:.2f}s. Total Processed: {total_processed}")
-    return {"status": "success", "total": total_processed, "duration": duration}
+    return {"status": "success", "total": total_processed, "duration": duration, "limiter": limiter.metrics()}
 
 if __name__ == "__main__":
-    asyncio.run(run_async_sync())
+    if run_tracked("cli", lambda: asyncio.run(run_async_sync())) is SKIPPED:
+        sys.exit("Another sync is running in this or another process; not starting a second one.")
@@ -0,0 +1,106 @@
+"""
+Set-based bulk writer for synced Oracle opportunities.
+
+Every sync path hands its mapped batch to upsert_opportunities(). The
+writer does not SELECT and setattr row by row. It issues one
+INSERT ... ON CONFLICT (opp_id) DO UPDATE per chunk. The UPDATE only fires
+when crm_last_updated_at actually changed, so unchanged rows are never
+rewritten. BQS-owned workflow/assignment columns are never touched by a sync.
+"""
+import logging
+from datetime import datetime
+from sqlalchemy.orm import Session
+from backend.app.core.database import dialect_insert
+from backend.app.models import Opportunity
+from backend.app.services.practice_cache import practice_cache
+
+logger = logging.getLogger(__name__)
+
+# Columns owned by Oracle CRM; refreshed on conflict
+CRM_COLUMNS = [
+    "opp_number", "opp_name", "customer_name", "geo", "currency", "deal_value",
+    "stage", "close_date", "crm_last_updated_at", "primary_practice_id", "is_active",
+]
+
+# Defaults for BQS-owned columns on first insert (mirrors the model defaults)
+INSERT_DEFAULTS = {
+    "gh_approval_status": "PENDING",
+    "ph_approval_status": "PENDING",
+    "sh_approval_status": "PENDING",
+    "combined_submission_ready": False,
+}
+
+# Rows per statement; keeps bind parameters well under driver limits
+CHUNK_SIZE = 500
+
+
+def resolve_practices(db: Session, rows):
+    """
+    Replaces each row's 'practice_name_temp' with 'primary_practice_id'
+    using the shared practice cache (missing practices created in one statement).
+    """
+    practice_map = practice_cache.resolve(db, {r.get("practice_name_temp") for r in rows})
+    for r in rows:
+        if "practice_name_temp" in r:
+            name = r.pop("practice_name_temp")
+            r["primary_practice_id"] = practice_map.get(name) if name else None
+
+
+def _normalize(row, synced_at):
+    """Uniform key set for a multi-row VALUES clause."""
+    out = {col: row.get(col) for col in CRM_COLUMNS}
+    out["opp_id"] = row["opp_id"]
+    if out["is_active"] is None:
+        out["is_active"] = True
+    out["local_last_synced_at"] = synced_at
+    out.update(INSERT_DEFAULTS)
+    return out
+
+
+def upsert_opportunities(db: Session, rows):
+    """
+    Upserts a mapped batch. Does not commit; the caller owns the transaction.
+    Returns {"inserted": n, "updated": n, "unchanged": n}.
+    """
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0}
+    rows = [r for r in rows if r and r.get("opp_id")]
+    if not rows:
+        return stats
+
+    resolve_practices(db, rows)
+
+    # ON CONFLICT cannot touch the same row twice in one statement; last one wins
+    synced_at = datetime.utcnow()
+    deduped = {}
+    for r in rows:
+        deduped[r["opp_id"]] = _normalize(r, synced_at)
+    values = list(deduped.values())
+    stats["unchanged"] += len(rows) - len(values)
+
+    insert = dialect_insert(db)
+    table = Opportunity.__table__
+
+    for start in range(0, len(values), CHUNK_SIZE):
+        chunk = values[start:start + CHUNK_SIZE]
+        ids = [v["opp_id"] for v in chunk]
+        existing_ids = {r[0] for r in db.query(Opportunity.opp_id).filter(Opportunity.opp_id.in_(ids)).all()}
+
+        stmt = insert(table).values(chunk)
+        excluded = stmt.excluded
+        update_cols = {col: excluded[col] for col in CRM_COLUMNS + ["local_last_synced_at"]}
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.opp_id],
+            set_=update_cols,
+            # Only rewrite rows whose CRM timestamp moved (or that were deactivated)
+            where=(table.c.crm_last_updated_at.is_distinct_from(excluded.crm_last_updated_at))
+                | (table.c.is_active.is_distinct_from(excluded.is_active))
+        ).returning(table.c.opp_id)
+
+        written = {r[0] for r in db.execute(stmt).fetchall()}
+        inserted = written - existing_ids
+        stats["inserted"] += len(inserted)
+        stats["updated"] += len(written) - len(inserted)
+        stats["unchanged"] += len(chunk) - len(written)
+
+    logger.info(f"Bulk upsert: {stats['inserted']} inserted, {stats['updated']} updated, {stats['unchanged']} unchanged")
+    return stats
@@ -0,0 +1,127 @@
+"""
+Declarative dashboard tab definitions.
+
+Each role's tabs are defined once as SQL predicates on Opportunity. The list
+endpoint filters with them and the tab badges are counted from them in a
+single aggregate query, so the two can never drift apart.
+"""
+from sqlalchemy import and_, or_, func, true, false
+from sqlalchemy.orm import Session
+from backend.app.models import Opportunity
+
+REVIEW_STATUSES = ['READY_FOR_REVIEW', 'UNDER_REVIEW', 'SA_SUBMITTED', 'SP_SUBMITTED', 'PENDING_GH_APPROVAL', 'PENDING_FINAL_APPROVAL', 'SUBMITTED', 'SUBMITTED_FOR_REVIEW']
+COMPLETED_STATUSES = ['APPROVED', 'REJECTED', 'ACCEPTED', 'COMPLETED', 'WON', 'LOST']
+ASSESSMENT_STATUSES = ['UNDER_ASSESSMENT', 'IN_ASSESSMENT']
+
+# Column that scopes each role to "my" opportunities (GH sees everything)
+ROLE_SCOPE_COLUMNS = {
+    'PH': Opportunity.assigned_practice_head_id,
+    'SH': Opportunity.assigned_sales_head_id,
+    'SA': Opportunity.assigned_sa_id,
+    'SP': Opportunity.assigned_sp_id,
+}
+
+# Alternate tab names used by the different dashboards -> canonical tab
+TAB_ALIASES = {
+    'HEAD': {'unassigned': 'action-required', 'needs-action': 'action-required', 'pending-review': 'review', 'submitted': 'review'},
+    'EXECUTOR': {'unassigned': 'action-required', 'needs-action': 'action-required', 'review': 'submitted', 'pending-review': 'submitted'},
+    'GLOBAL': {'needs-action': 'action-required', 'pending-review': 'review', 'submitted': 'review'},
+}
+
+
+def role_scope(role, user_id):
+    """Base predicates shared by the list and the counts: active rows visible to this role."""
+    preds = [Opportunity.is_active == True]
+    id_col = ROLE_SCOPE_COLUMNS.get(role)
+    if id_col is not None:
+        preds.append(id_col == user_id if user_id else false())
+    return preds
+
+
+def _role_group(role):
+    if role in ('PH', 'SH'): return 'HEAD'
+    if role in ('SA', 'SP'): return 'EXECUTOR'
+    return 'GLOBAL'
+
+
+def tab_definitions(role):
+    """Returns the ordered {tab: predicate} mapping for a role (canonical tabs only)."""
+    ws = Opportunity.workflow_status
+    is_open = or_(ws.notin_(COMPLETED_STATUSES + REVIEW_STATUSES), ws.is_(None))
+    in_review = ws.in_(REVIEW_STATUSES)
+    group = _role_group(role)
+
+    if group == 'HEAD':
+        # PH manages SA assignment, SH manages SP assignment
+        executor_col = Opportunity.assigned_sa_id if role == 'PH' else Opportunity.assigned_sp_id
+        approval_col = Opportunity.ph_approval_status if role == 'PH' else Opportunity.sh_approval_status
+        return {
+            'all': true(),
+            # Missing assignment OR waiting on this head's approval
+            'action-required': or_(
+                and_(is_open, executor_col.is_(None)),
+                and_(in_review, approval_col == 'PENDING')
+            ),
+            'in-progress': and_(is_open, executor_col.isnot(None)),
+            'review': in_review,
+            'completed': or_(ws.in_(COMPLETED_STATUSES), approval_col.in_(['APPROVED', 'REJECTED', 'NOTIFIED'])),
+        }
+
+    if group == 'EXECUTOR':
+        # Dual visibility: the executor's own submission already counts as completed for them
+        own_submitted = f"{role}_SUBMITTED"
+        return {
+            'all': true(),
+            'action-required': or_(ws.notin_(COMPLETED_STATUSES + REVIEW_STATUSES + ASSESSMENT_STATUSES), ws.is_(None)),
+            'in-progress': ws.in_(ASSESSMENT_STATUSES),
+            'submitted': in_review,
+            'completed': ws.in_(COMPLETED_STATUSES + [own_submitted, 'READY_FOR_REVIEW', 'UNDER_REVIEW', 'PENDING_GH_APPROVAL', 'SUBMITTED']),
+        }
+
+    no_ph = Opportunity.assigned_practice_head_id.is_(None)
+    no_sh = Opportunity.assigned_sales_head_id.is_(None)
+    return {
+        'all': true(),
+        'unassigned': and_(is_open, no_ph, no_sh),
+        'missing-ph': and_(is_open, no_ph, ~no_sh),
+        'missing-sh': and_(is_open, ~no_ph, no_sh),
+        'action-required': and_(is_open, or_(no_ph, no_sh)),
+        'in-progress': and_(is_open, or_(~no_ph, ~no_sh)),
+        'review': in_review,
+        'completed': or_(ws.in_(COMPLETED_STATUSES), Opportunity.gh_approval_status.in_(['APPROVED', 'REJECTED'])),
+    }
+
+
+def resolve_tab(tab, role):
+    """Maps a dashboard tab name (or alias) to its canonical name, or None if unknown for this role."""
+    defs = tab_definitions(role)
+    canonical = TAB_ALIASES[_role_group(role)].get(tab, tab)
+    return canonical if canonical in defs else None
+
+
+def tab_filter(tabs, role):
+    """OR of the predicates for the requested tabs; None when no known tab was requested."""
+    defs = tab_definitions(role)
+    preds = []
+    for t in tabs:
+        canonical = resolve_tab(t, role)
+        if canonical:
+            preds.append(defs[canonical])
+    return or_(*preds) if preds else None
+
+
+def tab_counts(db: Session, role, user_id):
+    """
+    Counts every tab for a role in one aggregate query (COUNT(*) FILTER (WHERE ...)).
+    Aliases are filled in from their canonical tab so each dashboard finds the key it expects.
+    """
+    defs = tab_definitions(role)
+    names = list(defs.keys())
+    columns = [func.count() if name == 'all' else func.count().filter(defs[name]) for name in names]
+
+    row = db.query(*columns).select_from(Opportunity).filter(*role_scope(role, user_id)).one()
+    counts = {name: int(value or 0) for name, value in zip(names, row)}
+
+    for alias, canonical in TAB_ALIASES[_role_group(role)].items():
+        counts.setdefault(alias, counts[canonical])
+    return counts
@@ -0,0 +1,106 @@
+"""
+Batched row hydration for opportunity listings.
+
+Resolves practices and user display names for a whole page of opportunities
+in a fixed number of set-based queries, instead of issuing one lookup per row
+and column. Latest score versions come from the projection columns on
+Opportunity (see score_projection), so they cost no query at all.
+"""
+from sqlalchemy.orm import Session
+from backend.app.models import Practice, AppUser, OppScoreSectionValue
+from backend.app.services.score_projection import latest_version_of
+
+# Opportunity columns that reference app_user and are shown by display name
+USER_FK_COLUMNS = (
+    "sales_owner_user_id",
+    "assigned_practice_head_id",
+    "assigned_sales_head_id",
+    "assigned_sa_id",
+    "assigned_sp_id",
+)
+
+
+class OpportunityHydrator:
+    """
+    Prefetches everything needed to serialize a page of opportunities.
+    Query count is constant regardless of page size:
+    one for practices, one for users (+1 for ratings if asked).
+    """
+
+    def __init__(self, db: Session, opps, with_ratings: bool = False):
+        self.db = db
+        self.opps = [o for o in opps if o is not None]
+
+        # 1. Practices
+        practice_ids = {o.primary_practice_id for o in self.opps if o.primary_practice_id}
+        self.practices = {}
+        if practice_ids:
+            rows = db.query(Practice.practice_id, Practice.practice_name).filter(Practice.practice_id.in_(practice_ids)).all()
+            self.practices = {pid: name for pid, name in rows}
+
+        # 2. User display names
+        user_ids = {getattr(o, col) for o in self.opps for col in USER_FK_COLUMNS if getattr(o, col)}
+        self.user_names = {}
+        if user_ids:
+            rows = db.query(AppUser.user_id, AppUser.display_name).filter(AppUser.user_id.in_(user_ids)).all()
+            self.user_names = {uid: name for uid, name in rows}
+
+        # 3. Latest score version per opportunity (projected columns, no query)
+        self.latest_versions = {o.opp_id: latest_version_of(o) for o in self.opps if o.latest_version_id}
+
+        # 4. Versions with at least one non-zero section score (detail view only)
+        self.rated_version_ids = set()
+        if with_ratings and self.latest_versions:
+            version_ids = [v.score_version_id for v in self.latest_versions.values()]
+            rows = db.query(OppScoreSectionValue.score_version_id).filter(
+                OppScoreSectionValue.score_version_id.in_(version_ids),
+                OppScoreSectionValue.score > 0
+            ).distinct().all()
+            self.rated_version_ids = {r[0] for r in rows}
+
+    def practice_name(self, o):
+        if not o.primary_practice_id:
+            return "General"
+        return self.practices.get(o.primary_practice_id, "General")
+
+    def user_name(self, uid):
+        if not uid: return None
+        return self.user_names.get(uid, uid)
+
+    def latest_version(self, opp_id):
+        return self.latest_versions.get(opp_id)
+
+    def has_ratings(self, version):
+        return bool(version) and version.score_version_id in self.rated_version_ids
+
+
+def serialize_opportunity(o, hydrator: OpportunityHydrator, status: str):
+    """Shared row shape for the list and detail endpoints."""
+    latest_score = hydrator.latest_version(o.opp_id)
+    return {
+        "id": o.opp_id,
+        "row_id": o.opp_id,
+        "remote_id": o.opp_number or "N/A",
+        "name": o.opp_name,
+        "customer": o.customer_name,
+        "practice": hydrator.practice_name(o),
+        "deal_value": o.deal_value or 0.0,
+        "currency": o.currency or "USD",
+        "workflow_status": status,
+        "sales_stage": o.stage or "Qualifying",
+        "geo": o.geo or "Global",
+        "close_date": o.close_date.strftime("%Y-%m-%d") if o.close_date else None,
+        "sales_owner": hydrator.user_name(o.sales_owner_user_id) or "N/A",
+        "assigned_practice_head": hydrator.user_name(o.assigned_practice_head_id),
+        "assigned_sales_head": hydrator.user_name(o.assigned_sales_head_id),
+        "assigned_sa": hydrator.user_name(o.assigned_sa_id),
+        "assigned_sp": hydrator.user_name(o.assigned_sp_id),
+        "win_probability": latest_score.overall_score if latest_score else 0,
+        "version_no": latest_score.version_no if latest_score else None,
+        "gh_approval_status": o.gh_approval_status or 'PENDING',
+        "ph_approval_status": o.ph_approval_status or 'PENDING',
+        "sh_approval_status": o.sh_approval_status or 'PENDING',
+        "assigned_practice_head_id": o.assigned_practice_head_id,
+        "assigned_sales_head_id": o.assigned_sales_head_id,
+        "combined_submission_ready": o.combined_submission_ready or False
+    }
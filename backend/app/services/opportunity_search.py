@@ -0,0 +1,127 @@
+"""
+Opportunity search subsystem.
+
+On Postgres, substring search over opp_name / customer_name / opp_number is
+served by pg_trgm GIN indexes. Postgres keeps the indexes current on every
+sync upsert, so there is nothing extra to maintain. Results are ranked by
+trigram similarity, with a boost for prefix matches.
+
+Without Postgres or pg_trgm (SQLite in tests, restricted DB users), the same
+filter runs as plain ILIKE. Ranking falls back to a prefix/substring CASE, so
+callers never need to know which backend they are on.
+"""
+import logging
+from sqlalchemy import or_, case, func, text
+from sqlalchemy.orm import Session
+from backend.app.models import Opportunity
+
+logger = logging.getLogger(__name__)
+
+SEARCH_COLUMNS = (Opportunity.opp_name, Opportunity.customer_name, Opportunity.opp_number)
+
+# (index name, column) - GIN trigram indexes backing ILIKE '%term%'
+SEARCH_INDEXES = [
+    ("ix_opportunity_name_trgm", "opp_name"),
+    ("ix_opportunity_customer_trgm", "customer_name"),
+    ("ix_opportunity_number_trgm", "opp_number"),
+]
+
+# Cached per process: None = not checked yet
+_trigram_available = None
+
+
+def ensure_search_indexes(engine):
+    """
+    Installs pg_trgm and the trigram indexes if missing. Safe to call on every start.
+    Returns the list of index names it created.
+    """
+    global _trigram_available
+    if engine.dialect.name != "postgresql":
+        return []
+
+    created = []
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm;"))
+            conn.commit()
+        # CONCURRENTLY (no write lock on a populated table) cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            existing = {r[0]: r[1] for r in conn.execute(text(
+                "SELECT c.relname, i.indisvalid FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid "
+                "JOIN pg_class t ON t.oid = i.indrelid WHERE t.relname = 'opportunity'"
+            ))}
+            for name, column in SEARCH_INDEXES:
+                if existing.get(name):
+                    continue
+                if name in existing:
+                    logger.warning(f"Healing 'opportunity': Rebuilding INVALID trigram index '{name}'.")
+                    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name};"))
+                logger.warning(f"Healing 'opportunity': Creating trigram search index '{name}'.")
+                conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON opportunity USING gin ({column} gin_trgm_ops);"))
+                created.append(name)
+        _trigram_available = True
+    except Exception as e:
+        # Missing privileges for CREATE EXTENSION: search still works, just unindexed
+        logger.warning(f"Trigram search unavailable, falling back to ILIKE: {e}")
+        _trigram_available = False
+    return created
+
+
+def trigram_available(db: Session):
+    global _trigram_available
+    if _trigram_available is None:
+        if db.bind.dialect.name != "postgresql":
+            _trigram_available = False
+        else:
+            try:
+                _trigram_available = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+            except Exception:
+                _trigram_available = False
+    return _trigram_available
+
+
+def _escape_like(term: str):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_filter(term: str):
+    """Substring match on any searchable column (same semantics on every backend)."""
+    pattern = f"%{_escape_like(term)}%"
+    return or_(*[col.ilike(pattern, escape="\\") for col in SEARCH_COLUMNS])
+
+
+def search_rank(db: Session, term: str):
+    """
+    Relevance expression for ORDER BY (higher is better).
+    Prefix matches on any column always outrank plain substring matches.
+    """
+    prefix = f"{_escape_like(term)}%"
+    prefix_bonus = case((or_(*[col.ilike(prefix, escape="\\") for col in SEARCH_COLUMNS]), 1.0), else_=0.0)
+
+    if trigram_available(db):
+        similarity = func.greatest(*[func.coalesce(func.similarity(col, term), 0) for col in SEARCH_COLUMNS])
+        return prefix_bonus + similarity
+
+    # Fallback: exact > prefix > substring
+    exact = case((or_(*[func.lower(col) == term.lower() for col in SEARCH_COLUMNS]), 1.0), else_=0.0)
+    return prefix_bonus + exact
+
+
+def search_opportunities(db: Session, term: str, limit: int = 10):
+    """Top-N ranked matches among live opportunities, for typeahead."""
+    rank = search_rank(db, term).label("rank")
+    rows = db.query(Opportunity, rank).filter(
+        Opportunity.is_active == True,
+        search_filter(term)
+    ).order_by(rank.desc(), Opportunity.crm_last_updated_at.desc()).limit(limit).all()
+    return [
+        {
+            "id": o.opp_id,
+            "remote_id": o.opp_number,
+            "name": o.opp_name,
+            "customer": o.customer_name,
+            "rank": round(float(r or 0), 4)
+        }
+        for o, r in rows
+    ]
@@ -0,0 +1,242 @@
+"""
+Process-wide Oracle CRM client.
+
+One keep-alive connection pool per process, shared by every sync path,
+instead of a fresh session (and TLS handshake) per request. The OAuth token
+is cached until shortly before its expires_in. Refresh is single-flight:
+concurrent callers wait on one token POST rather than each issuing their own.
+
+    get_client()        -> shared httpx.Client (threads, sync code paths)
+    get_async_client()  -> shared httpx.AsyncClient for the running event loop
+    auth_headers()      -> Bearer header from the cached token, else Basic auth
+"""
+import asyncio
+import base64
+import logging
+import os
+import threading
+import time
+import httpx
+from dotenv import load_dotenv
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # optional speedup
+    import json
+    _loads = json.loads
+
+# .../backend/app/services/oracle_client.py -> .../.env
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+load_dotenv(dotenv_path=os.path.join(base_dir, '.env'))
+
+ORACLE_BASE_URL = os.getenv("ORACLE_BASE_URL", "https://eijs-test.fa.em2.oraclecloud.com")
+ORACLE_API_VERSION = os.getenv("ORACLE_API_VERSION", "latest")
+ORACLE_TOKEN_URL = os.getenv("ORACLE_TOKEN_URL")
+ORACLE_CLIENT_ID = os.getenv("ORACLE_CLIENT_ID")
+ORACLE_CLIENT_SECRET = os.getenv("ORACLE_CLIENT_SECRET")
+ORACLE_SCOPE = os.getenv("ORACLE_SCOPE", f"{ORACLE_BASE_URL}/crmRestApi/resources/{ORACLE_API_VERSION}/")
+ORACLE_USER = os.getenv("ORACLE_USER")
+ORACLE_PASS = os.getenv("ORACLE_PASSWORD", os.getenv("ORACLE_PASS"))
+
+POOL_SIZE = int(os.getenv("ORACLE_POOL_SIZE", "20"))
+TIMEOUT = httpx.Timeout(90.0, connect=15.0)
+# Oracle list payloads are highly repetitive JSON; gzip typically cuts them 5-10x
+DEFAULT_HEADERS = {"Accept-Encoding": "gzip, deflate", "Accept": "application/json"}
+TOKEN_REFRESH_MARGIN = 60  # seconds before expiry at which the token is renewed
+MAX_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+def api_url(endpoint, version=None):
+    return f"{ORACLE_BASE_URL}/crmRestApi/resources/{version or ORACLE_API_VERSION}/{endpoint}"
+
+
+def _limits():
+    return httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE, keepalive_expiry=60)
+
+
+# --- Connection pools ---
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = {}
+
+
+def get_client():
+    """Shared synchronous client; safe to use from any thread."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(timeout=TIMEOUT, headers=DEFAULT_HEADERS, transport=httpx.HTTPTransport(retries=2, limits=_limits()))
+    return _client
+
+
+def get_async_client():
+    """
+    Shared async client for the running event loop. httpx connections belong
+    to the loop that opened them, so each loop (e.g. each asyncio.run() sync)
+    gets its own pool, reused by every coroutine inside it.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        # Drop pools whose loops are gone
+        for stale in [l for l in _async_clients if l.is_closed()]:
+            del _async_clients[stale]
+        client = httpx.AsyncClient(timeout=TIMEOUT, headers=DEFAULT_HEADERS, transport=httpx.AsyncHTTPTransport(retries=2, limits=_limits()))
+        _async_clients[loop] = client
+    return client
+
+
+# --- Token cache ---
+
+class TokenCache:
+    """OAuth client-credentials token, refreshed single-flight shortly before expiry."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+        self.refreshes = 0
+
+    def valid(self):
+        return self._token is not None and time.monotonic() < self._expires_at - TOKEN_REFRESH_MARGIN
+
+    def get(self):
+        if self.valid():
+            return self._token
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self.valid():
+                return self._token
+            self._refresh()
+            return self._token
+
+    def invalidate(self):
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+
+    def _refresh(self):
+        auth_str = base64.b64encode(f"{ORACLE_CLIENT_ID}:{ORACLE_CLIENT_SECRET}".encode()).decode()
+        try:
+            response = get_client().post(
+                ORACLE_TOKEN_URL,
+                headers={"Authorization": f"Basic {auth_str}", "Content-Type": "application/x-www-form-urlencoded"},
+                data={"grant_type": "client_credentials", "scope": ORACLE_SCOPE},
+                timeout=30,
+            )
+            response.raise_for_status()
+            payload = response.json()
+            self._token = payload.get("access_token")
+            self._expires_at = time.monotonic() + int(payload.get("expires_in") or 3600)
+            self.refreshes += 1
+            logger.info(f"Oracle token refreshed (expires in {payload.get('expires_in')}s)")
+        except Exception as e:
+            logger.error(f"Failed to acquire Oracle token: {e}")
+            self._token, self._expires_at = None, 0.0
+
+
+token_cache = TokenCache()
+
+
+def oauth_configured():
+    return all([ORACLE_TOKEN_URL, ORACLE_CLIENT_ID, ORACLE_CLIENT_SECRET])
+
+
+def get_token():
+    return token_cache.get() if oauth_configured() else None
+
+
+def auth_headers():
+    """Authorization header for Oracle: cached Bearer token, falling back to Basic auth."""
+    token = get_token()
+    if token:
+        return {"Authorization": f"Bearer {token}"}
+    if ORACLE_USER and ORACLE_PASS:
+        encoded = base64.b64encode(f"{ORACLE_USER}:{ORACLE_PASS}".encode()).decode()
+        return {"Authorization": f"Basic {encoded}"}
+    raise Exception("No Oracle credentials found.")
+
+
+async def async_auth_headers():
+    """auth_headers() without blocking the loop when a token refresh is needed."""
+    if not oauth_configured() or token_cache.valid():
+        return auth_headers()
+    return await asyncio.to_thread(auth_headers)
+
+
+# --- Requests ---
+
+# Process-wide transfer counters; the sync ledger records per-run deltas
+_stats_lock = threading.Lock()
+_transfer = {"requests": 0, "retries": 0, "bytes": 0}
+
+
+def _count(response, retry=False):
+    with _stats_lock:
+        _transfer["requests"] += 1
+        _transfer["bytes"] += response.num_bytes_downloaded
+        if retry:
+            _transfer["retries"] += 1
+
+
+def transfer_stats():
+    """Requests, retries and wire bytes (compressed) since process start."""
+    with _stats_lock:
+        return dict(_transfer)
+
+
+def json_body(response):
+    """Decodes a response body with orjson when installed (several times faster than json on large pages)."""
+    return _loads(response.content)
+
+
+def _retry_delay(response, attempt):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return 2 ** attempt
+
+
+def get(url, params=None, max_retries=MAX_RETRIES, **kwargs):
+    """GET through the shared pool with auth, retrying 429/5xx (honouring Retry-After) and one stale-token 401."""
+    client = get_client()
+    response = None
+    for attempt in range(max_retries + 1):
+        response = client.get(url, params=params, headers=auth_headers(), **kwargs)
+        _count(response, retry=attempt > 0)
+        if response.status_code == 401 and oauth_configured() and attempt == 0 and max_retries:
+            token_cache.invalidate()
+            continue
+        if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+            return response
+        delay = _retry_delay(response, attempt)
+        logger.warning(f"Oracle returned {response.status_code}; retrying in {delay:.1f}s")
+        time.sleep(delay)
+    return response
+
+
+async def aget(url, params=None, max_retries=MAX_RETRIES, **kwargs):
+    """Async counterpart of get(). Pass max_retries=0 when the caller runs its own retry policy."""
+    client = get_async_client()
+    response = None
+    for attempt in range(max_retries + 1):
+        response = await client.get(url, params=params, headers=await async_auth_headers(), **kwargs)
+        _count(response, retry=attempt > 0)
+        if response.status_code == 401 and oauth_configured() and attempt == 0 and max_retries:
+            token_cache.invalidate()
+            continue
+        if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+            return response
+        delay = _retry_delay(response, attempt)
+        logger.warning(f"Oracle returned {response.status_code}; retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+    return response
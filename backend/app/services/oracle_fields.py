@@ -0,0 +1,64 @@
+"""
+Declarative Oracle -> Opportunity field projection.
+
+FIELD_SOURCES lists, per Opportunity column, the Oracle attributes the mapper
+reads (first non-empty wins). PROJECTED_FIELDS is derived from it and sent
+as `fields=` on every opportunity list/detail call, together with
+onlyData=true, so Oracle omits the child links and unused attributes.
+Compression is negotiated by the shared client (Accept-Encoding: gzip).
+
+Adding a column to the sync means adding it here; the projection follows.
+
+Scans that must see every row (full passes, reconcile) page by key rather
+than offset: ordered by OptyId, each request asks for ids past the last one
+read, so rows leaving the open set between pages cannot shift unread rows
+out of view.
+"""
+
+# column -> Oracle attributes, in precedence order
+FIELD_SOURCES = {
+    "opp_id": ("OptyId",),
+    "opp_number": ("OptyNumber",),
+    "opp_name": ("Name",),
+    "customer_name": ("TargetPartyName",),
+    "geo": ("GEO_c",),
+    "currency": ("CurrencyCode",),
+    "deal_value": ("Revenue",),
+    "stage": ("SalesStage",),
+    "close_date": ("EffectiveDate",),
+    "crm_last_updated_at": ("LastUpdateDate", "OptyLastUpdateDate"),
+    "practice_name_temp": ("Practice_c",),
+    "is_active": ("StatusCode",),  # only OPEN opportunities are live in BQS
+}
+
+OPEN_STATUS = "OPEN"
+
+# The opportunity set every full sync reads; reconcile must see the same set
+FINDER = "MyOpportunitiesFinder;RecordSet='ALLOPTIES'"
+
+# Alternate spellings some pods return for GEO_c. They are read when present
+# but never requested: asking for a field the pod does not define is a 400.
+FALLBACK_SOURCES = {
+    "geo": ("Geo_c", "Region_c"),
+}
+
+PROJECTED_FIELDS = ",".join(dict.fromkeys(f for sources in FIELD_SOURCES.values() for f in sources))
+
+
+def projection_params(**params):
+    """Query params for an opportunity list/detail call with the sync projection applied."""
+    return {"fields": PROJECTED_FIELDS, "onlyData": "true", **params}
+
+
+KEYSET_ORDER = "OptyId:asc"
+
+
+def after_opty_id(q, last_id):
+    """Extends a q filter to the rows after last_id in KEYSET_ORDER (unchanged for the first page)."""
+    return f"{q} and OptyId > '{last_id}'" if last_id else q
+
+
+def opty_id_key(opty_id):
+    """Sort key matching Oracle's OptyId order (numeric ids compare as numbers)."""
+    value = str(opty_id)
+    return (0, int(value), "") if value.isdigit() else (1, 0, value)
@@ -0,0 +1,92 @@
+"""
+Single batch mapper from raw Oracle opportunity pages to bulk-insert rows.
+
+Replaces the per-module map_oracle_to_db copies. A page is mapped in one
+pass driven by FIELD_SOURCES. Every row comes out with the same keys, ready
+for a multi-row VALUES clause. Timestamps are normalized to naive UTC.
+Date parsing is memoized: Oracle pages repeat the same close dates and
+often the same update timestamps, so most lookups are cache hits.
+"""
+import logging
+from datetime import datetime, timezone
+from functools import lru_cache
+from backend.app.services.oracle_fields import FIELD_SOURCES, FALLBACK_SOURCES, OPEN_STATUS
+
+logger = logging.getLogger(__name__)
+
+# Row keys produced by map_batch (practice_name_temp is resolved by the bulk writer)
+MAPPED_COLUMNS = tuple(FIELD_SOURCES)
+
+_SOURCES = {col: FIELD_SOURCES[col] + FALLBACK_SOURCES.get(col, ()) for col in FIELD_SOURCES}
+
+
+@lru_cache(maxsize=8192)
+def parse_timestamp(value):
+    """Oracle ISO timestamp ('...Z' or '+00:00') -> naive UTC datetime, or None."""
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    """Leading YYYY-MM-DD of an Oracle date/timestamp -> datetime, or None."""
+    try:
+        return datetime.strptime(value[:10], "%Y-%m-%d")
+    except (ValueError, TypeError):
+        return None
+
+
+def _first(item, sources):
+    for key in sources:
+        value = item.get(key)
+        if value:
+            return value
+    return None
+
+
+def map_batch(items, now=None):
+    """
+    Maps a raw Oracle page to row dicts with MAPPED_COLUMNS keys.
+    Records without OptyId, or whose values cannot be converted, are skipped and logged.
+    """
+    now = now or datetime.utcnow()
+    rows = []
+    s = _SOURCES
+    for item in items:
+        opp_id = item.get("OptyId")
+        if not opp_id:
+            continue
+        try:
+            opp_id = str(opp_id)
+            updated = _first(item, s["crm_last_updated_at"])
+            close = _first(item, s["close_date"])
+            status = _first(item, s["is_active"])
+            rows.append({
+                "opp_id": opp_id,
+                "opp_number": str(_first(item, s["opp_number"]) or opp_id),
+                "opp_name": _first(item, s["opp_name"]) or "Unknown Opportunity",
+                "customer_name": _first(item, s["customer_name"]) or "Unknown Account",
+                "geo": _first(item, s["geo"]) or "Global",
+                "currency": _first(item, s["currency"]) or "USD",
+                "deal_value": float(_first(item, s["deal_value"]) or 0),
+                "stage": _first(item, s["stage"]),
+                "close_date": parse_date(close) if close else None,
+                "crm_last_updated_at": (parse_timestamp(updated) if updated else None) or now,
+                "practice_name_temp": _first(item, s["practice_name_temp"]),
+                # Closed (WON/LOST/...) rows stay in the table but leave the dashboards
+                "is_active": status is None or status == OPEN_STATUS,
+            })
+        except (TypeError, ValueError) as e:
+            logger.error(f"Mapping Error for {item.get('OptyId')}: {e}")
+    return rows
+
+
+def map_one(item):
+    """Single-item convenience wrapper around map_batch."""
+    rows = map_batch([item])
+    return rows[0] if rows else None
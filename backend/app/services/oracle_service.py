@@ -1,12 +1,15 @@
-import requests
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
-from requests.auth import HTTPBasicAuth
 import logging
 import os
-import base64
+import sys
 from datetime import datetime
 from dotenv import load_dotenv
+from backend.app.services import oracle_client
+from backend.app.services.oracle_fields import projection_params
+from backend.app.services.oracle_mapping import map_batch, map_one
+from backend.app.services.practice_cache import practice_cache
+from backend.app.services.sync_ledger import track_run
+from backend.app.services.sync_state import SKIPPED, run_tracked
+from backend.app.services.sync_watermark import since_clause, plan_sync, max_seen, record_sync
 
 # Load env with absolute path to ensure it's found
 # .../BQS/backend/app/services/oracle_service.py -> .../BQS/.env
@@ -30,121 +33,49 @@ ORACLE_PASS = os.getenv("ORACLE_PASSWORD", os.getenv("ORACLE_PASS"))
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_robust_session():
-    """Returns a requests Session with built-in retries and timeouts"""
-    session = requests.Session()
-    retry_strategy = Retry(
-        total=3,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "OPTIONS", "POST"]
-    )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    session.mount("https://", adapter)
-    session.mount("http://", adapter)
-    return session
-
 def get_oracle_token():
-    """Retrieves OAuth2 access token for Oracle CRM"""
-    if not all([ORACLE_TOKEN_URL, ORACLE_CLIENT_ID, ORACLE_CLIENT_SECRET]):
-        return None
-
-    try:
-        auth_str = f"{ORACLE_CLIENT_ID}:{ORACLE_CLIENT_SECRET}"
-        encoded_auth = base64.b64encode(auth_str.encode()).decode()
-        
-        headers = {
-            "Authorization": f"Basic {encoded_auth}",
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-        
-        payload = {
-            "grant_type": "client_credentials",
-            "scope": ORACLE_SCOPE
-        }
-        
-        session = get_robust_session()
-        response = session.post(ORACLE_TOKEN_URL, headers=headers, data=payload, timeout=30)
-        response.raise_for_status()
-        
-        return response.json().get("access_token")
-    except Exception as e:
-        logger.error(f"Failed to acquire Oracle token: {e}")
-        return None
+    """Returns the cached OAuth2 access token for Oracle CRM (refreshed shortly before expiry)"""
+    return oracle_client.get_token()
 
 def get_from_oracle(endpoint, params=None):
-    """Generic Oracle API Caller with Bearer token and robust session"""
-    token = get_oracle_token()
+    """Generic Oracle API Caller over the shared pooled client (cached token, retries)"""
     url = f"{ORACLE_BASE_URL}/crmRestApi/resources/{ORACLE_API_VERSION}/{endpoint}"
-    
-    headers = {"Content-Type": "application/json"}
-    auth = None
-
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-    elif ORACLE_USER and ORACLE_PASS:
-        auth = HTTPBasicAuth(ORACLE_USER, ORACLE_PASS)
-    else:
-        raise Exception("No Oracle credentials found.")
 
     try:
-        session = get_robust_session()
-        
-        # DEBUG: Show the complete URL with parameters
-        from urllib.parse import urlencode
-        if params:
-            debug_url = f"{url}?{urlencode(params)}"
-            logger.info(f"API Request: GET {debug_url}")
-        else:
-            logger.info(f"API Request: GET {url}")
-        
-        response = session.get(url, headers=headers, auth=auth, params=params, timeout=90)
-        
-        # DEBUG: Log Status and Raw Body
-        logger.info(f"Response Status: {response.status_code}")
-        
-        # Log the actual URL that was called
-        logger.info(f"Actual URL: {response.url}")
-        
-        try:
-            raw_data = response.json()
-            # Log a small preview of the keys to avoid terminal bloat
-            logger.info(f"Response Keys: {list(raw_data.keys())}")
-            
-            # If we have items, show count
-            if "items" in raw_data:
-                logger.info(f"Items in response: {len(raw_data.get('items', []))}")
-        except:
-            logger.info(f"📄 Raw Body (first 500 chars): {response.text[:500]}")
+        response = oracle_client.get(url, params=params, timeout=90)
+        logger.info(f"API Request: GET {response.url} -> {response.status_code}")
 
         if response.status_code in [401, 403]:
             return {"error": "Authentication failed", "status": response.status_code}
             
-        if not response.ok:
+        if not response.is_success:
             logger.error(f"Oracle API Error ({response.status_code}): {response.text}")
             return {"error": response.text, "status": response.status_code}
 
-        return response.json()
+        data = oracle_client.json_body(response)
+        if "items" in data:
+            logger.info(f"Items in response: {len(data.get('items', []))}")
+        return data
     except Exception as e:
         logger.error(f"Oracle API call failed ({endpoint}): {e}")
         return {"error": str(e)}
 
 def get_auth_header():
     """Helper to return the correct Authorization header"""
-    token = get_oracle_token()
-    if token:
-        return {"Authorization": f"Bearer {token}"}
-    elif ORACLE_USER and ORACLE_PASS:
-        auth_str = f"{ORACLE_USER}:{ORACLE_PASS}"
-        encoded_auth = base64.b64encode(auth_str.encode()).decode()
-        return {"Authorization": f"Basic {encoded_auth}"}
-    return {}
+    try:
+        return oracle_client.auth_headers()
+    except Exception:
+        return {}
 
-def get_all_opportunities(batch_size=50, since_date=None):
+def get_all_opportunities(batch_size=50, since_date=None, outcome=None):
     """
     Batch Opportunity Fetching using Oracle Finder API.
     Refactored to avoid 400 Bad Request by separating total count check from data fetch.
+    If given, 'outcome' (a dict) receives complete=True only when Oracle reported the
+    end of data; an API error or the MAX_RECORDS cap leaves complete=False with 'error'.
     """
+    outcome = {} if outcome is None else outcome
+    outcome.update(complete=False, error=None)
     
     offset = 0
     total_count = 0
@@ -157,18 +88,16 @@ def get_all_opportunities(batch_size=50, since_date=None):
     
     while total_count < MAX_RECORDS:
         # Simplified query known to work in this environment
-        params = {
-            "q": "StatusCode='OPEN'",  
-            "onlyData": "true",
-            "limit": batch_size,
-            "offset": offset
-        }
+        params = projection_params(
+            q="StatusCode='OPEN'",
+            limit=batch_size,
+            offset=offset
+        )
         
         # Add incremental sync filter if date provided
         if since_date:
-            oracle_date = since_date.replace('T', ' ')
-            params["q"] += f" AND LastUpdateDate > '{oracle_date}'"
-            logger.info(f"Incremental sync from: {oracle_date}")
+            params["q"] += f" AND {since_clause(since_date)}"
+            logger.info(f"Incremental sync from: {since_date}")
         else:
             logger.info(f"Full sync mode (StatusCode='OPEN')")
         
@@ -178,6 +107,7 @@ def get_all_opportunities(batch_size=50, since_date=None):
         # Check for errors
         if "error" in data: 
             logger.error(f"Sync halted due to API error: {data['error']}")
+            outcome["error"] = f"API error at offset {offset}: {data['error']}"
             break
             
         items = data.get("items", [])
@@ -191,6 +121,7 @@ def get_all_opportunities(batch_size=50, since_date=None):
         # No more items
         if not items: 
             logger.info(f"Sync complete. Total opportunities fetched: {total_count}")
+            outcome["complete"] = True
             break
             
         total_count += len(items)
@@ -199,17 +130,22 @@ def get_all_opportunities(batch_size=50, since_date=None):
         # Check if more pages exist
         if not data.get("hasMore", False): 
             logger.info(f"Reached end of data. Total: {total_count} opportunities")
+            outcome["complete"] = True
             break
             
         offset += batch_size
         logger.info(f"→ Fetching next batch (offset: {offset})...")
+    else:
+        # Cap reached while Oracle still reports more data
+        logger.warning(f"Stopped at MAX_RECORDS={MAX_RECORDS}; remaining opportunities were not fetched.")
+        outcome["error"] = f"Stopped at MAX_RECORDS={MAX_RECORDS} with more data pending"
 
 
 def fetch_single_opportunity(identifier):
     """Deep Fetch for specific OptyNumber, OptyId, or Name"""
     finder = f"MyOpportunitiesFinder;RecordSet='ALLOPTIES'"
     query = f"RecordSet='ALL';(OptyNumber = '{identifier}' OR OptyId = '{identifier}' OR Name = '{identifier}')"
-    params = {"finder": finder, "q": query, "onlyData": "true", "limit": 1}
+    params = projection_params(finder=finder, q=query, limit=1)
     data = get_from_oracle("opportunities", params=params)
     items = data.get("items", [])
     return items[0] if items else None
@@ -218,130 +154,72 @@ def fetch_opportunity_by_name(name):
     """Specific search by Name for UI-interlinking"""
     finder = f"MyOpportunitiesFinder;RecordSet='ALLOPTIES'"
     query = f"RecordSet='ALL';Name = '{name}'"
-    params = {"finder": finder, "q": query, "onlyData": "true", "limit": 1}
+    params = projection_params(finder=finder, q=query, limit=1)
     data = get_from_oracle("opportunities", params=params)
     items = data.get("items", [])
     return items[0] if items else None
 
 def map_oracle_to_db(item):
-    """
-    Robustly map Oracle JSON to our internal database model.
-    Addresses Hint #3: Logs errors instead of silent failure.
-    """
-    try:
-        opty_id = str(item.get("OptyId"))
-        if not opty_id:
-            logger.warning(f"Item missing OptyId: {item.get('Name')}")
-            return None
-        
-        # Parse Dates
-        def parse_date(date_str):
-            if not date_str: return None
-            try:
-                # Handle Oracle Z and +00:00 formats
-                return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-            except:
-                return None
-
-        last_update_str = item.get("LastUpdateDate") or item.get("OptyLastUpdateDate")
-        crm_last_updated_at = parse_date(last_update_str) or datetime.utcnow()
-        
-        close_date = None
-        eff_date = item.get("EffectiveDate")
-        if eff_date:
-            try:
-                # Oracle dates often have T00:00:00.000+00:00
-                close_date = datetime.strptime(eff_date[:10], "%Y-%m-%d")
-            except: pass
-
-        return {
-            "opp_id": opty_id,
-            "opp_number": str(item.get("OptyNumber") or opty_id),
-            "opp_name": item.get("Name") or "Unknown Opportunity",
-            "customer_name": item.get("TargetPartyName") or "Unknown Account",
-            "geo": item.get("GEO_c") or item.get("Geo_c") or "Global",
-            "currency": item.get("CurrencyCode", "USD"),
-            "deal_value": float(item.get("Revenue") or 0),
-            "stage": item.get("SalesStage"),
-            "close_date": close_date,
-            "crm_last_updated_at": crm_last_updated_at,
-            "practice_name_temp": item.get("Practice_c"), # Internal temp field for practice resolution
-            "is_active": True
-        }
-    except Exception as e:
-        logger.error(f"Mapping Error for {item.get('OptyId', 'Unknown')}: {e}")
-        return None
+    """Maps one Oracle JSON item to our internal database model (see oracle_mapping.map_batch)."""
+    return map_one(item)
 
-def sync_opportunities_to_db(db_session=None):
+def sync_opportunities_to_db(db_session=None, full=False):
     """
     Core sync high-level implementation.
     Addresses Hint #1 (Batch Commit), Hint #2 (JSON Item Parsing), Hint #3 (Logging).
+    Incremental from the persisted watermark unless a full reconcile is requested or due.
     """
     from backend.app.core.database import SessionLocal
-    from backend.app.models import Opportunity, Practice, SyncMeta
-    import uuid
+    from backend.app.services.bulk_writer import upsert_opportunities
 
     db = db_session or SessionLocal()
     total_processed = 0
     total_saved = 0
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0}
     start_time = datetime.utcnow()
-
-    logger.info("Starting robust synchronization...")
+    mode, since_date = "FULL", None
+    high_water = None
+    failed_batches = 0
+    fetch = {}
 
     try:
-        # Loop through batches yielded by get_all_opportunities
-        # Note: get_all_opportunities already implements Hint #2 (items = data.get('items', []))
-        for batch in get_all_opportunities(batch_size=50):
-            batch_objects = []
-            
-            for item in batch:
-                mapped_data = map_oracle_to_db(item)
-                if not mapped_data:
-                    continue
-                
-                total_processed += 1
-                
-                # 1. Resolve Practice (Side Effect but needed)
-                practice_val = mapped_data.pop("practice_name_temp")
-                if practice_val:
-                    practice = db.query(Practice).filter(Practice.practice_name == practice_val).first()
-                    if not practice:
-                        practice = Practice(
-                            practice_id=str(uuid.uuid4()),
-                            practice_code=practice_val.upper().replace(" ", "_")[:20],
-                            practice_name=practice_val
-                        )
-                        db.add(practice)
-                        db.flush() # Ensure ID generated but don't commit yet
-                    mapped_data["primary_practice_id"] = practice.practice_id
-
-                # 2. Upsert Opportunity
-                existing = db.query(Opportunity).filter(Opportunity.opp_id == mapped_data["opp_id"]).first()
-                if existing:
-                    for key, value in mapped_data.items():
-                        setattr(existing, key, value)
-                else:
-                    db.add(Opportunity(**mapped_data))
-                
-                total_saved += 1
-            
-            # --- Hint #1: COMMIT AFTER THE BATCH LOOP ---
-            try:
-                db.commit()
-                logger.info(f"Committed batch of {len(batch)} items. Total saved: {total_saved}")
-            except Exception as e:
-                db.rollback()
-                logger.error(f"Batch commit FAILED: {e}. Attempting to salvage next batch.")
-
-        # Final Update to SyncMeta
-        meta = db.query(SyncMeta).filter(SyncMeta.meta_key == "oracle_sync_v2").first()
-        if not meta:
-            meta = SyncMeta(meta_key="oracle_sync_v2")
-            db.add(meta)
-        meta.last_sync_timestamp = datetime.utcnow()
-        meta.sync_status = "SUCCESS"
-        meta.records_processed = total_saved
-        db.commit()
+        mode, since_date = plan_sync(db, full=full)
+        practice_cache.warm(db)
+        logger.info(f"Starting robust synchronization ({mode}, since={since_date})...")
+
+        with track_run("oracle_service", mode=mode) as run:
+            # Loop through batches yielded by get_all_opportunities
+            # Note: get_all_opportunities already implements Hint #2 (items = data.get('items', []))
+            for batch in run.timed_pages(get_all_opportunities(batch_size=50, since_date=since_date, outcome=fetch)):
+                with run.stage("map"):
+                    mapped = map_batch(batch)
+                total_processed += len(mapped)
+
+                # --- Hint #1: ONE set-based upsert + commit per batch ---
+                try:
+                    with run.stage("write"):
+                        stats = upsert_opportunities(db, mapped)
+                        db.commit()
+                    run.add_write(stats)
+                    for k in totals: totals[k] += stats[k]
+                    total_saved += stats["inserted"] + stats["updated"]
+                    high_water = max_seen(batch, high_water)
+                    logger.info(f"Committed batch of {len(batch)} items. Total saved: {total_saved}")
+                except Exception as e:
+                    db.rollback()
+                    failed_batches += 1
+                    run.add_failed(len(mapped), e)
+                    logger.error(f"Batch commit FAILED: {e}. Attempting to salvage next batch.")
+
+            # Final Update to SyncMeta; a run with lost batches or an unfinished fetch
+            # must not advance the watermark (unread pages may hold older timestamps)
+            if fetch.get("error"):
+                run.error(fetch["error"])
+            complete = not failed_batches and fetch.get("complete", False)
+            meta = record_sync(db, mode, high_water, complete=complete, **totals)
+            meta.sync_status = run.status = "SUCCESS" if complete else "PARTIAL"
+            meta.records_processed = total_saved
+            db.commit()
         
     except Exception as e:
         logger.error(f"CRITICAL SYNC FAILURE: {e}")
@@ -352,8 +230,9 @@ def sync_opportunities_to_db(db_session=None):
             
     duration = (datetime.utcnow() - start_time).total_seconds()
     logger.info(f"Sync Complete! Processed: {total_processed}, Saved: {total_saved} in {duration:.2f}s")
-    return {"processed": total_processed, "saved": total_saved}
+    return {"processed": total_processed, "saved": total_saved, "mode": mode, "since": since_date, **totals}
 
 if __name__ == "__main__":
     # Test run
-    sync_opportunities_to_db()
+    if run_tracked("cli", sync_opportunities_to_db) is SKIPPED:
+        sys.exit("Another sync is running in this or another process; not starting a second one.")
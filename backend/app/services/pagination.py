@@ -0,0 +1,38 @@
+"""
+Keyset (cursor) pagination helpers for opportunity listings.
+
+The cursor is an opaque, URL-safe token encoding the sort key of the last row
+served: (crm_last_updated_at, opp_id). Seeking past it uses the composite
+index ix_opportunity_active_updated, so deep pages cost the same as page 1
+and rows written by a concurrent sync are neither skipped nor repeated.
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import desc, tuple_
+from backend.app.models import Opportunity
+
+# Stable total order for listings; opp_id breaks ties between equal timestamps
+LIST_ORDER = (desc(Opportunity.crm_last_updated_at), desc(Opportunity.opp_id))
+
+
+def encode_cursor(o):
+    """Cursor pointing just after the given opportunity row."""
+    payload = json.dumps([o.crm_last_updated_at.isoformat() if o.crm_last_updated_at else None, o.opp_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Returns (crm_last_updated_at, opp_id). Raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, opp_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return datetime.fromisoformat(ts), str(opp_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def after_cursor(cursor: str):
+    """Predicate selecting rows that sort strictly after the cursor under LIST_ORDER."""
+    ts, opp_id = decode_cursor(cursor)
+    return tuple_(Opportunity.crm_last_updated_at, Opportunity.opp_id) < tuple_(ts, opp_id)
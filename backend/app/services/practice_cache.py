@@ -0,0 +1,127 @@
+"""
+In-process cache of the practice dimension (name/code -> practice_id).
+
+Warmed once at the start of each sync run, so resolving Practice_c costs a
+dict lookup instead of a query per batch. Practices the CRM introduces are
+created with one INSERT ... ON CONFLICT (practice_code) DO NOTHING RETURNING
+per batch. Concurrent batches, or another process, racing to create the same
+practice therefore converge on one row instead of failing on the unique code.
+ORM writes to Practice anywhere in the process invalidate the cache.
+"""
+import logging
+import threading
+import uuid
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from backend.app.models import Practice
+
+logger = logging.getLogger(__name__)
+
+
+def practice_code(name):
+    return name.upper().replace(" ", "_")[:20]
+
+
+class PracticeCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_name = {}
+        self._by_code = {}
+        self.warmed = False
+        self.stats = {"hits": 0, "misses": 0, "created": 0, "warms": 0}
+
+    def warm(self, db: Session = None):
+        """Reloads the whole dimension (it is small). Opens its own session if none is given."""
+        from backend.app.core.database import SessionLocal
+        own = db is None
+        db = db or SessionLocal()
+        try:
+            rows = db.query(Practice.practice_name, Practice.practice_code, Practice.practice_id).all()
+        finally:
+            if own:
+                db.close()
+        with self._lock:
+            self._by_name = {name: pid for name, _, pid in rows}
+            self._by_code = {code: pid for _, code, pid in rows if code}
+            self.warmed = True
+            self.stats["warms"] += 1
+        logger.info(f"Practice cache warmed with {len(rows)} practices")
+
+    def invalidate(self):
+        with self._lock:
+            self._by_name, self._by_code = {}, {}
+            self.warmed = False
+
+    def _lookup(self, name):
+        return self._by_name.get(name) or self._by_code.get(practice_code(name))
+
+    def resolve(self, db: Session, names):
+        """Returns {name: practice_id} for the given names, creating missing practices in one statement."""
+        if not self.warmed:
+            self.warm(db)
+
+        names = {n for n in names if n}
+        resolved, missing = {}, []
+        with self._lock:
+            for name in names:
+                pid = self._lookup(name)
+                if pid:
+                    resolved[name] = pid
+                else:
+                    missing.append(name)
+            self.stats["hits"] += len(resolved)
+            self.stats["misses"] += len(missing)
+
+        if missing:
+            resolved.update(self._create(db, missing))
+        return resolved
+
+    def _create(self, db: Session, names):
+        from backend.app.core.database import dialect_insert
+        insert = dialect_insert(db)
+
+        by_code = {}
+        for name in sorted(names):
+            by_code.setdefault(practice_code(name), name)
+        values = [{"practice_id": str(uuid.uuid4()), "practice_code": code, "practice_name": name}
+                  for code, name in by_code.items()]
+        table = Practice.__table__
+        stmt = insert(table).values(values).on_conflict_do_nothing(index_elements=[table.c.practice_code]) \
+            .returning(table.c.practice_code, table.c.practice_id)
+        code_to_id = {code: pid for code, pid in db.execute(stmt).fetchall()}
+
+        # Codes another writer created first come back empty; read their ids
+        lost = [code for code in by_code if code not in code_to_id]
+        if lost:
+            code_to_id.update(dict(db.query(Practice.practice_code, Practice.practice_id)
+                                   .filter(Practice.practice_code.in_(lost)).all()))
+
+        with self._lock:
+            self._by_code.update(code_to_id)
+            self.stats["created"] += len(by_code) - len(lost)
+        # Ids inserted in this transaction are only real once it commits
+        db.info["practices_created"] = True
+        if len(by_code) > len(lost):
+            logger.info(f"Created {len(by_code) - len(lost)} new practices")
+        return {name: code_to_id.get(practice_code(name)) for name in names}
+
+
+practice_cache = PracticeCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _practices_committed(session):
+    session.info.pop("practices_created", None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _practices_rolled_back(session):
+    if session.info.pop("practices_created", None):
+        practice_cache.invalidate()
+
+
+@event.listens_for(Practice, "after_insert")
+@event.listens_for(Practice, "after_update")
+@event.listens_for(Practice, "after_delete")
+def _practice_changed(mapper, connection, target):
+    practice_cache.invalidate()
@@ -0,0 +1,117 @@
+"""
+Soft-delete reconciliation: retires opportunities that are no longer open in Oracle.
+
+Syncs only see rows Oracle returns, so an opportunity that was deleted or
+left the open set without passing through a sync page would stay active
+forever. A reconciliation pass:
+
+    1. pages every open OptyId from Oracle by key (same finder as the sync,
+       fields=OptyId only, 500 per page)
+    2. stages the ids in a temporary table (primary key, analyzed)
+    3. anti-joins it against the active opportunities and flips is_active
+       off for the rows that are gone, in one UPDATE
+
+Nothing is deleted; workflow history stays intact, and a row that reappears
+in Oracle is reactivated by the next upsert. A partial id list must never
+drive deactivation, so any failed page aborts the pass. A pass that would
+retire more than SYNC_RECONCILE_MAX_FRACTION of the active rows is refused.
+"""
+import logging
+import os
+from datetime import datetime
+from sqlalchemy import Column, MetaData, String, Table, exists, func, select, text, update
+from sqlalchemy.orm import Session
+from backend.app.models import Opportunity
+from backend.app.services import oracle_client
+from backend.app.services.oracle_fields import FINDER, KEYSET_ORDER, OPEN_STATUS, after_opty_id, opty_id_key
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 500  # Oracle REST caps 'limit' at 500
+STAGE_CHUNK = 10000
+MAX_DEACTIVATE_FRACTION = float(os.getenv("SYNC_RECONCILE_MAX_FRACTION", "0.5"))
+
+_live_ids = Table("tmp_live_opp_ids", MetaData(), Column("opp_id", String, primary_key=True),
+                  prefixes=["TEMPORARY"])
+
+
+def fetch_live_ids():
+    """
+    Every open OptyId in Oracle. Pages by key (OptyId > last id read), so rows that
+    close mid-fetch cannot shift a live id past the pages. Raises if any page fails or
+    ids do not arrive in ascending order, since a gap would retire live rows.
+    """
+    ids, last = [], None
+    while True:
+        params = {"finder": FINDER, "q": after_opty_id(f"StatusCode='{OPEN_STATUS}'", last), "fields": "OptyId",
+                  "onlyData": "true", "orderBy": KEYSET_ORDER, "limit": PAGE_SIZE}
+        response = oracle_client.get(oracle_client.api_url("opportunities"), params=params)
+        if response.status_code != 200:
+            raise Exception(f"Live id fetch failed after OptyId {last}: {response.status_code} - {response.text[:200]}")
+        data = oracle_client.json_body(response)
+        items = data.get("items", [])
+        for item in items:
+            if not item.get("OptyId"):
+                continue
+            opty_id = str(item["OptyId"])
+            if last is not None and opty_id_key(opty_id) <= opty_id_key(last):
+                raise Exception(f"Live ids out of order: {opty_id} after {last}; reconcile aborted")
+            ids.append(opty_id)
+            last = opty_id
+        if not items or not data.get("hasMore", len(items) == PAGE_SIZE):
+            return ids
+
+
+def deactivate_missing(db: Session, live_ids, max_fraction=None):
+    """
+    Sets is_active = false on active opportunities whose id is not in live_ids.
+    Does not commit; the caller owns the transaction.
+    Returns {"live": n, "active": n, "deactivated": n, "refused": bool}.
+    """
+    max_fraction = MAX_DEACTIVATE_FRACTION if max_fraction is None else max_fraction
+    live_ids = sorted(set(live_ids))
+    opp = Opportunity.__table__
+    result = {"live": len(live_ids), "active": 0, "deactivated": 0, "refused": False}
+    if not live_ids:
+        logger.warning("Reconcile skipped: Oracle returned no open opportunities.")
+        result["refused"] = True
+        return result
+
+    conn = db.connection()
+    # 1. Stage the live set (sorted inserts keep the temp PK index compact)
+    _live_ids.drop(conn, checkfirst=True)
+    _live_ids.create(conn)
+    try:
+        for start in range(0, len(live_ids), STAGE_CHUNK):
+            conn.execute(_live_ids.insert(), [{"opp_id": i} for i in live_ids[start:start + STAGE_CHUNK]])
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(f"ANALYZE {_live_ids.name}"))
+
+        # 2. Anti-join: active rows with no live counterpart
+        gone = ~exists().where(_live_ids.c.opp_id == opp.c.opp_id)
+        active = conn.execute(select(func.count()).select_from(opp).where(opp.c.is_active == True)).scalar()
+        stale = conn.execute(select(func.count()).select_from(opp).where(opp.c.is_active == True, gone)).scalar()
+        result["active"] = active
+        if active and stale / active > max_fraction:
+            logger.error(f"Reconcile refused: {stale} of {active} active opportunities are missing from Oracle "
+                         f"(limit {max_fraction:.0%}).")
+            result["refused"] = True
+            return result
+
+        # 3. One set-based soft delete
+        if stale:
+            conn.execute(update(opp).where(opp.c.is_active == True, gone)
+                         .values(is_active=False, local_last_synced_at=datetime.utcnow()))
+        result["deactivated"] = stale
+        logger.info(f"Reconcile: {len(live_ids)} live in Oracle, {active} active locally, {stale} deactivated")
+        return result
+    finally:
+        _live_ids.drop(conn, checkfirst=True)
+
+
+def reconcile_closed(db: Session):
+    """Fetches the live id set and deactivates what is gone, committing once."""
+    live_ids = fetch_live_ids()
+    result = deactivate_missing(db, live_ids)
+    db.commit()
+    return result
@@ -0,0 +1,189 @@
+"""
+Resumable, checkpointed full sync of the opportunity table.
+
+For multi-hour initial loads. Pages are fetched by key (OptyId ascending,
+each page asking for ids past the last committed one) and each page is
+bulk-upserted. The checkpoint (last OptyId, running totals, max
+LastUpdateDate seen) is written in the SAME transaction as the page, so
+after a crash or restart the run resumes at exactly the first uncommitted
+page: no page is skipped and none is applied twice. Unlike an offset, the
+key stays valid while opportunities close during the pass.
+
+The checkpoint lives in SyncMeta('resumable:<sync_name>').extra_info. When a
+run completes, it seeds the incremental sync watermark with the pass start
+time (or the newest LastUpdateDate seen, if older): rows changed after their
+page was read carry a later timestamp and are picked up incrementally.
+"""
+import logging
+from datetime import datetime
+from sqlalchemy.orm import Session
+from backend.app.models import Opportunity, SyncMeta
+from backend.app.services import oracle_client
+from backend.app.services.bulk_writer import upsert_opportunities
+from backend.app.services.oracle_fields import FINDER, KEYSET_ORDER, after_opty_id, opty_id_key, projection_params
+from backend.app.services.oracle_mapping import map_batch
+from backend.app.services.practice_cache import practice_cache
+from backend.app.services.reconcile import reconcile_closed
+from backend.app.services.sync_ledger import start_run, finish_run
+from backend.app.services.sync_watermark import max_seen, record_sync
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 500  # Oracle REST caps 'limit' at 500 rows per request
+
+
+def _meta_key(sync_name):
+    return f"resumable:{sync_name}"
+
+
+def _fresh_checkpoint():
+    return {"last_opty_id": None, "total_synced": 0, "watermark": None, "is_complete": False,
+            "started_at": datetime.utcnow().isoformat(), "batches": 0}
+
+
+def load_checkpoint(db: Session, sync_name):
+    """Returns (meta, checkpoint dict), creating the row for a first run."""
+    meta = db.query(SyncMeta).filter(SyncMeta.meta_key == _meta_key(sync_name)).first()
+    if not meta:
+        meta = SyncMeta(meta_key=_meta_key(sync_name), extra_info=_fresh_checkpoint())
+        db.add(meta)
+        db.flush()
+    return meta, dict(meta.extra_info or _fresh_checkpoint())
+
+
+def _save_checkpoint(meta, checkpoint, status):
+    meta.extra_info = dict(checkpoint)
+    meta.sync_status = status
+    meta.records_processed = checkpoint["total_synced"]
+    meta.last_sync_timestamp = datetime.utcnow()
+
+
+def fetch_page(after_id, batch_size):
+    """The next page of open opportunities with OptyId past after_id (None: the first page)."""
+    params = projection_params(finder=FINDER, q=after_opty_id("StatusCode='OPEN'", after_id),
+                               orderBy=KEYSET_ORDER, limit=batch_size)
+    response = oracle_client.get(oracle_client.api_url("opportunities"), params=params)
+    if response.status_code != 200:
+        raise Exception(f"API Error: {response.status_code} - {response.text[:200]}")
+    return oracle_client.json_body(response)
+
+
+def run_resumable_sync(batch_size=DEFAULT_BATCH_SIZE, sync_name="oracle_opportunities", max_batches=None):
+    """
+    Runs (or resumes) the full sync. Returns the final checkpoint.
+    max_batches bounds one invocation; the next call resumes where it stopped.
+    """
+    from backend.app.core.database import SessionLocal
+
+    batch_size = max(1, min(int(batch_size), MAX_BATCH_SIZE))
+    run = start_run(f"resumable:{sync_name}", mode="FULL")
+    db = SessionLocal()
+    try:
+        meta, checkpoint = load_checkpoint(db, sync_name)
+        if checkpoint.get("is_complete"):
+            logger.info(f"Previous '{sync_name}' run complete; starting a new full pass.")
+            checkpoint = _fresh_checkpoint()
+        elif checkpoint.get("last_opty_id"):
+            logger.info(f"Resuming '{sync_name}' after OptyId {checkpoint['last_opty_id']} ({checkpoint['total_synced']} synced so far)")
+        _save_checkpoint(meta, checkpoint, "RUNNING")
+        db.commit()
+        practice_cache.warm(db)
+
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            # 1. Fetch (nothing is written if this fails; the checkpoint still points here)
+            with run.stage("fetch"):
+                data = fetch_page(checkpoint.get("last_opty_id"), batch_size)
+            items = data.get("items", [])
+            if not items:
+                checkpoint["is_complete"] = True
+                break
+            last_id = str(items[-1]["OptyId"])
+            if checkpoint.get("last_opty_id") and opty_id_key(last_id) <= opty_id_key(checkpoint["last_opty_id"]):
+                raise Exception(f"Oracle page did not advance past OptyId {checkpoint['last_opty_id']} (got {last_id})")
+            run.add_page(items)
+
+            # 2. Page + checkpoint commit atomically
+            with run.stage("map"):
+                mapped = map_batch(items)
+            with run.stage("write"):
+                stats = upsert_opportunities(db, mapped)
+                high = max_seen(items, datetime.fromisoformat(checkpoint["watermark"]) if checkpoint["watermark"] else None)
+                checkpoint.update(
+                    last_opty_id=last_id,
+                    total_synced=checkpoint["total_synced"] + stats["inserted"] + stats["updated"],
+                    watermark=high.isoformat() if high else None,
+                    batches=checkpoint["batches"] + 1,
+                )
+                _save_checkpoint(meta, checkpoint, "RUNNING")
+                db.commit()
+            run.add_write(stats)
+            batches += 1
+            logger.info(f"Checkpoint '{sync_name}': after OptyId {last_id}, synced {checkpoint['total_synced']}")
+
+            if not data.get("hasMore", len(items) == batch_size):
+                checkpoint["is_complete"] = True
+                break
+
+        # 3. Finish: a completed full pass hands its watermark to incremental sync. Rows that
+        # changed after their page was read are newer than the pass start, so cap it there.
+        if checkpoint["is_complete"]:
+            checkpoint["completed_at"] = datetime.utcnow().isoformat()
+            high = datetime.fromisoformat(checkpoint["watermark"]) if checkpoint["watermark"] else None
+            started = datetime.fromisoformat(checkpoint["started_at"])
+            record_sync(db, "FULL", min(high, started) if high else None)
+        _save_checkpoint(meta, checkpoint, "SUCCESS" if checkpoint["is_complete"] else "PAUSED")
+        db.commit()
+
+        # 4. A completed pass retires opportunities that are no longer open in Oracle
+        if checkpoint["is_complete"]:
+            try:
+                run.counts["deactivated"] += reconcile_closed(db)["deactivated"]
+            except Exception as e:
+                db.rollback()
+                run.error(f"Reconcile failed: {e}")
+                logger.warning(f"Reconcile after '{sync_name}' skipped: {e}")
+        finish_run(run, "SUCCESS" if checkpoint["is_complete"] else "PAUSED")
+        return checkpoint
+    except Exception as e:
+        db.rollback()
+        finish_run(run, "FAILED", str(e)[:2000])
+        logger.error(f"Resumable sync '{sync_name}' stopped: {e}. It will resume from the last checkpoint.")
+        try:
+            meta, checkpoint = load_checkpoint(db, sync_name)
+            meta.sync_status = "FAILED"
+            db.commit()
+        except Exception:
+            db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def get_checkpoint(sync_name="oracle_opportunities"):
+    from backend.app.core.database import SessionLocal
+    db = SessionLocal()
+    try:
+        meta = db.query(SyncMeta).filter(SyncMeta.meta_key == _meta_key(sync_name)).first()
+        if not meta:
+            return None
+        return {**(meta.extra_info or {}), "status": meta.sync_status,
+                "last_sync_at": meta.last_sync_timestamp.isoformat() if meta.last_sync_timestamp else None}
+    finally:
+        db.close()
+
+
+def reset_checkpoint(sync_name="oracle_opportunities"):
+    from backend.app.core.database import SessionLocal
+    db = SessionLocal()
+    try:
+        meta, _ = load_checkpoint(db, sync_name)
+        _save_checkpoint(meta, _fresh_checkpoint(), "RESET")
+        db.commit()
+    finally:
+        db.close()
+
+
+def count_synced(db: Session):
+    return db.query(Opportunity).filter(Opportunity.is_active == True).count()
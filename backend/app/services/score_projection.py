@@ -0,0 +1,82 @@
+"""
+Latest-score-version projection, denormalized onto Opportunity.
+
+Listings, the detail view, approvals and scoring all need "the newest score
+version of this opportunity". Instead of a correlated ORDER BY version_no
+DESC LIMIT 1 lookup per use, Opportunity carries a copy of that version's
+id, number, status, overall score and SA/SP submission flags (the
+latest_* columns).
+
+The copy is maintained in the writer's transaction: any ORM flush that
+inserts, updates or deletes an OppScoreVersion refreshes the projection for
+the affected opportunities with one set-based UPDATE. heal_database()
+backfills rows whose projection is missing or stale (e.g. after raw SQL
+writes).
+"""
+from collections import namedtuple
+from sqlalchemy import event, or_, select, update
+from sqlalchemy.orm import Session
+from backend.app.models import Opportunity, OppScoreVersion
+
+# Opportunity projection column -> OppScoreVersion source column
+PROJECTION = {
+    "latest_version_id": "score_version_id",
+    "latest_version_no": "version_no",
+    "latest_version_status": "status",
+    "latest_overall_score": "overall_score",
+    "latest_sa_submitted": "sa_submitted",
+    "latest_sp_submitted": "sp_submitted",
+}
+
+LatestVersion = namedtuple("LatestVersion", list(PROJECTION.values()))
+
+
+def latest_version_of(opp):
+    """The projected latest version of an opportunity (read-only), or None if it has none."""
+    if opp is None or opp.latest_version_id is None:
+        return None
+    return LatestVersion(*(getattr(opp, col) for col in PROJECTION))
+
+
+def _latest(column):
+    opp, ver = Opportunity.__table__, OppScoreVersion.__table__
+    return select(ver.c[column]).where(ver.c.opp_id == opp.c.opp_id) \
+        .order_by(ver.c.version_no.desc(), ver.c.created_at.desc()).limit(1).scalar_subquery()
+
+
+def refresh_latest_versions(conn, opp_ids=None):
+    """
+    Recomputes the projection in one UPDATE. With opp_ids, refreshes exactly those
+    opportunities; without, only rows where any projected column differs from the
+    latest version (e.g. a status or score changed by raw SQL, not just a new version).
+    Returns the number of rows updated.
+    """
+    opp = Opportunity.__table__
+    stmt = update(opp).values({col: _latest(src) for col, src in PROJECTION.items()})
+    if opp_ids is not None:
+        if not opp_ids:
+            return 0
+        stmt = stmt.where(opp.c.opp_id.in_(sorted(opp_ids)))
+    else:
+        stmt = stmt.where(or_(*(opp.c[col].is_distinct_from(_latest(src)) for col, src in PROJECTION.items())))
+    return conn.execute(stmt).rowcount
+
+
+@event.listens_for(Session, "after_flush")
+def _versions_flushed(session, flush_context):
+    changed = {obj.opp_id for obj in session.new | session.dirty | session.deleted
+               if isinstance(obj, OppScoreVersion)}
+    if changed:
+        session.info.setdefault("versions_changed", set()).update(changed)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _refresh_projection(session, flush_context):
+    opp_ids = session.info.pop("versions_changed", None)
+    if not opp_ids:
+        return
+    refresh_latest_versions(session.connection(), opp_ids)
+    # Loaded opportunities re-read the projection on next access
+    for opp in list(session.identity_map.values()):
+        if isinstance(opp, Opportunity) and opp.opp_id in opp_ids:
+            session.expire(opp, list(PROJECTION))
@@ -0,0 +1,174 @@
+"""
+Vectorized scoring analytics over section scores.
+
+Section values for many score versions are loaded in one query into a
+(versions x sections) NumPy matrix, with NaN where a section has no value.
+Column order follows the section catalog. From it:
+
+    overall_scores      weighted 0-100 score per version (the submit_score formula)
+    fast_track_mask     versions whose score falls in the fast-track band (3.5-4.0 of 5)
+    section_stats       per-section count / mean / variance / min / max
+    score_distribution  portfolio-wide summary of overall scores
+
+recompute_overall_scores() re-derives every stored overall_score in one
+batch pass (one read, one executemany UPDATE), for use when section
+weights change.
+"""
+import logging
+import warnings
+from dataclasses import dataclass
+import numpy as np
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+from backend.app.models import Opportunity, OppScoreSectionValue, OppScoreVersion
+from backend.app.services.score_projection import refresh_latest_versions
+from backend.app.services.section_catalog import section_catalog
+
+logger = logging.getLogger(__name__)
+
+MAX_SECTION_SCORE = 5.0
+FAST_TRACK_BAND = (3.5, 4.0)  # on the 0-5 scale, inclusive
+
+
+@dataclass
+class ScoreMatrix:
+    version_ids: list
+    section_codes: list
+    scores: np.ndarray  # shape (len(version_ids), len(section_codes)); NaN = no value
+
+    def __len__(self):
+        return len(self.version_ids)
+
+
+def load_score_matrix(db: Session, version_ids=None, latest_only=False, statuses=None):
+    """
+    Loads section scores into a ScoreMatrix with one query.
+    version_ids restricts to those versions; latest_only to each active opportunity's
+    latest version; statuses to versions in those statuses. Values for sections not in
+    the catalog are ignored. Versions without any values do not appear.
+    """
+    codes = [s["section_code"] for s in section_catalog.sections(db)]
+    q = db.query(OppScoreSectionValue.score_version_id, OppScoreSectionValue.section_code,
+                 OppScoreSectionValue.score)
+    if version_ids is not None:
+        q = q.filter(OppScoreSectionValue.score_version_id.in_(list(version_ids)))
+    if latest_only:
+        q = q.join(Opportunity, Opportunity.latest_version_id == OppScoreSectionValue.score_version_id) \
+            .filter(Opportunity.is_active == True)
+    if statuses:
+        q = q.join(OppScoreVersion, OppScoreVersion.score_version_id == OppScoreSectionValue.score_version_id) \
+            .filter(OppScoreVersion.status.in_(list(statuses)))
+    rows = q.filter(OppScoreSectionValue.section_code.in_(codes)).all()
+
+    if not rows:
+        return ScoreMatrix([], codes, np.empty((0, len(codes))))
+    vids, row_codes, values = zip(*rows)
+    version_ids, row_index = np.unique(np.array(vids, dtype=object), return_inverse=True)
+    col_of = {code: i for i, code in enumerate(codes)}
+    col_index = np.fromiter((col_of[c] for c in row_codes), dtype=np.intp, count=len(rows))
+
+    scores = np.full((len(version_ids), len(codes)), np.nan)
+    scores[row_index, col_index] = np.asarray(values, dtype=float)
+    return ScoreMatrix(list(version_ids), codes, scores)
+
+
+def weight_vector(matrix: ScoreMatrix, weights=None):
+    weights = section_catalog.weights() if weights is None else weights
+    return np.array([weights.get(code) or 0.0 for code in matrix.section_codes], dtype=float)
+
+
+def overall_scores(matrix: ScoreMatrix, weights=None):
+    """
+    Weighted score per version, 0-100 (int), as submit_score defines it:
+    sum(score * weight) / (sum of weights of the sections present * 5), truncated.
+    """
+    w = weight_vector(matrix, weights)
+    present = ~np.isnan(matrix.scores)
+    weighted = np.where(present, matrix.scores, 0.0) @ w
+    max_s = (present * w).sum(axis=1) * MAX_SECTION_SCORE
+    ratio = np.divide(weighted, max_s, out=np.zeros_like(weighted), where=max_s > 0)
+    # Round off float noise first, so e.g. 65.99999999999999 truncates to 66, not 65
+    return np.trunc(np.round(ratio * 100, 9)).astype(int)
+
+
+def fast_track_mask(scores):
+    """True where an overall score (0-100) falls in the fast-track band on the 0-5 scale."""
+    score_5 = np.asarray(scores, dtype=float) / 100.0 * MAX_SECTION_SCORE
+    low, high = FAST_TRACK_BAND
+    return (score_5 >= low) & (score_5 <= high)
+
+
+def section_stats(matrix: ScoreMatrix, include_zero=False):
+    """
+    Per-section count, mean, variance, min and max. Zero scores are unrated sections
+    (the scoring form posts 0 for them) and are excluded unless include_zero.
+    """
+    scores = matrix.scores if include_zero else np.where(matrix.scores == 0, np.nan, matrix.scores)
+    counts = (~np.isnan(scores)).sum(axis=0)
+    stats = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        means, variances = np.nanmean(scores, axis=0), np.nanvar(scores, axis=0)
+        mins, maxs = np.nanmin(scores, axis=0), np.nanmax(scores, axis=0)
+    for i, code in enumerate(matrix.section_codes):
+        n = int(counts[i])
+        stats[code] = {
+            "count": n,
+            "mean": round(float(means[i]), 3) if n else None,
+            "variance": round(float(variances[i]), 3) if n else None,
+            "min": float(mins[i]) if n else None,
+            "max": float(maxs[i]) if n else None,
+        }
+    return stats
+
+
+def score_distribution(scores):
+    """Summary of overall scores (0-100): count, mean, std, quartiles, fast-track share."""
+    scores = np.asarray(scores, dtype=float)
+    if not scores.size:
+        return {"count": 0}
+    p25, p50, p75 = np.percentile(scores, [25, 50, 75])
+    fast = fast_track_mask(scores)
+    return {
+        "count": int(scores.size),
+        "mean": round(float(scores.mean()), 2),
+        "std": round(float(scores.std()), 2),
+        "p25": float(p25), "p50": float(p50), "p75": float(p75),
+        "min": float(scores.min()), "max": float(scores.max()),
+        "fast_track": int(fast.sum()),
+        "fast_track_share": round(float(fast.mean()), 3),
+    }
+
+
+def recompute_overall_scores(db: Session, weights=None):
+    """
+    Re-derives overall_score for every version that has one, with current weights.
+    Writes only changed rows (one executemany UPDATE) and refreshes the latest-version
+    projection for their opportunities. Does not commit. Returns the number changed.
+    """
+    scored = dict(db.query(OppScoreVersion.score_version_id, OppScoreVersion.overall_score)
+                  .filter(OppScoreVersion.overall_score.isnot(None)).all())
+    if not scored:
+        return 0
+    matrix = load_score_matrix(db)
+    keep = [i for i, vid in enumerate(matrix.version_ids) if vid in scored]
+    matrix = ScoreMatrix([matrix.version_ids[i] for i in keep], matrix.section_codes, matrix.scores[keep])
+    new_scores = overall_scores(matrix, weights)
+    old_scores = np.array([scored[v] for v in matrix.version_ids], dtype=int)
+    changed = np.flatnonzero(new_scores != old_scores)
+    if not changed.size:
+        logger.info(f"Recomputed {len(matrix)} overall scores: none changed")
+        return 0
+
+    table = OppScoreVersion.__table__
+    params = [{"vid": matrix.version_ids[i], "score": int(new_scores[i])} for i in changed]
+    conn = db.connection()
+    conn.execute(update(table).where(table.c.score_version_id == bindparam("vid"))
+                 .values(overall_score=bindparam("score")), params)
+    # Core writes skip the ORM flush hook, so refresh the projection explicitly
+    opp_ids = {opp_id for (opp_id,) in db.query(OppScoreVersion.opp_id)
+               .filter(OppScoreVersion.score_version_id.in_([p["vid"] for p in params])).distinct()}
+    refresh_latest_versions(conn, opp_ids)
+    db.expire_all()
+    logger.info(f"Recomputed {len(matrix)} overall scores: {len(params)} changed")
+    return len(params)
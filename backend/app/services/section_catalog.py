@@ -0,0 +1,103 @@
+"""
+In-process cache of the scoring-section catalog (OppScoreSection).
+
+The nine sections are seeded by init_db and only change at deploy/seed time,
+so scoring endpoints read codes, names, weights and display order from here
+instead of querying the table on every request. The catalog is loaded at
+startup and carries a version stamp (a hash of its content) that
+/api/scoring/sections serves as its ETag.
+
+A committed ORM write to OppScoreSection anywhere in the process (init_db
+seeding, admin edits) invalidates the cache; the next read reloads it.
+Other worker processes reload on their next restart or invalidation.
+"""
+import hashlib
+import json
+import logging
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from backend.app.models import OppScoreSection
+
+logger = logging.getLogger(__name__)
+
+# Frontend descriptive keys -> section codes
+SECTION_ALIASES = {
+    "strategic_fit": "STRAT",
+    "win_probability": "WIN",
+    "financial_value": "FIN",
+    "competitive_position": "COMP",
+    "delivery_feasibility": "FEAS",
+    "customer_relationship": "CUST",
+    "risk_exposure": "RISK",
+    "compliance": "PROD",
+    "legal_readiness": "LEGAL",
+}
+
+
+class SectionCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = None  # (sections in display order, {code: section}, version)
+
+    def load(self, db: Session = None):
+        """(Re)reads the catalog. Opens its own session if none is given."""
+        from backend.app.core.database import SessionLocal
+        own = db is None
+        db = db or SessionLocal()
+        try:
+            rows = db.query(OppScoreSection).order_by(OppScoreSection.display_order).all()
+            sections = [{"section_code": r.section_code, "section_name": r.section_name,
+                         "display_order": r.display_order, "weight": r.weight} for r in rows]
+        finally:
+            if own:
+                db.close()
+        version = hashlib.sha1(json.dumps(sections, sort_keys=True).encode()).hexdigest()[:16]
+        loaded = (sections, {s["section_code"]: s for s in sections}, version)
+        with self._lock:
+            self._loaded = loaded
+        logger.info(f"Section catalog loaded with {len(sections)} sections (version {version})")
+        return loaded
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = None
+
+    def _get(self, db):
+        loaded = self._loaded
+        return loaded if loaded is not None else self.load(db)
+
+    def sections(self, db: Session = None):
+        """Section dicts in display order (shared; do not mutate)."""
+        return self._get(db)[0]
+
+    def version(self, db: Session = None):
+        """Content hash of the catalog; changes whenever a section, weight or order changes."""
+        return self._get(db)[2]
+
+    def weights(self, db: Session = None):
+        return {code: s["weight"] for code, s in self._get(db)[1].items()}
+
+    def resolve(self, key, db: Session = None):
+        """Section code for a code or frontend alias, or None if it is not a known section."""
+        code = SECTION_ALIASES.get(key, key)
+        return code if code in self._get(db)[1] else None
+
+
+section_catalog = SectionCatalog()
+
+
+@event.listens_for(Session, "after_flush")
+def _sections_flushed(session, flush_context):
+    changed = session.new | session.dirty | session.deleted
+    if any(isinstance(obj, OppScoreSection) for obj in changed):
+        session.info["sections_changed"] = True
+        section_catalog.invalidate()
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _sections_settled(session):
+    # A reload between flush and commit may have cached the old rows (or uncommitted ones)
+    if session.info.pop("sections_changed", None):
+        section_catalog.invalidate()
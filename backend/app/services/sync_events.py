@@ -0,0 +1,106 @@
+"""
+In-process event bus for live sync progress.
+
+Sync code publishes from whatever thread it runs on (background sync thread,
+pipeline writer thread, event loop). Each subscriber gets its own bounded
+asyncio.Queue on its own loop, fed with call_soon_threadsafe, so one slow
+dashboard never blocks the sync or the other subscribers: when its queue is
+full its oldest events are dropped. The bus also keeps the latest state of
+the current run and a short replay history (for SSE Last-Event-ID), which
+lets a new subscriber catch up without querying the database.
+
+Event types: run_started, progress, error, run_finished.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+HISTORY_SIZE = 200
+SUBSCRIBER_QUEUE_SIZE = 100
+PROGRESS_INTERVAL = 0.5  # minimum seconds between progress events of one run
+
+
+class Subscription:
+    def __init__(self, bus, loop):
+        self._bus = bus
+        self._loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def _deliver(self, event):
+        # Runs on the subscriber's loop
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Next event, or None if none arrived within timeout seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+class SyncEventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscribers = set()
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._current = None
+
+    def publish(self, event_type, **data):
+        """Thread-safe; never blocks and never raises into the sync."""
+        with self._lock:
+            event = {"id": next(self._ids), "type": event_type,
+                     "at": datetime.utcnow().isoformat(), **data}
+            self._history.append(event)
+            if event_type in ("run_started", "progress", "run_finished"):
+                self._current = event
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub._loop.call_soon_threadsafe(sub._deliver, event)
+            except RuntimeError:  # subscriber's loop has closed
+                logger.debug("Dropping sync event subscriber with a closed loop")
+                self.unsubscribe(sub)
+        return event
+
+    def subscribe(self):
+        """Registers a subscriber on the running event loop."""
+        sub = Subscription(self, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def since(self, last_id):
+        """Buffered events after last_id (for reconnecting clients)."""
+        with self._lock:
+            return [e for e in self._history if e["id"] > last_id]
+
+    def current(self):
+        """Latest state of the running (or last finished) sync run."""
+        with self._lock:
+            return dict(self._current) if self._current else None
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+bus = SyncEventBus()
+
@@ -0,0 +1,268 @@
+"""
+Sync run ledger: one SyncRun row per sync, whichever path ran it.
+
+    with track_run("oracle_service", mode=mode) as run:
+        for items in run.timed_pages(get_all_opportunities(...)):
+            with run.stage("map"):
+                mapped = map_batch(items)
+            with run.stage("write"):
+                run.add_write(upsert_opportunities(db, mapped))
+
+The row is inserted as RUNNING when the run starts and completed when it
+ends, with per-stage wall times, pages, wire bytes, record counts, retries
+and peak Oracle concurrency. Ledger rows are written in their own session,
+so a sync rollback never loses its run record. A ledger write that fails is
+logged and never fails the sync itself.
+
+The recorder also publishes live progress (pages, records written, rate,
+ETA when the total is known, errors) to the sync event bus.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import func
+from backend.app.models import Opportunity, SyncRun
+from backend.app.services import oracle_client
+from backend.app.services.adaptive_limiter import _percentile
+from backend.app.services.sync_events import bus, PROGRESS_INTERVAL
+from backend.app.services.sync_state import snapshot
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("fetch", "map", "write")
+COUNTS = ("pages", "records_fetched", "inserted", "updated", "unchanged", "failed", "deactivated")
+
+
+class RunRecorder:
+    """Accumulates the metrics of one run; track_run() persists them."""
+
+    def __init__(self, source, trigger=None, mode=None):
+        state = snapshot()
+        self.source = source
+        self.trigger = trigger or (state["trigger"] if state["status"] == "RUNNING" else "direct")
+        self.mode = mode
+        self.status = None  # set to PARTIAL/PAUSED by the caller; defaults to SUCCESS
+        self.run_id = None
+        self.stage_seconds = {name: 0.0 for name in STAGES}
+        self.counts = {name: 0 for name in COUNTS}
+        self.retries = 0
+        self.peak_concurrency = 0
+        self.expected = None  # total records, when the source reports it (drives ETA)
+        self._transfer_start = oracle_client.transfer_stats()
+        self._started = time.perf_counter()
+        self._last_progress = 0.0
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] += time.perf_counter() - t0
+
+    def timed_pages(self, pages):
+        """Iterates a page generator, charging the time spent producing each page to 'fetch'."""
+        pages = iter(pages)
+        while True:
+            with self.stage("fetch"):
+                items = next(pages, None)
+            if items is None:
+                return
+            self.add_page(items)
+            yield items
+
+    def add_page(self, items):
+        """Counts one non-empty page as it is fetched."""
+        self.peak_concurrency = max(self.peak_concurrency, 1)
+        self.counts["pages"] += 1
+        self.counts["records_fetched"] += len(items)
+        self._publish_progress()
+
+    def add_write(self, stats):
+        """Adds bulk_writer.upsert_opportunities() counts."""
+        for key in ("inserted", "updated", "unchanged"):
+            self.counts[key] += stats.get(key, 0)
+        self._publish_progress()
+
+    def add_failed(self, n, error=None):
+        self.counts["failed"] += n
+        self.error(error or f"{n} records failed to write")
+
+    def error(self, message):
+        """Publishes a non-fatal error (the run carries on)."""
+        bus.publish("error", run_id=self.run_id, source=self.source, message=str(message)[:500])
+
+    def add_pipeline(self, stats, limiter=None):
+        """
+        Adds sync_pipeline.run_pipeline() stage times and, if given, adaptive limiter metrics.
+        Pages are counted live through run_pipeline(on_page=run.add_page).
+        """
+        for name in STAGES:
+            self.stage_seconds[name] += stats[name]["busy_seconds"]
+        if limiter:
+            self.retries += limiter["retries"]
+            self.peak_concurrency = max(self.peak_concurrency, limiter["peak_in_flight"])
+
+    def progress(self):
+        elapsed = time.perf_counter() - self._started
+        done = sum(self.counts[k] for k in ("inserted", "updated", "unchanged", "failed"))
+        rate = done / elapsed if elapsed > 0 else 0
+        eta = None
+        if self.expected and rate > 0:
+            eta = round(max(self.expected - done, 0) / rate, 1)
+        return {
+            "run_id": self.run_id, "source": self.source, "trigger": self.trigger, "mode": self.mode,
+            **self.counts,
+            "written": done - self.counts["failed"],
+            "expected": self.expected,
+            "elapsed_seconds": round(elapsed, 1),
+            "records_per_sec": round(rate, 1),
+            "fetch_per_sec": round(self.counts["records_fetched"] / elapsed, 1) if elapsed > 0 else 0,
+            "eta_seconds": eta,
+        }
+
+    def _publish_progress(self):
+        now = time.monotonic()
+        if now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        bus.publish("progress", **self.progress())
+
+    def as_row(self):
+        transfer = oracle_client.transfer_stats()
+        wall = time.perf_counter() - self._started
+        row = {f"{name}_seconds": round(s, 3) for name, s in self.stage_seconds.items()}
+        row.update(self.counts)
+        row.update(
+            wall_seconds=round(wall, 3),
+            bytes_downloaded=transfer["bytes"] - self._transfer_start["bytes"],
+            retries=self.retries + transfer["retries"] - self._transfer_start["retries"],
+            peak_concurrency=self.peak_concurrency,
+            rows_upserted=self.counts["inserted"] + self.counts["updated"],
+            mode=self.mode,
+        )
+        return row
+
+
+def start_run(source, trigger=None, mode=None):
+    """Opens a RUNNING ledger row and returns the recorder for it."""
+    from backend.app.core.database import SessionLocal
+    run = RunRecorder(source, trigger=trigger, mode=mode)
+    db = SessionLocal()
+    try:
+        record = SyncRun(status="RUNNING", trigger=run.trigger, source=run.source, mode=run.mode,
+                         started_at=datetime.utcnow())
+        db.add(record)
+        db.commit()
+        run.run_id = record.sync_run_id
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not open sync ledger entry: {e}")
+    finally:
+        db.close()
+    bus.publish("run_started", **run.progress())
+    return run
+
+
+def finish_run(run, status=None, error=None):
+    """Completes the ledger row with the recorder's metrics (status defaults to run.status, then SUCCESS)."""
+    from backend.app.core.database import SessionLocal
+    status = status or run.status or "SUCCESS"
+    if error:
+        run.error(error)
+    bus.publish("run_finished", **run.progress(), status=status, error=error)
+    if not run.run_id:
+        return
+    db = SessionLocal()
+    try:
+        record = db.get(SyncRun, run.run_id)
+        for key, value in run.as_row().items():
+            setattr(record, key, value)
+        record.status = status
+        record.ended_at = datetime.utcnow()
+        record.error_message = error
+        db.commit()
+        logger.info(f"Sync run {run.run_id} ({run.source}) {status}: "
+                    f"{record.records_fetched} records, {record.pages} pages in {record.wall_seconds}s")
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not close sync ledger entry {run.run_id}: {e}")
+    finally:
+        db.close()
+
+
+@contextmanager
+def track_run(source, trigger=None, mode=None):
+    """Records one sync run in the ledger. Exceptions are recorded as FAILED and re-raised."""
+    run = start_run(source, trigger=trigger, mode=mode)
+    try:
+        yield run
+    except Exception as e:
+        finish_run(run, "FAILED", str(e)[:2000])
+        raise
+    finish_run(run)
+
+
+def last_synced_at(db):
+    """
+    When a sync last finished (SUCCESS or PARTIAL), from the ledger. Falls back to
+    the newest per-row write for databases that predate the ledger. Rows a sync finds
+    unchanged keep their old local_last_synced_at, so that column alone is not freshness.
+    """
+    last = db.query(func.max(SyncRun.ended_at)).filter(SyncRun.status.in_(["SUCCESS", "PARTIAL"])).scalar()
+    return last or db.query(func.max(Opportunity.local_last_synced_at)).scalar()
+
+
+def summarize(runs):
+    """p50/p95/max of duration, per-stage time and throughput over finished runs."""
+    finished = [r for r in runs if r.status not in ("RUNNING", "FAILED") and r.wall_seconds]
+    series = {
+        "wall_seconds": [r.wall_seconds for r in finished],
+        "fetch_seconds": [r.fetch_seconds or 0 for r in finished],
+        "map_seconds": [r.map_seconds or 0 for r in finished],
+        "write_seconds": [r.write_seconds or 0 for r in finished],
+        "records_per_sec": [(r.records_fetched or 0) / r.wall_seconds for r in finished],
+        "write_rows_per_sec": [(r.records_fetched or 0) / r.write_seconds for r in finished if r.write_seconds],
+        "bytes_per_record": [(r.bytes_downloaded or 0) / r.records_fetched for r in finished if r.records_fetched],
+        "retries": [r.retries or 0 for r in finished],
+        "peak_concurrency": [r.peak_concurrency or 0 for r in finished],
+    }
+    summary = {
+        name: {"p50": _round(_percentile(v, 50)), "p95": _round(_percentile(v, 95)), "max": _round(max(v, default=None))}
+        for name, v in series.items()
+    }
+    by_status = {}
+    for r in runs:
+        by_status[r.status] = by_status.get(r.status, 0) + 1
+    return {"runs": len(runs), "finished": len(finished), "by_status": by_status, "metrics": summary}
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def serialize_run(r):
+    return {
+        "sync_run_id": r.sync_run_id,
+        "status": r.status,
+        "trigger": r.trigger,
+        "source": r.source,
+        "mode": r.mode,
+        "started_at": r.started_at.isoformat() if r.started_at else None,
+        "ended_at": r.ended_at.isoformat() if r.ended_at else None,
+        "wall_seconds": r.wall_seconds,
+        "stages": {"fetch": r.fetch_seconds, "map": r.map_seconds, "write": r.write_seconds},
+        "pages": r.pages,
+        "bytes_downloaded": r.bytes_downloaded,
+        "records_fetched": r.records_fetched,
+        "inserted": r.inserted,
+        "updated": r.updated,
+        "unchanged": r.unchanged,
+        "failed": r.failed,
+        "deactivated": r.deactivated,
+        "retries": r.retries,
+        "peak_concurrency": r.peak_concurrency,
+        "records_per_sec": round(r.records_fetched / r.wall_seconds, 1) if r.wall_seconds and r.records_fetched else 0,
+        "error_message": r.error_message,
+    }
@@ -1,9 +1,7 @@
 
 import os
 import sys
-import httpx
 import logging
-from datetime import datetime
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
@@ -23,70 +21,33 @@ def log(msg):
     logging.info(msg)
 
 from backend.app.core.database import SessionLocal, init_db
-from backend.app.models import Opportunity, Practice
+from backend.app.services.bulk_writer import upsert_opportunities
+from backend.app.services import oracle_client
+from backend.app.services.oracle_fields import PROJECTED_FIELDS
+from backend.app.services.oracle_mapping import map_batch, map_one
+from backend.app.services.practice_cache import practice_cache
+from backend.app.services.reconcile import reconcile_closed
+from backend.app.services.sync_ledger import start_run, finish_run
+from backend.app.services.sync_state import SKIPPED, run_tracked
+from backend.app.services.sync_watermark import plan_sync, since_clause, max_seen, record_sync
 
-def map_oracle_to_db(item, db: Session):
+def map_oracle_to_db(item, db: Session = None):
     """Map Oracle JSON to our Opportunity model"""
-    try:
-        opty_id = str(item.get("OptyId"))
-        if not opty_id: return None
-        
-        # Parse dates
-        last_update_str = item.get("LastUpdateDate") or item.get("OptyLastUpdateDate")
-        crm_last_updated_at = datetime.utcnow()
-        if last_update_str:
-            try:
-                crm_last_updated_at = datetime.fromisoformat(last_update_str.replace('Z', '+00:00'))
-            except: pass
-            
-        close_date = None
-        if item.get("EffectiveDate"):
-            try:
-                close_date = datetime.strptime(item["EffectiveDate"][:10], "%Y-%m-%d")
-            except: pass
-
-        # Practice lookup/create
-        primary_practice_id = None
-        practice_val = item.get("Practice_c")
-        if practice_val:
-            prac = db.query(Practice).filter(Practice.practice_name == practice_val).first()
-            if not prac:
-                import uuid
-                prac = Practice(
-                    practice_id=str(uuid.uuid4()),
-                    practice_code=practice_val.upper().replace(" ", "_")[:20],
-                    practice_name=practice_val
-                )
-                db.add(prac)
-                db.flush()
-            primary_practice_id = prac.practice_id
-
-        return {
-            "opp_id": opty_id,
-            "opp_number": str(item.get("OptyNumber") or opty_id),
-            "opp_name": item.get("Name") or "Unknown Opportunity",
-            "customer_name": item.get("TargetPartyName") or "Unknown Account",
-            "geo": item.get("GEO_c") or item.get("Geo_c") or item.get("Region_c"),
-            "currency": item.get("CurrencyCode", "USD"),
-            "deal_value": float(item.get("Revenue") or 0),
-            "stage": item.get("SalesStage"),
-            "close_date": close_date,
-            "crm_last_updated_at": crm_last_updated_at,
-            "primary_practice_id": primary_practice_id,
-            "is_active": True
-        }
-    except Exception as e:
-        log(f"⚠️ Mapping Error: {e}")
-        return None
+    return map_one(item)
 
-def sync_opportunities():
+def sync_opportunities(full=False):
     """
-    Fetches ALL opportunities using RecordSet='ALL' with proper field names.
+    Fetches opportunities using RecordSet='ALL' with proper field names.
+    Only rows changed since the stored watermark are requested, unless a full
+    reconcile is forced or due. Expects the schema to exist (init_db runs at app startup).
     """
-    log("🚀 Starting CLEAN Dynamic Sync...")
-    
-    init_db()
     db = SessionLocal()
+    mode, since_date = plan_sync(db, full=full)
+    practice_cache.warm(db)
+    high_water = None
+    failed = False
+    run = start_run("sync_manager", mode=mode)
+    log(f"🚀 Starting CLEAN Dynamic Sync ({mode}{', since ' + since_date if since_date else ''})...")
     
     # 1. Base URL
     endpoint = f"{ORACLE_BASE_URL}/crmRestApi/resources/latest/opportunities"
@@ -98,86 +59,107 @@ def sync_opportunities():
     batch_number = 1
     has_more = True
     
-    with httpx.Client(auth=(ORACLE_USER, ORACLE_PASSWORD), timeout=60.0) as client:
-        while has_more:
-            log(f"\n{'='*70}")
-            log(f"📦 BATCH {batch_number}: Fetching records {offset} to {offset + limit - 1}")
-            log(f"{'='*70}")
+    while has_more:
+        log(f"\n{'='*70}")
+        log(f"📦 BATCH {batch_number}: Fetching records {offset} to {offset + limit - 1}")
+        log(f"{'='*70}")
+        
+        # 3. USER'S EXACT URL FORMAT
+        # Using MyOpportunitiesFinder with RecordSet='ALLOPTIES'
+        url = (
+            f"{ORACLE_BASE_URL}/crmRestApi/resources/11.12.1.0/opportunities"
+            f"?finder=MyOpportunitiesFinder;RecordSet='ALLOPTIES'"
+            f"&limit={limit}"
+            f"&offset={offset}"
+            f"&onlyData=true"
+            f"&fields={PROJECTED_FIELDS}"
+        )
+        if since_date:
+            url += f"&q={since_clause(since_date)}"
+        
+        # Log the EXACT URL being sent
+        log(f"🔗 Requesting: {url}")
+        
+        try:
+            # 4. Make Request (NO params argument - URL is complete; shared pooled client)
+            with run.stage("fetch"):
+                response = oracle_client.get(url)
+                data = oracle_client.json_body(response) if response.status_code == 200 else {}
             
-            # 3. USER'S EXACT URL FORMAT
-            # Using MyOpportunitiesFinder with RecordSet='ALLOPTIES'
-            url = (
-                f"{ORACLE_BASE_URL}/crmRestApi/resources/11.12.1.0/opportunities"
-                f"?finder=MyOpportunitiesFinder;RecordSet='ALLOPTIES'"
-                f"&limit={limit}"
-                f"&offset={offset}"
-            )
+            if response.status_code != 200:
+                log(f"❌ API Error: {response.status_code} - {response.text[:200]}")
+                run.error(f"Oracle API {response.status_code}")
+                failed = True
+                break
             
-            # Log the EXACT URL being sent
-            log(f"🔗 Requesting: {url}")
+            items = data.get("items", [])
             
+            if not items:
+                log("✅ No more items found.")
+                has_more = False
+                break
+            
+            log(f"📝 Processing {len(items)} items in this batch...")
+            run.add_page(items)
+            
+            # 5. Map and write the whole page in one statement
+            with run.stage("map"):
+                mapped = map_batch(items)
+            batch_saved = 0
             try:
-                # 4. Make Request (NO params argument - URL is complete)
-                response = client.get(url)
-                
-                if response.status_code != 200:
-                    log(f"❌ API Error: {response.status_code} - {response.text[:200]}")
-                    break
-                
-                data = response.json()
-                items = data.get("items", [])
-                
-                if not items:
-                    log("✅ No more items found.")
-                    has_more = False
-                    break
-                
-                log(f"📝 Processing {len(items)} items in this batch...")
-                
-                # 5. Process each item
-                batch_saved = 0
-                for item in items:
-                    mapped = map_oracle_to_db(item, db)
-                    if not mapped:
-                        continue
-                    
-                    try:
-                        existing = db.query(Opportunity).filter(
-                            Opportunity.opp_id == mapped["opp_id"]
-                        ).first()
-                        
-                        if existing:
-                            for k, v in mapped.items():
-                                setattr(existing, k, v)
-                        else:
-                            db.add(Opportunity(**mapped))
-                        
-                        db.commit()
-                        batch_saved += 1
-                        total_saved += 1
-                        print(f"   ✓ Saved: {mapped['opp_name'][:50]}")
-                        
-                    except Exception as e:
-                        db.rollback()
-                        log(f"⚠️ DB Error: {e}")
-                
-                log(f"✅ Batch {batch_number} complete: {batch_saved}/{len(items)} saved")
-                log(f"📊 Total saved so far: {total_saved}")
-                
-                # 6. Pagination Check
-                if len(items) < limit:
-                    has_more = False
-                else:
-                    offset += limit
-                    batch_number += 1
-                
+                with run.stage("write"):
+                    stats = upsert_opportunities(db, mapped)
+                    db.commit()
+                run.add_write(stats)
+                batch_saved = stats["inserted"] + stats["updated"]
+                total_saved += batch_saved
+                high_water = max_seen(items, high_water)
             except Exception as e:
-                log(f"💥 Request Error: {e}")
-                break
-    
+                db.rollback()
+                failed = True
+                run.add_failed(len(mapped), e)
+                log(f"⚠️ DB Error: {e}")
+            
+            log(f"✅ Batch {batch_number} complete: {batch_saved}/{len(items)} saved")
+            log(f"📊 Total saved so far: {total_saved}")
+            
+            # 6. Pagination Check
+            if len(items) < limit:
+                has_more = False
+            else:
+                offset += limit
+                batch_number += 1
+            
+        except Exception as e:
+            log(f"💥 Request Error: {e}")
+            run.error(e)
+            failed = True
+            break
+
+    # 7. Advance the watermark only if every page landed
+    try:
+        meta = record_sync(db, mode, high_water, complete=not failed)
+        meta.sync_status = "PARTIAL" if failed else "SUCCESS"
+        meta.records_processed = total_saved
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        log(f"⚠️ Could not record sync watermark: {e}")
+
+    # 8. Full passes also retire opportunities that are no longer open in Oracle
+    if mode == "FULL" and not failed:
+        try:
+            run.counts["deactivated"] += reconcile_closed(db)["deactivated"]
+        except Exception as e:
+            db.rollback()
+            run.error(f"Reconcile failed: {e}")
+            log(f"⚠️ Reconcile skipped: {e}")
     db.close()
+    finish_run(run, "PARTIAL" if failed else "SUCCESS")
     log(f"🎉 Sync Complete! Total Saved: {total_saved} opportunities")
     return total_saved
 
 if __name__ == "__main__":
-    sync_opportunities()
+    init_db()
+    if run_tracked("cli", sync_opportunities) is SKIPPED:
+        sys.exit("Another sync is running in this or another process; not starting a second one.")
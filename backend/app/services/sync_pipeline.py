@@ -0,0 +1,155 @@
+"""
+Producer/consumer streaming pipeline for Oracle -> Postgres sync.
+
+    fetchers (N async tasks) --pages--> [bounded queue] --> mapper --batches--> [bounded queue] --> writer (thread pool)
+
+Both queues are bounded, so a slow database stalls the fetchers instead of
+letting downloaded pages pile up in memory. Peak memory is roughly
+(queue_size pages + 2 writer batches) no matter how large the CRM is, and
+rows are persisted as soon as each writer batch fills.
+
+Only a short page ends the stream. A fetch error, or a mapper/writer
+failure, cancels every stage and is raised to the caller, so the run is
+recorded as FAILED instead of silently stopping early or hanging on a
+full queue.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+FETCH_CONCURRENCY = int(os.getenv("SYNC_FETCH_CONCURRENCY", "4"))
+WRITER_BATCH_SIZE = int(os.getenv("SYNC_WRITER_BATCH_SIZE", "500"))
+QUEUE_SIZE = int(os.getenv("SYNC_QUEUE_SIZE", "8"))
+
+_DONE = object()
+
+
+class StageStats:
+    """Throughput counters for one pipeline stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+
+    def record(self, items, seconds):
+        self.items += items
+        self.batches += 1
+        self.busy_seconds += seconds
+
+    def as_dict(self, wall_seconds):
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_sec": round(self.items / wall_seconds, 1) if wall_seconds > 0 else 0,
+        }
+
+
+async def _unless_stage_fails(awaitable, stages):
+    """Awaits awaitable, raising as soon as one of the stage tasks fails or exits early."""
+    task = asyncio.ensure_future(awaitable)
+    done, _ = await asyncio.wait({task, *stages}, return_when=asyncio.FIRST_COMPLETED)
+    if task in done:
+        return task.result()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    for stage in done:
+        stage.result()  # re-raises the stage's error
+    raise RuntimeError("Pipeline stage exited before the stream ended")
+
+
+async def run_pipeline(fetch_page, map_page, write_batch, page_size=50,
+                       fetch_concurrency=None, writer_batch_size=None, queue_size=None, on_page=None):
+    """
+    Streams every page through map and write stages.
+
+    fetch_page(offset, limit) -> awaitable list of raw items (a short page ends the stream;
+                                 raise on errors)
+    map_page(raw_items) -> list of mapped rows
+    write_batch(list_of_mapped) -> int rows written (runs in a worker thread)
+    on_page(raw_items) -> optional progress hook, called as each non-empty page arrives
+
+    Returns per-stage counters plus overall wall time.
+    """
+    fetch_concurrency = fetch_concurrency or FETCH_CONCURRENCY
+    writer_batch_size = writer_batch_size or WRITER_BATCH_SIZE
+    queue_size = queue_size or QUEUE_SIZE
+
+    page_queue = asyncio.Queue(maxsize=queue_size)
+    batch_queue = asyncio.Queue(maxsize=2)
+    stats = {name: StageStats(name) for name in ("fetch", "map", "write")}
+    state = {"next_offset": 0, "exhausted": False, "written": 0}
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+
+    async def fetcher():
+        while not state["exhausted"]:
+            offset = state["next_offset"]
+            state["next_offset"] += page_size
+            t0 = time.perf_counter()
+            items = await fetch_page(offset, page_size)
+            stats["fetch"].record(len(items), time.perf_counter() - t0)
+            if len(items) < page_size:
+                state["exhausted"] = True
+            if items:
+                if on_page:
+                    on_page(items)
+                await page_queue.put(items)  # blocks when the mapper/writer fall behind
+
+    async def mapper():
+        buffer = []
+        while True:
+            page = await page_queue.get()
+            if page is _DONE:
+                break
+            t0 = time.perf_counter()
+            mapped = map_page(page)
+            stats["map"].record(len(mapped), time.perf_counter() - t0)
+            buffer.extend(mapped)
+            while len(buffer) >= writer_batch_size:
+                await batch_queue.put(buffer[:writer_batch_size])
+                buffer = buffer[writer_batch_size:]
+        if buffer:
+            await batch_queue.put(buffer)
+        await batch_queue.put(_DONE)
+
+    async def writer(executor):
+        while True:
+            batch = await batch_queue.get()
+            if batch is _DONE:
+                break
+            t0 = time.perf_counter()
+            written = await loop.run_in_executor(executor, write_batch, batch)
+            stats["write"].record(len(batch), time.perf_counter() - t0)
+            state["written"] += written or 0
+            logger.info(f"Pipeline: wrote batch of {len(batch)} (total written {state['written']})")
+
+    # A single DB writer thread keeps batches serialized on one connection at a time
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="sync-writer") as executor:
+        map_task = asyncio.create_task(mapper())
+        write_task = asyncio.create_task(writer(executor))
+        fetch_tasks = [asyncio.create_task(fetcher()) for _ in range(fetch_concurrency)]
+        stages = (map_task, write_task)
+        try:
+            await _unless_stage_fails(asyncio.gather(*fetch_tasks), stages)
+            await _unless_stage_fails(page_queue.put(_DONE), stages)
+            await map_task
+            await write_task
+        except BaseException:
+            for task in (*fetch_tasks, *stages):
+                task.cancel()
+            await asyncio.gather(*fetch_tasks, *stages, return_exceptions=True)
+            raise
+
+    wall = time.perf_counter() - started
+    result = {name: s.as_dict(wall) for name, s in stats.items()}
+    result["written"] = state["written"]
+    result["wall_seconds"] = round(wall, 3)
+    logger.info(f"Pipeline finished in {wall:.2f}s: {result}")
+    return result
@@ -0,0 +1,122 @@
+"""
+In-process scheduler for Oracle syncs (APScheduler, one background thread).
+
+    incremental  every SYNC_INTERVAL_MINUTES (0 disables)
+    nightly      full reconcile at SYNC_NIGHTLY_HOUR:00 in SYNC_TIMEZONE (-1 disables)
+
+Every job goes through sync_state.run_tracked, so it shares the single-run
+guard with the startup sync, /api/sync-force and /api/batch-sync: the
+in-process state plus a Postgres advisory lock across processes. A job that
+fires while a sync is running is not queued behind it. It is coalesced into
+one deferred follow-up run SYNC_RETRY_SECONDS later, and a deferred full
+reconcile absorbs any deferred incremental. APScheduler's own
+coalesce/max_instances settings also collapse misfires of one job after a
+stall.
+"""
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from backend.app.services.sync_manager import sync_opportunities
+from backend.app.services.sync_state import run_tracked, SKIPPED
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SYNC_SCHEDULER_ENABLED", "true").lower() == "true"
+INTERVAL_MINUTES = int(os.getenv("SYNC_INTERVAL_MINUTES", "30"))
+NIGHTLY_HOUR = int(os.getenv("SYNC_NIGHTLY_HOUR", "2"))
+TIMEZONE = os.getenv("SYNC_TIMEZONE", "UTC")
+RETRY_SECONDS = int(os.getenv("SYNC_RETRY_SECONDS", "60"))
+
+DEFERRED_JOB_ID = "sync-deferred"
+
+_scheduler = None
+_deferred_lock = threading.Lock()
+_deferred = {"full": None}  # None: nothing deferred; False/True: incremental/full pending
+
+
+def _run(trigger, full=False):
+    """Job body: runs one tracked sync, deferring it if another sync holds the run."""
+    with _deferred_lock:
+        absorbed = _deferred["full"] is not None
+        if absorbed:
+            full = full or _deferred["full"]
+            _deferred["full"] = None
+    if absorbed and trigger != "scheduler-deferred":
+        _cancel_deferred()
+
+    result = run_tracked(trigger, sync_opportunities, full)
+    if result is SKIPPED:
+        _defer(full, coalesced=absorbed)
+
+
+def _cancel_deferred():
+    try:
+        if _scheduler and _scheduler.get_job(DEFERRED_JOB_ID):
+            _scheduler.remove_job(DEFERRED_JOB_ID)
+    except JobLookupError:
+        pass  # it fired in the meantime
+
+
+def _defer(full, coalesced=False):
+    with _deferred_lock:
+        coalesced = coalesced or _deferred["full"] is not None
+        _deferred["full"] = bool(full or _deferred["full"])
+        full = _deferred["full"]
+    if _scheduler is None or not _scheduler.running:
+        return
+    run_at = datetime.now(_scheduler.timezone) + timedelta(seconds=RETRY_SECONDS)
+    _scheduler.add_job(_run, "date", run_date=run_at, args=["scheduler-deferred", full],
+                       id=DEFERRED_JOB_ID, replace_existing=True)
+    logger.info(f"Scheduled {'full' if full else 'incremental'} sync deferred to {run_at:%H:%M:%S}"
+                f"{' (coalesced)' if coalesced else ''}")
+
+
+def start_scheduler():
+    """Starts the background scheduler (idempotent). Returns it, or None when disabled."""
+    global _scheduler
+    if not SCHEDULER_ENABLED:
+        logger.info("Sync scheduler disabled (SYNC_SCHEDULER_ENABLED=false)")
+        return None
+    if _scheduler and _scheduler.running:
+        return _scheduler
+
+    _scheduler = BackgroundScheduler(
+        timezone=TIMEZONE,
+        job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 300},
+    )
+    if INTERVAL_MINUTES > 0:
+        _scheduler.add_job(_run, IntervalTrigger(minutes=INTERVAL_MINUTES), args=["scheduler"],
+                           id="sync-incremental", name="Incremental Oracle sync")
+    if NIGHTLY_HOUR >= 0:
+        _scheduler.add_job(_run, CronTrigger(hour=NIGHTLY_HOUR, minute=0), args=["nightly", True],
+                           id="sync-nightly-full", name="Nightly full reconcile")
+    _scheduler.start()
+    logger.info(f"Sync scheduler started: incremental every {INTERVAL_MINUTES} min, "
+                f"full reconcile at {NIGHTLY_HOUR:02d}:00 {TIMEZONE}")
+    return _scheduler
+
+
+def stop_scheduler():
+    global _scheduler
+    if _scheduler and _scheduler.running:
+        _scheduler.shutdown(wait=False)
+    _scheduler = None
+
+
+def scheduler_status():
+    if not _scheduler or not _scheduler.running:
+        return {"running": False}
+    with _deferred_lock:
+        deferred = _deferred["full"]
+    return {
+        "running": True,
+        "jobs": [{"id": job.id, "name": job.name,
+                  "next_run_at": job.next_run_time.isoformat() if job.next_run_time else None}
+                 for job in _scheduler.get_jobs()],
+        "deferred": None if deferred is None else ("FULL" if deferred else "INCREMENTAL"),
+    }
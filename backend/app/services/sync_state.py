@@ -0,0 +1,103 @@
+"""
+In-process state of the Oracle sync, shared by the startup sync, /api/sync-force,
+the scheduler and the health endpoints. At most one tracked sync runs at a time;
+a trigger that arrives while one is running is skipped instead of starting a
+duplicate download. Across processes (several workers, a second app instance,
+the CLI entry points in sync_manager/async_sync that run_sync.bat starts) the
+same guarantee comes from a Postgres advisory lock held for the duration of the
+run; every path takes it through run_tracked().
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+SYNC_LOCK_KEY = 7_246_001  # pg advisory lock id shared by every BQS process
+SKIPPED = "skipped"  # run_tracked() result when another sync holds the run
+
+_lock = threading.Lock()
+_state = {
+    "status": "IDLE",  # IDLE, RUNNING, SUCCESS, FAILED
+    "trigger": None,
+    "started_at": None,
+    "finished_at": None,
+    "last_result": None,
+    "last_error": None,
+}
+
+
+def snapshot():
+    with _lock:
+        return dict(_state)
+
+
+def is_running():
+    with _lock:
+        return _state["status"] == "RUNNING"
+
+
+@contextmanager
+def advisory_lock(key=SYNC_LOCK_KEY):
+    """
+    Yields True if this process now holds the cross-process sync lock, False if
+    another session holds it. The lock is session-level on a dedicated AUTOCOMMIT
+    connection (no transaction stays open during a long sync) and is released on
+    exit, or by Postgres if the process dies. Other databases have no cross-process
+    lock, so it is always granted there.
+    """
+    from backend.app.core.database import engine
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+
+    conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    acquired = False
+    try:
+        acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar()
+        yield bool(acquired)
+    finally:
+        if acquired:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+        conn.close()
+
+
+def run_tracked(trigger, fn, *args, **kwargs):
+    """
+    Runs a sync callable and records its outcome. Returns SKIPPED if a sync is
+    already running in this or another process, and None if the sync failed.
+    """
+    with _lock:
+        if _state["status"] == "RUNNING":
+            logger.info(f"Sync trigger '{trigger}' skipped: a sync started by '{_state['trigger']}' is still running.")
+            return SKIPPED
+        previous = dict(_state)
+        _state.update(status="RUNNING", trigger=trigger, started_at=datetime.utcnow().isoformat(),
+                      finished_at=None, last_error=None)
+
+    try:
+        with advisory_lock() as acquired:
+            if not acquired:
+                logger.info(f"Sync trigger '{trigger}' skipped: another process holds the sync lock.")
+                with _lock:
+                    _state.update(previous)
+                return SKIPPED
+            result = fn(*args, **kwargs)
+        with _lock:
+            _state.update(status="SUCCESS", last_result=result, finished_at=datetime.utcnow().isoformat())
+        return result
+    except Exception as e:
+        logger.error(f"Sync ({trigger}) failed: {e}")
+        with _lock:
+            _state.update(status="FAILED", last_error=str(e), finished_at=datetime.utcnow().isoformat())
+        return None
+
+
+def start_background(trigger, fn, *args, **kwargs):
+    """Runs a tracked sync on a daemon thread so it never holds up the event loop or shutdown."""
+    thread = threading.Thread(target=run_tracked, args=(trigger, fn) + args, kwargs=kwargs,
+                              name=f"sync-{trigger}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,105 @@
+"""
+Incremental sync bookkeeping.
+
+The high-watermark is the largest Oracle LastUpdateDate we have persisted,
+stored in SyncMeta('oracle_sync_v2').extra_info. Routine syncs ask Oracle
+only for rows changed after (watermark - overlap). The overlap absorbs clock
+skew and rows committed late on the CRM side; re-reading them is harmless,
+because the bulk writer skips rows whose timestamp did not move.
+
+A full reconcile runs when there is no watermark yet, when the caller
+forces one, or when the last full pass is older than FULL_RECONCILE_INTERVAL.
+"""
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from backend.app.models import SyncMeta
+
+logger = logging.getLogger(__name__)
+
+META_KEY = "oracle_sync_v2"
+OVERLAP = timedelta(minutes=int(os.getenv("SYNC_WATERMARK_OVERLAP_MINUTES", "10")))
+FULL_RECONCILE_INTERVAL = timedelta(hours=int(os.getenv("SYNC_FULL_RECONCILE_HOURS", "24")))
+
+
+def _to_utc_naive(dt):
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def get_sync_meta(db: Session):
+    meta = db.query(SyncMeta).filter(SyncMeta.meta_key == META_KEY).first()
+    if not meta:
+        meta = SyncMeta(meta_key=META_KEY, extra_info={})
+        db.add(meta)
+        db.flush()
+    return meta
+
+
+def plan_sync(db: Session, full=False):
+    """
+    Decides the sync mode. Returns (mode, since_date) where mode is
+    'FULL' or 'INCREMENTAL' and since_date is an ISO string (None for FULL).
+    """
+    info = get_sync_meta(db).extra_info or {}
+    watermark = info.get("watermark")
+    last_full = info.get("last_full_sync_at")
+
+    if full or not watermark:
+        return "FULL", None
+    if not last_full or datetime.utcnow() - datetime.fromisoformat(last_full) > FULL_RECONCILE_INTERVAL:
+        logger.info("Full reconcile is due; ignoring watermark for this run.")
+        return "FULL", None
+
+    since = datetime.fromisoformat(watermark) - OVERLAP
+    return "INCREMENTAL", since.replace(microsecond=0).isoformat()
+
+
+def since_clause(since_date):
+    """Oracle REST 'q' fragment for rows changed after since_date."""
+    return f"LastUpdateDate > '{since_date.replace('T', ' ')}'"
+
+
+def max_seen(items, current=None):
+    """
+    Largest LastUpdateDate across raw Oracle items (UTC, naive). Read from
+    the payload, not the mapped rows, because mappers substitute "now" for
+    missing dates and that would push the watermark past unseen changes.
+    """
+    best = _to_utc_naive(current)
+    for item in items:
+        raw = item.get("LastUpdateDate") or item.get("OptyLastUpdateDate")
+        if not raw:
+            continue
+        try:
+            ts = _to_utc_naive(datetime.fromisoformat(raw.replace("Z", "+00:00")))
+        except ValueError:
+            continue
+        if best is None or ts > best:
+            best = ts
+    return best
+
+
+def record_sync(db: Session, mode, high_water, complete=True, **extra):
+    """
+    Advances the watermark after a run. Never moves it backwards, and an
+    incomplete run (lost batches) leaves both the watermark and the full
+    reconcile clock untouched so the next run re-reads the gap.
+    Does not commit; the caller owns the transaction.
+    """
+    meta = get_sync_meta(db)
+    info = dict(meta.extra_info or {})
+    previous = info.get("watermark")
+    if complete and high_water and (not previous or high_water > datetime.fromisoformat(previous)):
+        info["watermark"] = high_water.isoformat()
+    if complete and mode == "FULL":
+        info["last_full_sync_at"] = datetime.utcnow().isoformat()
+    info["last_mode"] = mode
+    info.update(extra)
+    meta.extra_info = info
+    meta.last_sync_timestamp = datetime.utcnow()
+    return meta
@@ -0,0 +1,92 @@
+"""
+Index benchmark: shows query plans for the hot dashboard queries before and
+after the declared model indexes are applied by the self-healing routine.
+
+Usage:
+    python backend/scripts/bench_indexes.py            # plans with current indexes, then heal and re-plan
+    python backend/scripts/bench_indexes.py --rebuild  # drop the declared indexes first for a true "before"
+
+Run against a Postgres copy with realistic data; --rebuild drops indexes.
+"""
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import text
+from backend.app.core.database import engine
+from backend.app.core.self_healing import ensure_declared_indexes
+from backend.app.models import Base
+
+# Representative statements issued by the dashboards and scoring pages
+QUERIES = {
+    "GH list page (keyset order)": """
+        SELECT opp_id FROM opportunity WHERE is_active = true
+        ORDER BY crm_last_updated_at DESC, opp_id DESC LIMIT 50
+    """,
+    "PH tab counts": """
+        SELECT count(*), count(*) FILTER (WHERE workflow_status IN ('READY_FOR_REVIEW', 'SUBMITTED'))
+        FROM opportunity WHERE is_active = true AND assigned_practice_head_id = (
+            SELECT assigned_practice_head_id FROM opportunity WHERE assigned_practice_head_id IS NOT NULL LIMIT 1)
+    """,
+    "SA assigned list": """
+        SELECT opp_id FROM opportunity WHERE is_active = true AND assigned_sa_id = (
+            SELECT assigned_sa_id FROM opportunity WHERE assigned_sa_id IS NOT NULL LIMIT 1)
+        AND workflow_status IN ('UNDER_ASSESSMENT', 'IN_ASSESSMENT')
+    """,
+    "Region filter": """
+        SELECT opp_id FROM opportunity WHERE is_active = true AND geo = (
+            SELECT geo FROM opportunity WHERE geo IS NOT NULL LIMIT 1)
+    """,
+    "Latest score version": """
+        SELECT * FROM opp_score_version WHERE opp_id = (SELECT opp_id FROM opp_score_version LIMIT 1)
+        ORDER BY version_no DESC LIMIT 1
+    """,
+    "Section value lookup": """
+        SELECT * FROM opp_score_values WHERE score_version_id = (SELECT score_version_id FROM opp_score_values LIMIT 1)
+        AND section_code = 'STRAT'
+    """,
+}
+
+
+def explain_all(label):
+    print(f"\n{'=' * 70}\n{label}\n{'=' * 70}")
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            start = time.perf_counter()
+            plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}")).fetchall()
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"\n--- {name} ({elapsed:.1f} ms incl. EXPLAIN)")
+            for row in plan:
+                print(f"    {row[0]}")
+
+
+def drop_declared_indexes():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name};"))
+    print("Dropped declared indexes.")
+
+
+if __name__ == "__main__":
+    if engine.dialect.name != "postgresql":
+        print("This benchmark needs Postgres (EXPLAIN ANALYZE / partial indexes).")
+        sys.exit(1)
+
+    if "--rebuild" in sys.argv:
+        drop_declared_indexes()
+
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE opportunity; ANALYZE opp_score_version; ANALYZE opp_score_values;"))
+        conn.commit()
+
+    explain_all("BEFORE")
+    added = ensure_declared_indexes(engine)
+    print(f"\nIndexes added by self-healing: {added or 'none'}")
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE opportunity; ANALYZE opp_score_version; ANALYZE opp_score_values;"))
+        conn.commit()
+    explain_all("AFTER")
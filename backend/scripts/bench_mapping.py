@@ -0,0 +1,99 @@
+"""
+Mapping micro-benchmark: JSON decode and Oracle -> row mapping throughput
+for synthetic opportunity pages shaped like the projected Oracle payload.
+
+Usage:
+    python backend/scripts/bench_mapping.py [records]
+"""
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.app.services import oracle_client
+from backend.app.services.oracle_mapping import map_batch, parse_date, parse_timestamp
+
+PAGE_SIZE = 500
+
+
+def synthetic_page(n):
+    base = datetime(2025, 1, 1)
+    return {"items": [
+        {
+            "OptyId": 300000000000 + i,
+            "OptyNumber": str(100000 + i),
+            "Name": f"Opportunity {i}",
+            "TargetPartyName": f"Customer {i % 400}",
+            "GEO_c": random.choice(["EMEA", "APAC", "AMER"]),
+            "CurrencyCode": "USD",
+            "Revenue": round(random.random() * 1e6, 2),
+            "SalesStage": random.choice(["Qualify", "Develop", "Propose", "Close"]),
+            "EffectiveDate": (base + timedelta(days=i % 365)).strftime("%Y-%m-%d"),
+            "LastUpdateDate": (base + timedelta(minutes=i % 5000)).strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+            "Practice_c": random.choice(["Cloud", "Data", "Security", None]),
+        }
+        for i in range(n)
+    ]}
+
+
+def legacy_map(item):
+    """Reference: the per-record mapper the sync modules used to carry."""
+    try:
+        last_update_str = item.get("LastUpdateDate") or item.get("OptyLastUpdateDate")
+        crm_last_updated_at = datetime.utcnow()
+        if last_update_str:
+            try:
+                crm_last_updated_at = datetime.fromisoformat(last_update_str.replace('Z', '+00:00'))
+            except: pass
+        close_date = None
+        if item.get("EffectiveDate"):
+            try:
+                close_date = datetime.strptime(item["EffectiveDate"][:10], "%Y-%m-%d")
+            except: pass
+        return {
+            "opp_id": str(item.get("OptyId")),
+            "opp_number": str(item.get("OptyNumber")),
+            "opp_name": item.get("Name") or "Unknown Opportunity",
+            "customer_name": item.get("TargetPartyName") or "Unknown Account",
+            "geo": item.get("GEO_c") or item.get("Geo_c") or item.get("Region_c"),
+            "currency": item.get("CurrencyCode", "USD"),
+            "deal_value": float(item.get("Revenue") or 0),
+            "stage": item.get("SalesStage"),
+            "close_date": close_date,
+            "crm_last_updated_at": crm_last_updated_at,
+            "practice_name_temp": item.get("Practice_c"),
+            "is_active": True,
+        }
+    except Exception:
+        return None
+
+
+def timed(label, n, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<34} {n / elapsed:>12,.0f} records/s")
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    random.seed(7)
+    pages = [json.dumps(synthetic_page(PAGE_SIZE)).encode() for _ in range(max(total // PAGE_SIZE, 1))]
+    n = len(pages) * PAGE_SIZE
+
+    print(f"{n:,} records in {len(pages)} pages of {PAGE_SIZE}")
+    print(f"  JSON decoder: {oracle_client._loads.__module__}")
+    timed("json.loads (stdlib)", n, lambda: [json.loads(p) for p in pages])
+    timed("oracle_client decoder", n, lambda: [oracle_client._loads(p) for p in pages])
+
+    decoded = [oracle_client._loads(p)["items"] for p in pages]
+    timed("legacy per-record mapper", n, lambda: [[legacy_map(i) for i in items] for items in decoded])
+    parse_date.cache_clear(); parse_timestamp.cache_clear()
+    timed("map_batch (cold date cache)", n, lambda: [map_batch(items) for items in decoded])
+    timed("map_batch (warm date cache)", n, lambda: [map_batch(items) for items in decoded])
+    timed("decode + map_batch end to end", n, lambda: [map_batch(oracle_client._loads(p)["items"]) for p in pages])
@@ -0,0 +1,52 @@
+"""
+Oracle payload diagnostic: bytes per record and parse time for one page of
+opportunities, fetched the old way (full resource with links, no
+compression) and the projected way (fields=PROJECTED_FIELDS, onlyData=true,
+gzip).
+
+Usage:
+    python backend/scripts/bench_payload.py [page_size]
+"""
+import json
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.app.services import oracle_client
+from backend.app.services.oracle_fields import PROJECTED_FIELDS, projection_params
+
+
+def measure(label, params, headers):
+    url = oracle_client.api_url("opportunities")
+    start = time.perf_counter()
+    response = oracle_client.get_client().get(url, params=params, headers={**oracle_client.auth_headers(), **headers})
+    fetch_ms = (time.perf_counter() - start) * 1000
+    response.raise_for_status()
+
+    body = response.content  # decompressed
+    start = time.perf_counter()
+    items = json.loads(body).get("items", [])
+    parse_ms = (time.perf_counter() - start) * 1000
+
+    n = max(len(items), 1)
+    wire = int(response.headers.get("Content-Length") or response.num_bytes_downloaded)
+    print(f"\n--- {label}")
+    print(f"    records:            {len(items)}")
+    print(f"    encoding:           {response.headers.get('Content-Encoding', 'identity')}")
+    print(f"    wire bytes/record:  {wire / n:,.0f}")
+    print(f"    JSON bytes/record:  {len(body) / n:,.0f}")
+    print(f"    fetch / parse ms:   {fetch_ms:,.0f} / {parse_ms:,.1f}")
+    return wire / n
+
+
+if __name__ == "__main__":
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    base = {"q": "StatusCode='OPEN'", "limit": limit}
+
+    print(f"Projection: {PROJECTED_FIELDS}")
+    before = measure("BEFORE: full resource, identity", base, {"Accept-Encoding": "identity"})
+    after = measure("AFTER: projected, onlyData, gzip", projection_params(**base), {})
+    print(f"\nWire bytes per record reduced {before / max(after, 1):.1f}x")
@@ -13,13 +13,13 @@ This is an ADDITIONAL option for syncing.
 """
 
 import os
-import httpx
 import logging
 from datetime import datetime
 from sqlalchemy.orm import Session, declarative_base
 from sqlalchemy import Column, Integer, String, DateTime, create_engine
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from backend.app.services import oracle_client
 
 # Load environment
 load_dotenv()
@@ -171,16 +171,16 @@ def call_api(url: str) -> dict:
     """Call Oracle API and return response"""
     logger.info(f"📡 Calling API: {url[:100]}...")
     
-    with httpx.Client(auth=(ORACLE_USER, ORACLE_PASSWORD), timeout=60.0) as client:
-        response = client.get(url)
-        
-        if response.status_code != 200:
-            logger.error(f"❌ API Error: {response.status_code} - {response.text[:200]}")
-            raise Exception(f"API Error: {response.status_code}")
-        
-        data = response.json()
-        logger.info(f"✅ Received {len(data.get('items', []))} items")
-        return data
+    # Shared keep-alive pool + cached auth instead of a new client per page
+    response = oracle_client.get(url)
+    
+    if response.status_code != 200:
+        logger.error(f"❌ API Error: {response.status_code} - {response.text[:200]}")
+        raise Exception(f"API Error: {response.status_code}")
+    
+    data = response.json()
+    logger.info(f"✅ Received {len(data.get('items', []))} items")
+    return data
 
 
 # ============================================================================
@@ -3,26 +3,41 @@ import React, { useState, useEffect } from 'react';
 import { RefreshCcw, AlertCircle, CheckCircle, Clock, X, Terminal } from 'lucide-react';
 
 interface SyncLog {
-    id: number;
-    sync_type: string;
+    sync_run_id: string;
+    source: string;
+    mode: string | null;
     status: string;
-    total_fetched: number;
-    new_records: number;
+    records_fetched: number;
+    inserted: number;
     error_message: string | null;
     started_at: string;
-    completed_at: string | null;
+    ended_at: string | null;
+}
+
+interface SyncProgress {
+    run_id: string | null;
+    source: string;
+    pages: number;
+    records_fetched: number;
+    written: number;
+    failed: number;
+    expected: number | null;
+    records_per_sec: number;
+    eta_seconds: number | null;
 }
 
 export const SyncStatusPopup: React.FC<{ isOpen: boolean; onClose: () => void }> = ({ isOpen, onClose }) => {
     const [logs, setLogs] = useState<SyncLog[]>([]);
     const [loading, setLoading] = useState(false);
+    const [progress, setProgress] = useState<SyncProgress | null>(null);
+    const [liveErrors, setLiveErrors] = useState<string[]>([]);
 
     const fetchLogs = async () => {
         setLoading(true);
         try {
-            const response = await fetch('http://localhost:8000/api/v1/sync-logs');
+            const response = await fetch('http://localhost:8000/api/sync/runs?limit=10');
             const data = await response.json();
-            setLogs(data);
+            setLogs(data.runs);
         } catch (error) {
             console.error('Failed to fetch sync logs:', error);
         } finally {
@@ -32,20 +47,39 @@ export const SyncStatusPopup: React.FC<{ isOpen: boolean; onClose: () => void }>
 
     const triggerSync = async () => {
         try {
-            await fetch('http://localhost:8000/api/v1/sync-crm', { method: 'POST' });
-            alert('Sync triggered! Refresh logs in a few seconds.');
-            fetchLogs();
+            await fetch('http://localhost:8000/api/sync-force', { method: 'POST' });
         } catch (error) {
             alert('Failed to trigger sync');
         }
     };
 
     useEffect(() => {
-        if (isOpen) {
+        if (!isOpen) return;
+        fetchLogs();
+
+        // Live progress is pushed by the server; no polling while the popup is open
+        const source = new EventSource('http://localhost:8000/api/sync/events');
+        source.addEventListener('snapshot', (e) => {
+            const data = JSON.parse((e as MessageEvent).data);
+            const run = data.run;
+            setProgress(run && run.type !== 'run_finished' ? run : null);
+        });
+        const onProgress = (e: Event) => setProgress(JSON.parse((e as MessageEvent).data));
+        source.addEventListener('run_started', (e) => {
+            setLiveErrors([]);
+            onProgress(e);
+        });
+        source.addEventListener('progress', onProgress);
+        source.addEventListener('error', (e) => {
+            // Named 'error' events carry data; connection errors do not (EventSource reconnects itself)
+            const data = (e as MessageEvent).data;
+            if (data) setLiveErrors((prev) => [...prev.slice(-4), JSON.parse(data).message]);
+        });
+        source.addEventListener('run_finished', () => {
+            setProgress(null);
             fetchLogs();
-            const interval = setInterval(fetchLogs, 5000); // Polling every 5s while open
-            return () => clearInterval(interval);
-        }
+        });
+        return () => source.close();
     }, [isOpen]);
 
     if (!isOpen) return null;
@@ -91,6 +125,42 @@ export const SyncStatusPopup: React.FC<{ isOpen: boolean; onClose: () => void }>
                         </div>
                     </div>
 
+                    {progress && (
+                        <div className="p-4 rounded-xl border bg-blue-500/5 border-blue-500/20">
+                            <div className="flex items-center gap-2 mb-3">
+                                <RefreshCcw className="w-5 h-5 text-blue-400 animate-spin" />
+                                <span className="font-bold text-white uppercase text-xs tracking-wider">
+                                    {progress.source} SYNC IN PROGRESS
+                                </span>
+                            </div>
+                            <div className="grid grid-cols-4 gap-4">
+                                <div className="bg-white/5 p-2 rounded-lg">
+                                    <p className="text-[10px] text-slate-500 uppercase">Pages</p>
+                                    <p className="text-lg font-bold text-white">{progress.pages}</p>
+                                </div>
+                                <div className="bg-white/5 p-2 rounded-lg">
+                                    <p className="text-[10px] text-slate-500 uppercase">Written</p>
+                                    <p className="text-lg font-bold text-white">
+                                        {progress.written}{progress.expected ? ` / ${progress.expected}` : ''}
+                                    </p>
+                                </div>
+                                <div className="bg-white/5 p-2 rounded-lg">
+                                    <p className="text-[10px] text-slate-500 uppercase">Rate</p>
+                                    <p className="text-lg font-bold text-white">{progress.records_per_sec}/s</p>
+                                </div>
+                                <div className="bg-white/5 p-2 rounded-lg">
+                                    <p className="text-[10px] text-slate-500 uppercase">ETA</p>
+                                    <p className="text-lg font-bold text-white">
+                                        {progress.eta_seconds != null ? `${Math.ceil(progress.eta_seconds)}s` : '—'}
+                                    </p>
+                                </div>
+                            </div>
+                            {liveErrors.map((message, i) => (
+                                <p key={i} className="mt-2 text-xs text-red-300 font-mono break-words">{message}</p>
+                            ))}
+                        </div>
+                    )}
+
                     {logs.length === 0 ? (
                         <div className="text-center py-12 border-2 border-dashed border-slate-800 rounded-xl">
                             <Clock className="w-12 h-12 text-slate-700 mx-auto mb-4" />
@@ -99,7 +169,7 @@ export const SyncStatusPopup: React.FC<{ isOpen: boolean; onClose: () => void }>
                     ) : (
                         logs.map((log) => (
                             <div
-                                key={log.id}
+                                key={log.sync_run_id}
                                 className={`p-4 rounded-xl border transition-all ${log.status === 'FAILED'
                                         ? 'bg-red-500/5 border-red-500/20'
                                         : 'bg-emerald-500/5 border-emerald-500/20'
@@ -113,7 +183,7 @@ export const SyncStatusPopup: React.FC<{ isOpen: boolean; onClose: () => void }>
                                             <CheckCircle className="w-5 h-5 text-emerald-500" />
                                         )}
                                         <span className="font-bold text-white uppercase text-xs tracking-wider">
-                                            {log.sync_type} SYNC
+                                            {log.source} {log.mode ?? ''} SYNC
                                         </span>
                                     </div>
                                     <span className="text-[10px] text-slate-500 font-mono">
@@ -124,7 +194,7 @@ export const SyncStatusPopup: React.FC<{ isOpen: boolean; onClose: () => void }>
                                 <div className="grid grid-cols-2 gap-4 mt-3">
                                     <div className="bg-white/5 p-2 rounded-lg">
                                         <p className="text-[10px] text-slate-500 uppercase">Records Fetched</p>
-                                        <p className="text-lg font-bold text-white">{log.total_fetched}</p>
+                                        <p className="text-lg font-bold text-white">{log.records_fetched}</p>
                                     </div>
                                     <div className="bg-white/5 p-2 rounded-lg">
                                         <p className="text-[10px] text-slate-500 uppercase">Status</p>
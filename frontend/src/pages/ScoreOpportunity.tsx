@@ -8,7 +8,8 @@ import { ArrowLeft, Save, Send, AlertTriangle, FileText, Upload, Trash2, CheckCi
 import { ApprovalModal } from '../components/ApprovalModal';
 import '../styles/Assessment.css';
 
-const CRITERIA = [
+// Fallback until /api/scoring/sections answers (the server catalog is authoritative)
+const DEFAULT_CRITERIA = [
     { key: "STRAT", label: "Strategic Fit", weight: 0.15 },
     { key: "WIN", label: "Win Probability", weight: 0.15 },
     { key: "FIN", label: "Financial Value", weight: 0.15 },
@@ -38,6 +39,7 @@ export const ScoreOpportunity: React.FC = () => {
     const [scores, setScores] = useState<Record<string, number>>({});
     const [selectedReasons, setSelectedReasons] = useState<Record<string, string[]>>({});
     const [sectionNotes, setSectionNotes] = useState<Record<string, string>>({});
+    const [criteria, setCriteria] = useState(DEFAULT_CRITERIA);
 
     // Combined Review State
     const [combinedData, setCombinedData] = useState<any>(null);
@@ -59,7 +61,16 @@ export const ScoreOpportunity: React.FC = () => {
     const isUserSubmitted = (isSA && saSubmitted) || (isSP && spSubmitted);
     const isReadOnly = isLocked || isUserSubmitted || (!isSA && !isSP);
 
-    const weightedScore = CRITERIA.reduce((acc, c) => acc + (scores[c.key] || 0) * (c.weight * 20), 0);
+    const weightedScore = criteria.reduce((acc, c) => acc + (scores[c.key] || 0) * (c.weight * 20), 0);
+
+    useEffect(() => {
+        // Section catalog: ETag'd, so repeat visits revalidate with a 304
+        axios.get('http://localhost:8000/api/scoring/sections')
+            .then(r => setCriteria(r.data.sections.map((s: any) => ({
+                key: s.section_code, label: s.section_name, weight: s.weight
+            }))))
+            .catch(e => console.warn("Could not fetch section catalog", e));
+    }, []);
 
     useEffect(() => {
         const load = async () => {
@@ -125,7 +136,7 @@ export const ScoreOpportunity: React.FC = () => {
                     setCurrentVersion(s.data.version_no || 1);
                     setPrevAssessment(s.data.prev_assessment);
                     const initialScores: Record<string, number> = {};
-                    CRITERIA.forEach(c => initialScores[c.key] = 0.0);
+                    DEFAULT_CRITERIA.forEach(c => initialScores[c.key] = 0.0);
                     setScores(initialScores);
                 }
 
@@ -162,7 +173,7 @@ export const ScoreOpportunity: React.FC = () => {
                 alert("A detailed Overall Justification Rationale (min 20 characters) is MANDATORY for submission.");
                 return;
             }
-            for (const c of CRITERIA) {
+            for (const c of criteria) {
                 const score = scores[c.key] !== undefined ? scores[c.key] : 0.0;
                 const reasons = selectedReasons[c.key] || [];
                 const notes = sectionNotes[c.key] || "";
@@ -179,7 +190,7 @@ export const ScoreOpportunity: React.FC = () => {
         try {
             const payload = {
                 user_id: user.id,
-                sections: CRITERIA.map(c => ({
+                sections: criteria.map(c => ({
                     section_code: c.key,
                     score: scores[c.key] !== undefined ? scores[c.key] : 0.0,
                     notes: sectionNotes[c.key] || "",
@@ -391,7 +402,7 @@ export const ScoreOpportunity: React.FC = () => {
                     </div>
 
                     <div className="scoring-grid space-y-8 px-6 pb-12">
-                        {CRITERIA.map((c) => {
+                        {criteria.map((c) => {
                             const currentScore = scores[c.key] !== undefined ? scores[c.key] : 0.0;
                             const options = REASON_OPTIONS[c.key] || { critical: [], low: [], average: [], high: [], exceptional: [] };
 